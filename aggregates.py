@@ -0,0 +1,49 @@
+# aggregates.py - Running platform aggregates for the TPM API
+
+from collections import Counter
+
+from typing import Dict
+
+
+class PlatformAggregates:
+    """Running totals updated on every mutation so read endpoints never rescan
+
+    Every method is O(1); the owner calls them alongside each change it makes
+    to incidents. Service health is scored by health_scoring instead.
+    """
+
+    SEVERITIES = ("SEV1", "SEV2", "SEV3")
+
+    def __init__(self):
+        self.incident_count = 0
+        self.severity_counts = Counter()
+        self.status_counts = Counter()
+        self.service_incident_counts = Counter()
+
+    def add_incident(self, incident: Dict):
+        """Count a newly created incident"""
+        self.incident_count += 1
+        self.severity_counts[incident["severity"]] += 1
+        self.status_counts[incident["status"]] += 1
+        self.service_incident_counts[incident["service"]] += 1
+
+    def add_counts(self, incident_count: int, severity_counts: Dict[str, int],
+                   status_counts: Dict[str, int], service_counts: Dict[str, int]):
+        """Count many loaded incidents at once from precomputed tallies"""
+        self.incident_count += incident_count
+        self.severity_counts.update(severity_counts)
+        self.status_counts.update(status_counts)
+        self.service_incident_counts.update(service_counts)
+
+    def update_incident(self, incident: Dict, changes: Dict):
+        """Account for changes about to be applied to an incident"""
+        for field, counts in (("severity", self.severity_counts),
+                              ("status", self.status_counts),
+                              ("service", self.service_incident_counts)):
+            if field in changes and changes[field] != incident[field]:
+                counts[incident[field]] -= 1
+                counts[changes[field]] += 1
+
+    def by_severity(self) -> Dict[str, int]:
+        """Incident counts for every known severity"""
+        return {sev: self.severity_counts[sev] for sev in self.SEVERITIES}
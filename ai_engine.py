@@ -8,26 +8,39 @@ from dotenv import load_dotenv
 
 import json
 
+import asyncio
+
+import random
+
+import httpx
+
+from similarity_cache import IncidentSimilarityCache
+
 # Load environment variables
 load_dotenv()
 
 class TPM_AIAnalyzer:
     """Simple AI analyzer for TPM insights"""
     
-    def __init__(self):
+    def __init__(self, similarity_cache=None):
         openai.api_key = os.getenv("OPENAI_API_KEY")
         
+        # Optional near-duplicate cache; reuses analyses of similar incidents
+        self.similarity_cache = similarity_cache
+        
         self.system_prompt = """You are a Principal Technical Program Manager (TPM) at a FAANG company.
         Your job is to analyze platform incidents and translate them into business impact.
         Focus on: program delays, revenue risk, and executive communication."""
     
-    def analyze_incident(self, incident_data):
-        """Analyze a single incident for business impact"""
+    def _incident_prompt(self, incident_data):
+        """Build the user prompt for a single incident"""
+        # Dashboard incidents carry "time", API incidents carry "timestamp"
+        incident_time = incident_data.get('time', incident_data.get('timestamp', 'Unknown'))
         
-        user_prompt = f"""Incident Details:
+        return f"""Incident Details:
         Service: {incident_data['service']}
         Severity: {incident_data['severity']}
-        Time: {incident_data['time']}
+        Time: {incident_time}
         Description: {incident_data['description']}
         
         As a TPM, provide:
@@ -37,6 +50,136 @@ class TPM_AIAnalyzer:
         4. Recommended action for leadership
         
         Format as JSON with these keys: summary, affected_programs, timeline_impact, recommended_action"""
+    
+    def _fallback_analysis(self, incident_data):
+        """Analysis returned when the LLM is unavailable; marked so caches skip it"""
+        return {
+            "summary": f"{incident_data['service']} incident may impact user experience",
+            "affected_programs": ["All dependent programs"],
+            "timeline_impact": "1-2 days delay",
+            "recommended_action": "Monitor and prepare rollback plan",
+            "fallback": True
+        }
+    
+    def _exec_summary_prompt(self, platform_data):
+        """Build the user prompt for an executive summary
+        
+        Only counts are sent, so callers may pass `incident_count` instead of
+        the incidents themselves.
+        """
+        incident_count = platform_data.get("incident_count")
+        if incident_count is None:
+            incident_count = len(platform_data["incidents"])
+        return f"""Platform Status:
+        Overall Health: {platform_data['health']}%
+        Services: {len(platform_data['services'])}
+        Recent Incidents: {incident_count}
+        
+        Generate a brief executive summary (3 bullet points) for leadership meeting."""
+    
+    FALLBACK_EXEC_SUMMARY = "Platform is stable with minor incidents. Monitor payment-service health."
+    
+    # Prompt packing: several incidents per ChatCompletion call
+    ANALYSIS_KEYS = ("summary", "affected_programs", "timeline_impact", "recommended_action")
+    BATCH_TOKEN_BUDGET = 3000       # Prompt tokens per packed request
+    BATCH_MAX_INCIDENTS = 20        # Incidents per packed request
+    TOKENS_PER_ANALYSIS = 120       # Completion tokens reserved per incident
+    MAX_COMPLETION_TOKENS = 2400
+    
+    @staticmethod
+    def _estimate_tokens(text):
+        """Rough token count (about four characters per token)"""
+        return len(text) // 4 + 1
+    
+    def _incident_line(self, key, incident_data):
+        incident_time = incident_data.get('time', incident_data.get('timestamp', 'Unknown'))
+        return (f"- incident_id: {key} | service: {incident_data['service']} | severity: {incident_data['severity']}"
+                f" | time: {incident_time} | description: {incident_data['description']}")
+    
+    def _batch_prompt(self, batch):
+        """Build one user prompt covering every incident in a pack"""
+        lines = "\n".join(self._incident_line(key, incident) for key, incident in batch)
+        return f"""Analyze each incident below as a TPM.
+        
+        {lines}
+        
+        Respond with only a JSON array containing one object per incident, with these keys:
+        incident_id, summary, affected_programs, timeline_impact, recommended_action"""
+    
+    @staticmethod
+    def _incident_keys(incidents):
+        """Key each incident by its id, or by its position when it has none"""
+        return [str(incident.get("id", position)) for position, incident in enumerate(incidents)]
+    
+    def pack_incidents(self, incidents, token_budget=None, keys=None):
+        """Split incidents into packs that each fit one request's token budget
+        
+        Returns lists of (key, incident) pairs, keyed as _incident_keys does
+        unless explicit keys are given.
+        """
+        token_budget = token_budget or self.BATCH_TOKEN_BUDGET
+        overhead = self._estimate_tokens(self.system_prompt + self._batch_prompt([]))
+        
+        packs, current, used = [], [], overhead
+        for key, incident in zip(keys or self._incident_keys(incidents), incidents):
+            cost = self._estimate_tokens(self._incident_line(key, incident))
+            if current and (used + cost > token_budget or len(current) >= self.BATCH_MAX_INCIDENTS):
+                packs.append(current)
+                current, used = [], overhead
+            current.append((key, incident))
+            used += cost
+        if current:
+            packs.append(current)
+        return packs
+    
+    def _batch_max_tokens(self, batch):
+        return min(self.MAX_COMPLETION_TOKENS, self.TOKENS_PER_ANALYSIS * len(batch))
+    
+    def _parse_batch_response(self, content, keys):
+        """Validate a packed response and split it into per-incident analyses
+        
+        Entries that are malformed, unknown or missing required keys are dropped so
+        the caller can fall back to single-incident calls for them.
+        """
+        content = content.strip()
+        if content.startswith("```"):
+            content = content.strip("`").partition("\n")[2]
+        
+        try:
+            items = json.loads(content)
+        except ValueError:
+            return {}
+        if not isinstance(items, list):
+            return {}
+        
+        wanted = set(keys)
+        analyses = {}
+        for item in items:
+            if not isinstance(item, dict) or not all(k in item for k in self.ANALYSIS_KEYS):
+                continue
+            key = str(item.get("incident_id"))
+            if key in wanted and key not in analyses:
+                analyses[key] = {k: item[k] for k in self.ANALYSIS_KEYS}
+        return analyses
+    
+    def _cached_analysis(self, incident_data):
+        if self.similarity_cache is None:
+            return None
+        return self.similarity_cache.lookup(incident_data)
+    
+    def _remember(self, incident_data, analysis):
+        if self.similarity_cache is not None:
+            self.similarity_cache.add(incident_data, analysis)
+        return analysis
+    
+    def analyze_incident(self, incident_data):
+        """Analyze a single incident for business impact"""
+        
+        cached = self._cached_analysis(incident_data)
+        if cached is not None:
+            return cached
+        
+        user_prompt = self._incident_prompt(incident_data)
         
         try:
             response = openai.ChatCompletion.create(
@@ -49,25 +192,58 @@ class TPM_AIAnalyzer:
                 max_tokens=300
             )
             
-            return json.loads(response.choices[0].message.content)
+            analysis = json.loads(response.choices[0].message.content)
         except:
             # Fallback if API fails
-            return {
-                "summary": f"{incident_data['service']} incident may impact user experience",
-                "affected_programs": ["All dependent programs"],
-                "timeline_impact": "1-2 days delay",
-                "recommended_action": "Monitor and prepare rollback plan"
-            }
+            return self._fallback_analysis(incident_data)
+        
+        return self._remember(incident_data, analysis)
+    
+    def analyze_incidents(self, incidents, token_budget=None):
+        """Analyze many incidents with as few ChatCompletion calls as possible
+        
+        Returns analyses in input order; any incident the packed response
+        leaves out is analyzed on its own.
+        """
+        keys = self._incident_keys(incidents)
+        results, uncached, uncached_keys = {}, [], []
+        for key, incident in zip(keys, incidents):
+            cached = self._cached_analysis(incident)
+            if cached is not None:
+                results[key] = cached
+            else:
+                uncached.append(incident)
+                uncached_keys.append(key)
+        
+        for batch in self.pack_incidents(uncached, token_budget, uncached_keys):
+            if len(batch) == 1:
+                key, incident = batch[0]
+                results[key] = self.analyze_incident(incident)
+                continue
+            
+            try:
+                response = openai.ChatCompletion.create(
+                    model="gpt-3.5-turbo",
+                    messages=[
+                        {"role": "system", "content": self.system_prompt},
+                        {"role": "user", "content": self._batch_prompt(batch)}
+                    ],
+                    temperature=0.3,
+                    max_tokens=self._batch_max_tokens(batch)
+                )
+                parsed = self._parse_batch_response(response.choices[0].message.content, [key for key, _ in batch])
+            except Exception:
+                parsed = {}
+            
+            for key, incident in batch:
+                results[key] = self._remember(incident, parsed[key]) if key in parsed else self.analyze_incident(incident)
+        
+        return [results[key] for key in keys]
     
     def generate_exec_summary(self, platform_data):
         """Generate executive summary from platform data"""
         
-        user_prompt = f"""Platform Status:
-        Overall Health: {platform_data['health']}%
-        Services: {len(platform_data['services'])}
-        Recent Incidents: {len(platform_data['incidents'])}
-        
-        Generate a brief executive summary (3 bullet points) for leadership meeting."""
+        user_prompt = self._exec_summary_prompt(platform_data)
         
         try:
             response = openai.ChatCompletion.create(
@@ -82,7 +258,149 @@ class TPM_AIAnalyzer:
             
             return response.choices[0].message.content
         except:
-            return "Platform is stable with minor incidents. Monitor payment-service health."
+            return self.FALLBACK_EXEC_SUMMARY
+
+
+class AsyncTPM_AIAnalyzer(TPM_AIAnalyzer):
+    """Non-blocking analyzer for use inside async web handlers
+    
+    Talks to any OpenAI-compatible /chat/completions endpoint over one shared
+    HTTP connection pool. Pass an httpx transport (e.g. httpx.ASGITransport
+    around a fake LLM app) to run without the real API.
+    """
+    
+    RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+    
+    def __init__(self, api_key=None, base_url=None, model="gpt-3.5-turbo",
+                 max_concurrency=8, timeout=15.0, max_retries=3,
+                 backoff_base=0.5, backoff_max=8.0, transport=None,
+                 similarity_cache=None):
+        super().__init__(similarity_cache)
+        
+        self.api_key = api_key or os.getenv("OPENAI_API_KEY")
+        self.base_url = (base_url or os.getenv("OPENAI_BASE_URL", "https://api.openai.com/v1")).rstrip("/")
+        self.model = model
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.transport = transport
+        
+        # Created on first use so they bind to the running event loop
+        self._client = None
+        self._semaphore = None
+    
+    def _get_client(self):
+        if self._client is None:
+            headers = {"Authorization": f"Bearer {self.api_key}"} if self.api_key else {}
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                headers=headers,
+                timeout=self.timeout,
+                transport=self.transport,
+                limits=httpx.Limits(max_connections=self.max_concurrency,
+                                    max_keepalive_connections=self.max_concurrency)
+            )
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._client
+    
+    def _backoff_delay(self, attempt):
+        """Exponential backoff with full jitter"""
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+    
+    async def _chat(self, user_prompt, temperature, max_tokens, timeout=None):
+        """Send one chat completion, retrying transient failures"""
+        client = self._get_client()
+        payload = {
+            "model": self.model,
+            "messages": [
+                {"role": "system", "content": self.system_prompt},
+                {"role": "user", "content": user_prompt}
+            ],
+            "temperature": temperature,
+            "max_tokens": max_tokens
+        }
+        
+        for attempt in range(self.max_retries + 1):
+            try:
+                async with self._semaphore:
+                    response = await client.post("/chat/completions", json=payload,
+                                                 timeout=timeout or self.timeout)
+                if response.status_code not in self.RETRYABLE_STATUS:
+                    response.raise_for_status()
+                    return response.json()["choices"][0]["message"]["content"]
+            except (httpx.TimeoutException, httpx.TransportError):
+                pass
+            
+            if attempt < self.max_retries:
+                await asyncio.sleep(self._backoff_delay(attempt))
+        
+        raise RuntimeError(f"LLM request failed after {self.max_retries + 1} attempts")
+    
+    async def analyze_incident(self, incident_data, timeout=None):
+        """Analyze a single incident for business impact"""
+        cached = self._cached_analysis(incident_data)
+        if cached is not None:
+            return cached
+        
+        try:
+            content = await self._chat(self._incident_prompt(incident_data), 0.3, 300, timeout)
+            analysis = json.loads(content)
+        except Exception:
+            return self._fallback_analysis(incident_data)
+        return self._remember(incident_data, analysis)
+    
+    async def _analyze_pack(self, batch, timeout=None):
+        """Analyze one pack, falling back to single calls for missing incidents"""
+        if len(batch) == 1:
+            key, incident = batch[0]
+            return {key: await self.analyze_incident(incident, timeout)}
+        
+        try:
+            content = await self._chat(self._batch_prompt(batch), 0.3, self._batch_max_tokens(batch), timeout)
+            parsed = self._parse_batch_response(content, [key for key, _ in batch])
+        except Exception:
+            parsed = {}
+        
+        for key, incident in batch:
+            if key in parsed:
+                self._remember(incident, parsed[key])
+        
+        missing = [(key, incident) for key, incident in batch if key not in parsed]
+        retried = await asyncio.gather(*(self.analyze_incident(incident, timeout) for _, incident in missing))
+        parsed.update(zip((key for key, _ in missing), retried))
+        return parsed
+    
+    async def analyze_incidents(self, incidents, token_budget=None, timeout=None):
+        """Analyze many incidents, one packed request per token-budget pack"""
+        keys = self._incident_keys(incidents)
+        results, uncached, uncached_keys = {}, [], []
+        for key, incident in zip(keys, incidents):
+            cached = self._cached_analysis(incident)
+            if cached is not None:
+                results[key] = cached
+            else:
+                uncached.append(incident)
+                uncached_keys.append(key)
+        
+        packs = self.pack_incidents(uncached, token_budget, uncached_keys)
+        for parsed in await asyncio.gather(*(self._analyze_pack(batch, timeout) for batch in packs)):
+            results.update(parsed)
+        return [results[key] for key in keys]
+    
+    async def generate_exec_summary(self, platform_data, timeout=None):
+        """Generate executive summary from platform data"""
+        try:
+            return await self._chat(self._exec_summary_prompt(platform_data), 0.2, 200, timeout)
+        except Exception:
+            return self.FALLBACK_EXEC_SUMMARY
+    
+    async def aclose(self):
+        """Close the shared connection pool"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
 
 # Create analyzer instance
-analyzer = TPM_AIAnalyzer()
+analyzer = TPM_AIAnalyzer(similarity_cache=IncidentSimilarityCache())
@@ -3,25 +3,98 @@ Sentinel-AI TPM Platform - REST API Server
 Simple FastAPI server for the TPM intelligence platform
 """
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Query, Request, WebSocket, WebSocketDisconnect
+
+from fastapi.responses import PlainTextResponse, Response, StreamingResponse
 
 from fastapi.middleware.cors import CORSMiddleware
 
 from pydantic import BaseModel
 
+from contextlib import asynccontextmanager
+
+from bisect import bisect_left, bisect_right
+
+from collections import Counter
+
 from datetime import datetime, timedelta
 
-from typing import List, Dict, Optional
+from itertools import compress
+
+from typing import AsyncIterator, List, Dict, Optional
+
+import asyncio
 
 import json
 
+import os
+
 import random
 
+import threading
+
+import time
+
+from storage import create_incident_store
+
+from incident_store import DuplicateIncident
+
+from aggregates import PlatformAggregates
+
+from cache import TTLCache, content_hash
+
+from ai_engine import AsyncTPM_AIAnalyzer
+
+from similarity_cache import IncidentSimilarityCache
+
+from realtime import MetricsBroadcaster
+
+from timeseries import TimeSeriesStore
+
+from sketches import LatencySketches
+
+import ingest
+
+from health_scoring import scoring_engine
+
+from dependency_graph import DependencyGraph
+
+from risk_model import RiskModel
+
+from pagination import decode_cursor, parse_fields, project, take_page
+
+from response_pipeline import CompressionMiddleware, ConditionalJSON, FastJSONResponse
+
+import telemetry
+
+from concurrency import IdAllocator, StripedLock
+
+from records import local_offset_micros, month_range, parse_timestamp, vocabulary
+
+from snapshots import SnapshotPublisher, append_report, freeze, platform_snapshot, replace_service
+
+from report_jobs import QueueFull, ReportJobQueue
+
+import numpy as np
+
+@asynccontextmanager
+async def lifespan(app):
+    """Start-up and shutdown hooks for shared resources"""
+    sampler = asyncio.create_task(sample_service_metrics())
+    yield
+    sampler.cancel()
+    await metrics_broadcaster.stop()
+    await report_jobs.stop()
+    if llm_analyzer is not None:
+        await llm_analyzer.aclose()
+
 # Initialize FastAPI app
 app = FastAPI(
     title="Sentinel-AI TPM Platform API",
     description="AI-powered platform intelligence API for Technical Program Managers",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
+    default_response_class=FastJSONResponse
 )
 
 # Enable CORS for frontend access
@@ -33,6 +106,15 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Negotiated brotli/gzip for complete responses above the size threshold
+app.add_middleware(CompressionMiddleware, minimum_size=int(os.getenv("SENTINEL_COMPRESS_MIN_BYTES", "1024")))
+
+# Per-route latency, in-flight, size and error metrics (outermost, so sizes are as sent)
+app.add_middleware(telemetry.MetricsMiddleware)
+
+# Rendered list payloads, keyed by URL and db.version for ETag/304 handling
+conditional_json = ConditionalJSON(maxsize=int(os.getenv("SENTINEL_RENDER_CACHE_SIZE", "256")))
+
 # Pydantic models for request/response
 class Incident(BaseModel):
     service: str
@@ -52,10 +134,20 @@ class ProgramRisk(BaseModel):
     confidence: int
     status: str
 
-# In-memory database (in production, use real database)
+class LatencySamples(BaseModel):
+    samples_ms: List[float]
+    timestamp: Optional[float] = None
+
+class BatchAnalysisRequest(BaseModel):
+    incident_ids: List[str]
+    max_workers: Optional[int] = None
+
+# Platform database; incidents live in the backend named by SENTINEL_DATABASE_URL
 class TPMDatabase:
-    def __init__(self):
-        self.services = [
+    def __init__(self, database_url: Optional[str] = None, services: Optional[List[Dict]] = None,
+                 incidents: Optional[List[Dict]] = None, service_dependencies: Optional[List[tuple]] = None,
+                 program_dependencies: Optional[List[tuple]] = None):
+        demo_services = [
             {"id": 1, "name": "auth-service", "type": "tier1", "health": 95, "latency": 45, "error_rate": 0.1},
             {"id": 2, "name": "payment-service", "type": "tier1", "health": 87, "latency": 120, "error_rate": 0.5},
             {"id": 3, "name": "inventory-service", "type": "tier2", "health": 92, "latency": 65, "error_rate": 0.2},
@@ -70,8 +162,119 @@ class TPMDatabase:
             {"id": "data-lake", "name": "Enterprise Data Lake", "confidence": 78, "risk": "Medium", "owner": "Data TPM"},
         ]
         
-        self.incidents = self._generate_sample_incidents()
-        self.executive_reports = self._generate_sample_reports()
+        # (dependent, dependency, weight): a failure in the dependency reaches the dependent
+        self.service_dependencies = [
+            ("payment-service", "auth-service", 0.8),
+            ("notification-service", "auth-service", 0.5),
+            ("search-service", "inventory-service", 0.6),
+        ]
+        self.program_dependencies = [
+            ("q4-launch", "auth-service", 1.0),
+            ("q4-launch", "payment-service", 1.0),
+            ("q4-launch", "inventory-service", 1.0),
+            ("q4-launch", "search-service", 1.0),
+            ("ai-migration", "auth-service", 1.0),
+            ("mobile-v2", "auth-service", 1.0),
+            ("mobile-v2", "notification-service", 1.0),
+            ("data-lake", "inventory-service", 1.0),
+            ("data-lake", "search-service", 1.0),
+        ]
+        
+        # Callers such as benchmark.py can supply their own platform instead of the demo one
+        if services is None:
+            services = demo_services
+        if service_dependencies is not None:
+            self.service_dependencies = service_dependencies
+        if program_dependencies is not None:
+            self.program_dependencies = program_dependencies
+        
+        # Services and reports are read through immutable snapshots that writers replace whole
+        self._snapshots = SnapshotPublisher(platform_snapshot(services))
+        self.service_positions = {service["name"]: position for position, service in enumerate(services)}
+        self.service_locks = StripedLock()
+        self.programs_by_id = {program["id"]: program for program in self.programs}
+        self.program_positions = {program["id"]: position for position, program in enumerate(self.programs)}
+        self.dependencies = DependencyGraph.from_edges(self.service_dependencies, self.program_dependencies)
+        self.dependencies.warm()
+        self.incidents = telemetry.TimedStore(create_incident_store(database_url))
+        self.metrics = TimeSeriesStore()
+        self.latency = LatencySketches()
+        
+        # Serialises incident writes with the aggregates and snapshot version that must move with them
+        self._write_lock = threading.RLock()
+        
+        # Seed demo data only into an empty store; durable backends keep their history
+        if not len(self.incidents):
+            self.incidents.add_many(incidents if incidents is not None else self._generate_sample_incidents())
+        self._recount()
+        self.id_allocator = IdAllocator(existing=(incident["id"] for incident in self.incidents))
+        
+        # Reports are kept oldest first with their (generated_at, id) keys, so adding one appends
+        self.report_ids = IdAllocator(prefix="REPORT-", start=1)
+        for report in reversed(self._generate_sample_reports()):
+            self.add_report(report)
+        self._program_risks = None
+        self._health_scores = None
+    
+    def _recount(self):
+        """Rebuild the aggregates and risk model from every stored incident
+        
+        Runs at start-up and whenever another process sharing the store has
+        written since the last count. In bulk either way: from the in-memory
+        store's columns, or from the SQLite store's table columns.
+        """
+        with self._write_lock:
+            version = self.incidents.version()
+            stats, risk = PlatformAggregates(), RiskModel()
+            columns = getattr(self.incidents, "columns", None)
+            if columns is None:
+                tallies = self.incidents.tallies()
+                names, codes = np.unique(tallies["service"].astype(str), return_inverse=True)
+                stats.add_counts(len(codes), *(Counter(tallies[field].tolist())
+                                               for field in ("severity", "status", "service")))
+                risk.add_columns(names.tolist(), codes, tallies["timestamp_micros"] - local_offset_micros(),
+                                 tallies["severity"] == "SEV1", tallies["status"] != "resolved")
+            else:
+                arrays = columns.arrays()
+                # Rows with a field the columns could not encode take the per-incident path
+                bulk = np.ones(len(columns), dtype=bool)
+                for field in columns.CATEGORICAL:
+                    bulk &= arrays[field] >= 0
+                stats.add_counts(int(bulk.sum()), columns.value_counts("severity", bulk),
+                                 columns.value_counts("status", bulk), columns.value_counts("service", bulk))
+                risk.add_columns(
+                    vocabulary("service").values, arrays["service"][bulk], arrays["timestamp"][bulk] - local_offset_micros(),
+                    arrays["severity"][bulk] == vocabulary("severity").lookup("SEV1", -1),
+                    arrays["status"][bulk] != vocabulary("status").lookup("resolved", -1),
+                )
+                for incident_id in compress(columns.ids, ~bulk):
+                    incident = self.incidents.get(incident_id)
+                    stats.add_incident(incident)
+                    risk.add_incident(incident)
+            self._stats, self._risk, self._counted_version = stats, risk, version
+    
+    def _sync(self):
+        """Recount if the store changed behind this process's back"""
+        if self.incidents.version() != self._counted_version:
+            with self._write_lock:
+                if self.incidents.version() != self._counted_version:
+                    self._recount()
+    
+    def _only_writer(self, previous):
+        """Whether the store moved by exactly this process's one write since `previous`, all of it counted"""
+        return previous == self._counted_version and self.incidents.version() == previous + 1
+    
+    @property
+    def stats(self):
+        """Incident aggregates, including incidents written by other processes sharing the store"""
+        self._sync()
+        return self._stats
+    
+    @property
+    def risk(self):
+        """Incident-rate risk model, including incidents written by other processes sharing the store"""
+        self._sync()
+        return self._risk
     
     def _generate_sample_incidents(self):
         incidents = []
@@ -104,8 +307,8 @@ class TPMDatabase:
                 "assigned_to": f"Engineer-{random.randint(1, 5)}"
             })
         
-        # Sort by timestamp (most recent first)
-        return sorted(incidents, key=lambda x: x["timestamp"], reverse=True)
+        # Sort by timestamp (most recent first), by time rather than by ISO spelling
+        return sorted(incidents, key=lambda x: parse_timestamp(x["timestamp"]), reverse=True)
     
     def _generate_sample_reports(self):
         reports = []
@@ -127,16 +330,165 @@ class TPMDatabase:
         
         return reports
     
+    def snapshot(self):
+        """The current immutable view of services and reports; safe to read without locks"""
+        return self._snapshots.current
+    
+    @property
+    def version(self):
+        """Changes on every mutation, including incident writes by other processes, so caches can tell"""
+        return f"{self._snapshots.current.version}.{self.incidents.version()}"
+    
+    @property
+    def services(self):
+        return self._snapshots.current.services
+    
+    @property
+    def services_by_name(self):
+        return self._snapshots.current.services_by_name
+    
+    @property
+    def executive_reports(self):
+        return self._snapshots.current.reports
+    
+    def add_report(self, report):
+        """Keep a generated report"""
+        report = freeze(report)
+        self._snapshots.publish(lambda snapshot: append_report(snapshot, report))
+        self.report_ids.observe(report["id"])
+        return report
+    
+    def create_report(self, fields):
+        """Keep a generated report under the next free id"""
+        return self.add_report({"id": self.report_ids.allocate(), **fields})
+    
+    def add_incident(self, incident):
+        """Store a new incident and count it in the running aggregates"""
+        with self._write_lock:
+            previous = self.incidents.version()
+            incident = self.incidents.add(incident)
+            # Applied in place when nobody else wrote meanwhile; otherwise the next read recounts
+            if self._only_writer(previous):
+                self._stats.add_incident(incident)
+                self._risk.add_incident(incident)
+                self._counted_version = previous + 1
+            self._snapshots.publish()
+        self.id_allocator.observe(incident["id"])
+        return incident
+    
+    def create_incident(self, fields):
+        """Store a new incident under the next free id"""
+        while True:
+            incident = {"id": self.id_allocator.allocate(), **fields}
+            try:
+                return self.add_incident(incident)
+            except DuplicateIncident:
+                # Id already written by another process sharing the store; try the next one
+                continue
+    
+    def update_incident(self, incident_id, **changes):
+        """Apply changes to an incident, keeping the aggregates in step"""
+        with self._write_lock:
+            previous = self.incidents.version()
+            incident = self.incidents.get(incident_id)
+            if incident is None:
+                return None
+            
+            updated = self.incidents.update(incident_id, **changes)
+            if updated is not None and self._only_writer(previous):
+                self._stats.update_incident(incident, changes)
+                self._risk.update_incident(incident, changes)
+                self._counted_version = previous + 1
+            self._snapshots.publish()
+            return updated
+    
+    def _replace_service(self, service_name, **changes):
+        # Callers hold the service's stripe; readers keep whichever snapshot they already had
+        service = freeze({**self.services_by_name[service_name], **changes})
+        position = self.service_positions[service_name]
+        self._snapshots.publish(lambda snapshot: replace_service(snapshot, position, service))
+        return service
+    
+    def _replace_service_health(self, service_name, health):
+        # Callers hold the service's stripe, so history is recorded in the order changes apply
+        service = self._replace_service(service_name, health=health)
+        self.metrics.record(service_name, "health", health)
+        return service
+    
+    def set_service_health(self, service_name, health):
+        """Set a service's health score, keeping the aggregates and history in step"""
+        if service_name not in self.services_by_name:
+            return None
+        
+        with self.service_locks.lock_for(service_name):
+            return self._replace_service_health(service_name, health)
+    
+    def adjust_service_health(self, service_name, delta, low=50, high=100):
+        """Move a service's health by delta within [low, high] as one atomic step"""
+        if service_name not in self.services_by_name:
+            return None
+        
+        with self.service_locks.lock_for(service_name):
+            health = self.services_by_name[service_name]["health"] + delta
+            return self._replace_service_health(service_name, max(low, min(high, health)))
+    
+    def record_service_sample(self, service_name, health, latency, error_rate, timestamp=None):
+        """Keep an observed reading of a service's metrics in the time-series store"""
+        timestamp = time.time() if timestamp is None else timestamp
+        self.metrics.record(service_name, "health", health, timestamp)
+        self.metrics.record(service_name, "latency", latency, timestamp)
+        self.metrics.record(service_name, "error_rate", error_rate, timestamp)
+    
+    def record_service_samples(self, timestamp=None):
+        """Record every service's stored metrics and computed health score (never simulated readings)"""
+        timestamp = time.time() if timestamp is None else timestamp
+        scores, _ = self.health_scores()
+        for service in self.snapshot().services:
+            self.record_service_sample(service["name"], service["health"], service["latency"],
+                                       service["error_rate"], timestamp)
+            self.metrics.record(service["name"], "health_score", scores[service["name"]], timestamp)
+    
+    # Ingested samples under this metric name are per-request latencies for the sketches
+    LATENCY_SAMPLE_METRIC = "request_latency_ms"
+    
+    def ingest_block(self, service_name, metric, timestamps, values):
+        """Append one validated block of samples to the metric stores, returning a mask of those kept"""
+        if metric == self.LATENCY_SAMPLE_METRIC:
+            return self.latency.record_batch(service_name, timestamps, values)
+        self.metrics.record_many(service_name, metric, timestamps, values)
+        return np.ones(len(values), dtype=bool)
+    
+    def health_scores(self):
+        """Composite health per service and for the platform, rescored only after a change"""
+        snapshot = self.snapshot()
+        version, services = snapshot.version, snapshot.services
+        if self._health_scores is None or self._health_scores[0] != version:
+            scores, platform_health = scoring_engine.score_services(services, snapshot.service_metrics)
+            by_service = {service["name"]: round(float(score), 1) for service, score in zip(services, scores)}
+            self._health_scores = (version, by_service, platform_health)
+        return self._health_scores[1], self._health_scores[2]
+    
     def calculate_platform_health(self):
         """Calculate overall platform health score"""
-        if not self.services:
-            return 100.0
-        
-        total_health = sum(service["health"] for service in self.services)
-        return round(total_health / len(self.services), 1)
+        return self.health_scores()[1]
     
     def get_program_risks(self):
-        """Get program risk analysis"""
+        """Get program risk analysis (computed once, programs are static)"""
+        if self._program_risks is None:
+            self._program_risks = freeze(self._build_program_risks())
+        return self._program_risks
+    
+    def get_program_risk_summary(self):
+        """Get the high-risk count and mean confidence across programs"""
+        risks = self.get_program_risks()
+        if not risks:
+            return 0, 0.0
+        
+        high_risk_count = sum(1 for p in risks if p["risk_level"] in ["High", "Critical"])
+        overall_confidence = round(sum(p["confidence_score"] for p in risks) / len(risks), 1)
+        return high_risk_count, overall_confidence
+    
+    def _build_program_risks(self):
         risks = []
         for program in self.programs:
             confidence = program["confidence"]
@@ -188,20 +540,15 @@ class TPM_AIAnalyzer:
         
         impact = severity_impact.get(incident_data["severity"], {"revenue_risk": "Unknown", "delay_days": "Unknown", "escalation": "Monitor"})
         
-        # Generate business impact summary
-        service_impacts = {
-            "auth-service": ["User signup", "Authentication", "All programs"],
-            "payment-service": ["Checkout", "Revenue", "E-commerce programs"],
-            "inventory-service": ["Product catalog", "Order management", "Retail programs"],
-            "notification-service": ["Alerts", "User engagement", "Mobile programs"]
-        }
-        
-        affected_programs = service_impacts.get(incident_data["service"], ["General platform"])
+        # Generate business impact summary from the shared dependency graph
+        program_impacts = db.dependencies.affected_programs(incident_data["service"])
+        affected_programs = [db.programs_by_id[program]["name"] for program, _ in program_impacts] or ["General platform"]
         
         return {
             "incident_id": incident_data["id"],
             "business_impact_summary": f"{incident_data['service']} incident may impact {', '.join(affected_programs[:2])}",
             "affected_programs": affected_programs,
+            "program_impact_weights": {program: round(weight, 2) for program, weight in program_impacts},
             "revenue_risk": impact["revenue_risk"],
             "estimated_delay_days": impact["delay_days"],
             "escalation_recommendation": impact["escalation"],
@@ -222,8 +569,8 @@ class TPM_AIAnalyzer:
         platform_health = db.calculate_platform_health()
         
         # Count incidents by severity
-        sev1_count = sum(1 for i in db.incidents if i["severity"] == "SEV1")
-        sev2_count = sum(1 for i in db.incidents if i["severity"] == "SEV2")
+        sev1_count = db.stats.severity_counts["SEV1"]
+        sev2_count = db.stats.severity_counts["SEV2"]
         
         # Get high risk programs
         high_risk_programs = [p for p in db.get_program_risks() if p["risk_level"] in ["High", "Critical"]]
@@ -233,10 +580,10 @@ class TPM_AIAnalyzer:
             "platform_health_score": platform_health,
             "platform_status": "Stable" if platform_health > 90 else "Degraded" if platform_health > 80 else "Critical",
             "incident_summary": {
-                "total": len(db.incidents),
+                "total": db.stats.incident_count,
                 "sev1": sev1_count,
                 "sev2": sev2_count,
-                "sev3": len(db.incidents) - sev1_count - sev2_count
+                "sev3": db.stats.incident_count - sev1_count - sev2_count
             },
             "high_risk_programs": [
                 {"name": p["program_name"], "risk": p["risk_level"]}
@@ -257,6 +604,124 @@ class TPM_AIAnalyzer:
 # Initialize AI analyzer
 ai_analyzer = TPM_AIAnalyzer()
 
+# LLM-backed analysis (SENTINEL_AI_MODE=llm); runs on the event loop without blocking other routes
+llm_analyzer = AsyncTPM_AIAnalyzer(
+    max_concurrency=int(os.getenv("SENTINEL_LLM_CONCURRENCY", "8")),
+    timeout=float(os.getenv("SENTINEL_LLM_TIMEOUT", "15")),
+    similarity_cache=IncidentSimilarityCache(threshold=float(os.getenv("SENTINEL_SIMILARITY_THRESHOLD", "0.8")))
+) if os.getenv("SENTINEL_AI_MODE") == "llm" else None
+
+# Cached AI responses: incident analyses keyed on id + content hash,
+# the executive summary keyed on the database version. Fallback analyses
+# from a failed LLM call are never cached, so the next request retries.
+AI_CACHE_TTL_SECONDS = float(os.getenv("SENTINEL_AI_CACHE_TTL", "300"))
+analysis_cache = TTLCache(maxsize=int(os.getenv("SENTINEL_AI_CACHE_SIZE", "1024")), ttl=AI_CACHE_TTL_SECONDS,
+                          cacheable=lambda analysis: not analysis.get("fallback"))
+summary_cache = TTLCache(maxsize=8, ttl=AI_CACHE_TTL_SECONDS)
+
+async def get_incident_analysis(incident: Dict) -> Dict:
+    """Analyze an incident, reusing the cached analysis while it is unchanged"""
+    if llm_analyzer is not None:
+        return await analysis_cache.get_or_compute_async(
+            incident["id"],
+            lambda: telemetry.timed_async("ai.llm.analyze_incident", llm_analyzer.analyze_incident)(incident),
+            version=content_hash(incident)
+        )
+    
+    return analysis_cache.get_or_compute(
+        incident["id"],
+        lambda: telemetry.timed("ai.analyze_incident", ai_analyzer.analyze_incident)(incident),
+        version=content_hash(incident)
+    )
+
+def get_executive_summary_cached() -> Dict:
+    """Generate the executive summary once per database version"""
+    return summary_cache.get_or_compute(
+        "executive-summary",
+        telemetry.timed("ai.executive_summary", ai_analyzer.generate_executive_summary),
+        version=db.version
+    )
+
+def invalidate_ai_cache(incident_id: Optional[str] = None):
+    """Drop cached AI responses affected by an incident change"""
+    if incident_id:
+        analysis_cache.invalidate(incident_id)
+    summary_cache.clear()
+
+# Batch analysis limits
+BATCH_MAX_INCIDENTS = int(os.getenv("SENTINEL_BATCH_MAX_INCIDENTS", "500"))
+BATCH_DEFAULT_WORKERS = int(os.getenv("SENTINEL_BATCH_WORKERS", "8"))
+BATCH_MAX_WORKERS = 32
+
+def member_analysis(incident: Dict, analysis: Dict) -> Dict:
+    """A group representative's analysis re-issued for another member, and cached under its id"""
+    analysis = {**analysis, "incident_id": incident["id"]}
+    analysis_cache.set(incident["id"], analysis, content_hash(incident))
+    return analysis
+
+async def analyze_incidents_batch(incidents: List[Dict], max_workers: int) -> AsyncIterator[Dict]:
+    """Analyze incidents concurrently, yielding results as each one completes
+    
+    Incidents with the same service/severity/description share one analysis.
+    With the LLM analyzer, uncached groups are packed several per request.
+    """
+    groups: Dict[tuple, List[Dict]] = {}
+    for incident in incidents:
+        groups.setdefault((incident["service"], incident["severity"], incident["description"]), []).append(incident)
+    
+    semaphore = asyncio.Semaphore(max_workers)
+    
+    async def run(group: List[Dict]):
+        async with semaphore:
+            # The simulated analyzer is synchronous; keep it off the event loop
+            analysis = await asyncio.to_thread(
+                analysis_cache.get_or_compute,
+                group[0]["id"],
+                lambda: telemetry.timed("ai.analyze_incident", ai_analyzer.analyze_incident)(group[0]),
+                content_hash(group[0])
+            )
+        return [(group, analysis)]
+    
+    async def run_pack(pack: List[List[Dict]]):
+        async with semaphore:
+            with telemetry.span("ai.llm.analyze_pack"):
+                analyses = await llm_analyzer.analyze_incidents([group[0] for group in pack])
+        for group, analysis in zip(pack, analyses):
+            analysis_cache.set(group[0]["id"], analysis, content_hash(group[0]))
+        return list(zip(pack, analyses))
+    
+    if llm_analyzer is None:
+        tasks = [asyncio.create_task(run(group)) for group in groups.values()]
+    else:
+        ready, pending = [], {}
+        for group in groups.values():
+            cached = analysis_cache.get(group[0]["id"], content_hash(group[0]))
+            if cached is not None:
+                ready.append((group, cached))
+            else:
+                pending[group[0]["id"]] = group
+        
+        packs = llm_analyzer.pack_incidents([group[0] for group in pending.values()])
+        tasks = [asyncio.create_task(run_pack([pending[key] for key, _ in pack])) for pack in packs]
+        if ready:
+            tasks.append(asyncio.create_task(asyncio.sleep(0, ready)))
+    
+    try:
+        for finished in asyncio.as_completed(tasks):
+            for group, analysis in await finished:
+                for incident in group:
+                    shared = incident is not group[0]
+                    yield {
+                        "incident_id": incident["id"],
+                        "status": "analyzed",
+                        "ai_analysis": member_analysis(incident, analysis) if shared else analysis,
+                        "shared_with": group[0]["id"] if shared else None
+                    }
+    finally:
+        # Client went away mid-stream: stop outstanding analyses
+        for task in tasks:
+            task.cancel()
+
 # API Endpoints
 @app.get("/")
 async def root():
@@ -271,9 +736,13 @@ async def root():
             "services": "/services - List all services",
             "incidents": "/incidents - Get recent incidents",
             "programs": "/programs/risks - Get program risk analysis",
+            "ingest": "POST /ingest/metrics - Bulk telemetry ingestion (NDJSON or binary columnar)",
+            "realtime": "/monitoring/realtime - Poll metrics; /monitoring/stream (SSE) or /monitoring/ws to subscribe",
             "ai": {
                 "analyze_incident": "/ai/incident/{incident_id} - AI analysis of incident",
-                "executive_summary": "/ai/executive-summary - Generate executive summary"
+                "analyze_batch": "POST /ai/incidents/analyze-batch - Streamed NDJSON analysis of many incidents",
+                "executive_summary": "/ai/executive-summary - Generate executive summary",
+                "cache_stats": "/ai/cache/stats - AI response cache counters"
             }
         }
     }
@@ -281,68 +750,203 @@ async def root():
 @app.get("/health")
 async def get_platform_health():
     """Get overall platform health status"""
+    service_scores, platform_health = db.health_scores()
+    
     return {
         "timestamp": datetime.now().isoformat(),
-        "platform_health": db.calculate_platform_health(),
-        "status": "healthy" if db.calculate_platform_health() > 90 else "degraded" if db.calculate_platform_health() > 80 else "critical",
-        "services_healthy": sum(1 for s in db.services if s["health"] > 90),
-        "services_total": len(db.services)
+        "platform_health": platform_health,
+        "status": "healthy" if platform_health > 90 else "degraded" if platform_health > 80 else "critical",
+        "services_healthy": sum(1 for score in service_scores.values() if score > scoring_engine.HEALTHY_THRESHOLD),
+        "services_total": len(service_scores)
     }
 
 @app.get("/services")
-async def get_services():
-    """Get all platform services with health metrics"""
-    return {
-        "timestamp": datetime.now().isoformat(),
-        "services": db.services,
-        "count": len(db.services)
-    }
+async def get_services(request: Request, limit: Optional[int] = None, cursor: Optional[str] = None,
+                       fields: Optional[str] = None):
+    """Get platform services with health metrics, ordered by id"""
+    after = cursor_key(cursor, int)
+    snapshot = db.snapshot()
+    services = snapshot.services
+    
+    def build():
+        # Services are kept in id order, so the cursor's id locates the page directly
+        start = 0 if after is None else bisect_right(services, after[0], key=lambda service: service["id"])
+        page, next_cursor = take_page(
+            (services[position] for position in range(start, len(services))), limit,
+            key=lambda service: (service["id"],)
+        )
+        return {
+            "timestamp": datetime.now().isoformat(),
+            "services": project(page, parse_fields(fields)),
+            "count": len(page),
+            "total": len(services),
+            "next_cursor": next_cursor
+        }
+    
+    return conditional_json.respond(request, snapshot.version, build)
 
 @app.get("/services/{service_name}")
 async def get_service_details(service_name: str):
     """Get detailed metrics for a specific service"""
-    service = next((s for s in db.services if s["name"] == service_name), None)
+    service = db.services_by_name.get(service_name)
     
     if not service:
         raise HTTPException(status_code=404, detail=f"Service '{service_name}' not found")
     
-    # Get recent incidents for this service
-    service_incidents = [i for i in db.incidents if i["service"] == service_name]
+    # Trend from recorded history; fall back to the current score until there is some
+    health_trend = db.metrics.trend(service_name, "health")
+    if health_trend is None:
+        health_trend = "improving" if service["health"] > 90 else "stable" if service["health"] > 85 else "declining"
     
     return {
         "service": service,
-        "recent_incidents": service_incidents[:5],  # Last 5 incidents
-        "incident_count": len(service_incidents),
-        "health_trend": "improving" if service["health"] > 90 else "stable" if service["health"] > 85 else "declining"
+        "recent_incidents": db.incidents.latest(5, service=service_name),  # Last 5 incidents
+        "incident_count": db.stats.service_incident_counts[service_name],
+        "health_trend": health_trend,
+        "latency_percentiles": {
+            "last_minute": db.latency.percentiles(service_name, 1),
+            "last_hour": db.latency.percentiles(service_name, 60)
+        }
     }
 
-@app.get("/incidents")
-async def get_incidents(limit: Optional[int] = 10, severity: Optional[str] = None):
-    """Get recent incidents"""
-    incidents = db.incidents
+@app.post("/services/{service_name}/latency")
+async def record_service_latency(service_name: str, samples: LatencySamples):
+    """Record per-request latency samples for a service"""
+    if service_name not in db.services_by_name:
+        raise HTTPException(status_code=404, detail=f"Service '{service_name}' not found")
+    
+    # Same finite-value and clock-skew checks as bulk ingestion
+    values = np.asarray(samples.samples_ms, dtype=np.float64)
+    timestamp = time.time() if samples.timestamp is None else samples.timestamp
+    block = ingest.MetricBlock(service_name, db.LATENCY_SAMPLE_METRIC, np.full(len(values), timestamp), values)
+    mask, _ = ingest.validate_block(block)
+    recorded = int(db.latency.record_batch(service_name, block.timestamps[mask], block.values[mask]).sum())
+    return {"service": service_name, "recorded": recorded, "rejected": len(values) - recorded}
+
+@app.get("/services/{service_name}/impact")
+async def get_service_impact(service_name: str):
+    """Programs and services a failure in this service would reach"""
+    if service_name not in db.services_by_name:
+        raise HTTPException(status_code=404, detail=f"Service '{service_name}' not found")
     
-    # Filter by severity if provided
-    if severity:
-        incidents = [i for i in incidents if i["severity"] == severity.upper()]
+    impact = db.dependencies.impact(service_name)
+    return {
+        "service": service_name,
+        "affected_programs": [
+            {"program_id": program, "program_name": db.programs_by_id[program]["name"], "weight": round(weight, 2)}
+            for program, weight in db.dependencies.affected_programs(service_name)
+        ],
+        "affected_services": {node: round(weight, 2) for node, weight in impact.items() if node in db.services_by_name}
+    }
+
+@app.get("/services/{service_name}/latency/sketch")
+async def export_latency_sketch(service_name: str, minutes: int = 1):
+    """Export the merged latency sketch so other workers or collectors can merge it"""
+    if service_name not in db.services_by_name:
+        raise HTTPException(status_code=404, detail=f"Service '{service_name}' not found")
     
-    # Apply limit
-    incidents = incidents[:limit]
+    return {"service": service_name, "window_minutes": minutes, "sketch": db.latency.merged(service_name, minutes).to_dict()}
+
+def parse_time(value: Optional[str], default: float) -> float:
+    """Parse an epoch-seconds or ISO-8601 query value"""
+    if value is None:
+        return default
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    try:
+        return datetime.fromisoformat(value).timestamp()
+    except ValueError:
+        raise HTTPException(status_code=422, detail=f"Invalid time '{value}'; use epoch seconds or ISO-8601")
+
+@app.get("/services/{service_name}/metrics")
+async def get_service_metrics(service_name: str, metric: Optional[str] = None,
+                              from_: Optional[str] = Query(None, alias="from"),
+                              to: Optional[str] = None, step: float = 60):
+    """Get recorded metric history for a service, aggregated into step-second points"""
+    if service_name not in db.services_by_name:
+        raise HTTPException(status_code=404, detail=f"Service '{service_name}' not found")
+    if step <= 0:
+        raise HTTPException(status_code=422, detail="step must be positive")
+    
+    end = parse_time(to, time.time())
+    start = parse_time(from_, end - 3600)
+    metrics = [metric] if metric else db.metrics.metrics_for(service_name)
     
     return {
-        "timestamp": datetime.now().isoformat(),
-        "incidents": incidents,
-        "count": len(incidents),
-        "by_severity": {
-            "SEV1": sum(1 for i in db.incidents if i["severity"] == "SEV1"),
-            "SEV2": sum(1 for i in db.incidents if i["severity"] == "SEV2"),
-            "SEV3": sum(1 for i in db.incidents if i["severity"] == "SEV3")
-        }
+        "service": service_name,
+        "from": start,
+        "to": end,
+        "step": step,
+        "series": {name: db.metrics.query(service_name, name, start, end, step) for name in metrics}
     }
 
+def parse_wall_time(value: Optional[str]) -> Optional[int]:
+    """Parse an epoch-seconds or ISO-8601 query value into wall-clock microseconds"""
+    if value is None:
+        return None
+    try:
+        return round(float(value) * 1_000_000) + local_offset_micros()
+    except (ValueError, OverflowError):
+        pass
+    try:
+        return parse_timestamp(value)
+    except ValueError:
+        raise HTTPException(status_code=422, detail=f"Invalid time '{value}'; use epoch seconds or ISO-8601")
+
+def cursor_key(cursor: Optional[str], *types: type) -> Optional[tuple]:
+    """Decode a request's cursor, rejecting malformed ones and keys not shaped like `types`"""
+    if cursor is None:
+        return None
+    try:
+        return decode_cursor(cursor, types or None)
+    except ValueError as error:
+        raise HTTPException(status_code=400, detail=str(error))
+
+@app.get("/incidents")
+async def get_incidents(request: Request, limit: Optional[int] = 10, severity: Optional[str] = None,
+                        service: Optional[str] = None, status: Optional[str] = None,
+                        cursor: Optional[str] = None, fields: Optional[str] = None,
+                        from_: Optional[str] = Query(None, alias="from"), to: Optional[str] = None):
+    """Get recent incidents, newest first, one keyset page at a time
+
+    `from` and `to` (epoch seconds or ISO-8601) limit results to [from, to).
+    """
+    before = cursor_key(cursor, str, str)
+    if before is not None:
+        try:
+            parse_timestamp(before[0])
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+    since, until = parse_wall_time(from_), parse_wall_time(to)
+    # Taken before reading the store: stored incidents are immutable, so the page is never torn
+    # and at worst includes writes newer than the version it is tagged with
+    version = db.version
+    
+    def build():
+        # Fetch one extra row to learn whether there is a next page
+        incidents = db.incidents.latest(
+            None if limit is None else max(limit, 0) + 1,
+            service=service, severity=severity.upper() if severity else None, status=status, before=before,
+            since=since, until=until
+        )
+        page, next_cursor = take_page(iter(incidents), limit, key=lambda incident: (incident["timestamp"], incident["id"]))
+        return {
+            "timestamp": datetime.now().isoformat(),
+            "incidents": project(page, parse_fields(fields)),
+            "count": len(page),
+            "next_cursor": next_cursor,
+            "total": db.stats.incident_count,
+            "by_severity": db.stats.by_severity()
+        }
+    
+    return conditional_json.respond(request, version, build)
+
 @app.get("/incidents/{incident_id}")
 async def get_incident_details(incident_id: str):
     """Get details for a specific incident"""
-    incident = next((i for i in db.incidents if i["id"] == incident_id), None)
+    incident = db.incidents.get(incident_id)
     
     if not incident:
         raise HTTPException(status_code=404, detail=f"Incident '{incident_id}' not found")
@@ -350,16 +954,15 @@ async def get_incident_details(incident_id: str):
     return {
         "incident": incident,
         "similar_incidents": [
-            i for i in db.incidents 
-            if i["service"] == incident["service"] and i["id"] != incident_id
+            i for i in db.incidents.latest(4, service=incident["service"])
+            if i["id"] != incident_id
         ][:3]  # Get 3 similar incidents
     }
 
 @app.post("/incidents")
 async def create_incident(incident: Incident):
     """Create a new incident (simulated)"""
-    new_incident = {
-        "id": f"INC-{1000 + len(db.incidents)}",
+    new_incident = db.create_incident({
         "service": incident.service,
         "severity": incident.severity,
         "timestamp": datetime.now().isoformat(),
@@ -367,22 +970,16 @@ async def create_incident(incident: Incident):
         "impact": incident.impact,
         "status": "new",
         "assigned_to": "Unassigned"
-    }
+    })
+    invalidate_ai_cache()
     
-    db.incidents.insert(0, new_incident)  # Add to beginning of list
-    
-    # Update service health based on incident severity
-    for service in db.services:
-        if service["name"] == incident.service:
-            # Reduce health based on severity
-            health_reduction = {
-                "SEV1": 15,
-                "SEV2": 8,
-                "SEV3": 3
-            }.get(incident.severity, 5)
-            
-            service["health"] = max(50, service["health"] - health_reduction)
-            break
+    # Reduce service health based on incident severity
+    health_reduction = {
+        "SEV1": 15,
+        "SEV2": 8,
+        "SEV3": 3
+    }.get(incident.severity, 5)
+    db.adjust_service_health(incident.service, -health_reduction, low=50)
     
     return {
         "message": "Incident created successfully",
@@ -393,19 +990,17 @@ async def create_incident(incident: Incident):
 @app.put("/incidents/{incident_id}/resolve")
 async def resolve_incident(incident_id: str):
     """Mark an incident as resolved"""
-    incident = next((i for i in db.incidents if i["id"] == incident_id), None)
+    incident = db.incidents.get(incident_id)
     
     if not incident:
         raise HTTPException(status_code=404, detail=f"Incident '{incident_id}' not found")
     
-    incident["status"] = "resolved"
-    incident["resolved_at"] = datetime.now().isoformat()
+    incident = db.update_incident(incident_id, status="resolved", resolved_at=datetime.now().isoformat())
     
-    # Improve service health after resolution
-    for service in db.services:
-        if service["name"] == incident["service"]:
-            service["health"] = min(100, service["health"] + 5)  # Small health improvement
-            break
+    # Small health improvement after resolution
+    db.adjust_service_health(incident["service"], 5, high=100)
+    
+    invalidate_ai_cache(incident_id)
     
     return {
         "message": f"Incident {incident_id} marked as resolved",
@@ -413,14 +1008,31 @@ async def resolve_incident(incident_id: str):
     }
 
 @app.get("/programs/risks")
-async def get_program_risks():
+async def get_program_risks(request: Request, limit: Optional[int] = None, cursor: Optional[str] = None,
+                            fields: Optional[str] = None):
     """Get program risk analysis"""
-    return {
-        "timestamp": datetime.now().isoformat(),
-        "program_risks": db.get_program_risks(),
-        "high_risk_count": sum(1 for p in db.get_program_risks() if p["risk_level"] in ["High", "Critical"]),
-        "overall_confidence": round(sum(p["confidence_score"] for p in db.get_program_risks()) / len(db.get_program_risks()), 1)
-    }
+    after = cursor_key(cursor, str)
+    if after is not None and after[0] not in db.program_positions:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    version = db.version
+    
+    def build():
+        high_risk_count, overall_confidence = db.get_program_risk_summary()
+        risks = db.get_program_risks()
+        start = 0 if after is None else db.program_positions[after[0]] + 1
+        page, next_cursor = take_page(
+            (risks[position] for position in range(start, len(risks))), limit,
+            key=lambda risk: (risk["program_id"],)
+        )
+        return {
+            "timestamp": datetime.now().isoformat(),
+            "program_risks": project(page, parse_fields(fields)),
+            "next_cursor": next_cursor,
+            "high_risk_count": high_risk_count,
+            "overall_confidence": overall_confidence
+        }
+    
+    return conditional_json.respond(request, version, build)
 
 @app.get("/programs/{program_id}")
 async def get_program_details(program_id: str):
@@ -430,74 +1042,221 @@ async def get_program_details(program_id: str):
     if not program:
         raise HTTPException(status_code=404, detail=f"Program '{program_id}' not found")
     
-    # Find related incidents (based on service-program mapping)
-    service_to_program = {
-        "auth-service": ["q4-launch", "ai-migration", "mobile-v2"],
-        "payment-service": ["q4-launch"],
-        "inventory-service": ["q4-launch", "data-lake"],
-        "notification-service": ["mobile-v2"],
-        "search-service": ["q4-launch", "data-lake"]
-    }
-    
-    related_services = [service for service, programs in service_to_program.items() if program_id in programs]
-    related_incidents = [i for i in db.incidents if i["service"] in related_services]
+    # Find related incidents through the service dependency graph
+    service_weights = db.dependencies.supporting_services(program_id)
+    related_services = sorted(service_weights, key=lambda service: (-service_weights[service], service))
+    weighted_incident_count = sum(
+        db.incidents.count(service=service) * weight for service, weight in service_weights.items()
+    )
     
     return {
         "program": program,
         "related_services": related_services,
-        "recent_incidents": related_incidents[:5],
+        "dependency_weights": {service: round(weight, 2) for service, weight in service_weights.items()},
+        "recent_incidents": db.incidents.latest_for_services(related_services, 5),
         "service_dependencies": len(related_services),
-        "incident_impact_score": min(100, len(related_incidents) * 10)  # Simple impact score
+        "incident_impact_score": min(100, round(weighted_incident_count * 10))  # Simple impact score
     }
 
 @app.get("/reports")
-async def get_reports(report_type: Optional[str] = None):
-    """Get executive reports"""
-    reports = db.executive_reports
+async def get_reports(request: Request, report_type: Optional[str] = None, limit: Optional[int] = None,
+                      cursor: Optional[str] = None, fields: Optional[str] = None):
+    """Get executive reports, newest first"""
+    before = cursor_key(cursor, str, str)
+    snapshot = db.snapshot()
     
-    if report_type:
-        reports = [r for r in reports if r["type"].lower() == report_type.lower()]
+    def build():
+        end = len(snapshot.report_keys) if before is None else bisect_left(snapshot.report_keys, before)
+        reports = (snapshot.reports[position] for position in range(end - 1, -1, -1))
+        if report_type:
+            reports = (r for r in reports if r["type"].lower() == report_type.lower())
+        page, next_cursor = take_page(reports, limit, key=lambda report: (report["generated_at"], report["id"]))
+        return {
+            "reports": project(page, parse_fields(fields)),
+            "count": len(page),
+            "next_cursor": next_cursor
+        }
     
-    return {
-        "reports": reports,
-        "count": len(reports)
-    }
+    return conditional_json.respond(request, snapshot.version, build)
 
-@app.post("/reports/generate")
-async def generate_report(title: str, report_type: str = "Monthly"):
-    """Generate a new executive report (simulated)"""
-    new_report = {
-        "id": f"REPORT-{len(db.executive_reports) + 1}",
+def compose_report(title: str, report_type: str) -> Dict:
+    """Assemble a report's fields from the current platform state"""
+    month_start, month_end = month_range(datetime.now())
+    return {
         "title": title,
         "type": report_type,
         "generated_at": datetime.now().isoformat(),
         "summary": f"{report_type} platform health report generated by Sentinel-AI",
         "key_metrics": {
             "platform_health": db.calculate_platform_health(),
-            "incident_count": len([i for i in db.incidents if datetime.fromisoformat(i["timestamp"]).month == datetime.now().month]),
+            "incident_count": db.incidents.count(since=month_start, until=month_end),
             "mttr_hours": random.uniform(1.5, 3.5),
             "sla_compliance": random.randint(97, 100),
-            "high_risk_programs": sum(1 for p in db.get_program_risks() if p["risk_level"] in ["High", "Critical"])
+            "high_risk_programs": db.get_program_risk_summary()[0]
         }
     }
+
+async def build_report(params: Dict) -> Dict:
+    """Report job body: compose off the event loop, summarise with the LLM when enabled, then store"""
+    fields = await asyncio.to_thread(compose_report, params["title"], params["report_type"])
+    if llm_analyzer is not None:
+        month_start, month_end = month_range(datetime.now())
+        fields["summary"] = await telemetry.timed_async("ai.llm.executive_summary", llm_analyzer.generate_exec_summary)({
+            "health": fields["key_metrics"]["platform_health"],
+            "services": db.services,
+            "incident_count": db.incidents.count(since=month_start, until=month_end),
+        })
+    return db.create_report(fields)
+
+# Reports are built by a small worker pool; identical in-flight requests share one job
+report_jobs = ReportJobQueue(
+    build_report,
+    workers=int(os.getenv("SENTINEL_REPORT_WORKERS", "2")),
+    max_pending=int(os.getenv("SENTINEL_REPORT_QUEUE_SIZE", "64")),
+    retain=int(os.getenv("SENTINEL_REPORT_JOBS_RETAINED", "256"))
+)
+telemetry.registry.gauge("sentinel_report_jobs_pending", "Report jobs waiting for a worker",
+                         callback=lambda: report_jobs.pending)
+telemetry.registry.gauge("sentinel_report_jobs_running", "Report jobs being built",
+                         callback=lambda: report_jobs.running)
+
+def job_links(job_id: str) -> Dict:
+    return {"status": f"/reports/jobs/{job_id}", "events": f"/reports/jobs/{job_id}/events"}
+
+@app.post("/reports/generate", status_code=202)
+async def generate_report(response: Response, title: str, report_type: str = "Monthly"):
+    """Queue an executive report; poll the job or subscribe to its events for the result"""
+    try:
+        job, coalesced = report_jobs.submit({"title": title, "report_type": report_type})
+    except QueueFull as error:
+        raise HTTPException(status_code=503, detail=str(error), headers={"Retry-After": "5"})
     
-    db.executive_reports.insert(0, new_report)
-    
+    response.headers["Location"] = job_links(job.id)["status"]
     return {
-        "message": "Report generated successfully",
-        "report": new_report
+        "message": "Report generation joined an identical request" if coalesced else "Report generation queued",
+        "job": job.to_dict(),
+        "coalesced": coalesced,
+        "links": job_links(job.id)
     }
 
+@app.get("/reports/jobs/stats")
+async def get_report_job_stats():
+    """Get worker, queue and outcome counters for report jobs"""
+    return report_jobs.stats()
+
+@app.get("/reports/jobs/{job_id}")
+async def get_report_job(job_id: str):
+    """Get a report job's status, with the report once it has succeeded"""
+    job = report_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Report job '{job_id}' not found")
+    
+    return {"job": job.to_dict(), "links": job_links(job.id)}
+
+@app.get("/reports/jobs/{job_id}/events")
+async def stream_report_job(job_id: str):
+    """Server-Sent Events: the job's current state, then each change until it finishes"""
+    job = report_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Report job '{job_id}' not found")
+    watcher = job.watch()
+    
+    async def events():
+        try:
+            while True:
+                state = await watcher.get()
+                yield f"event: {state['status']}\ndata: {json.dumps(state)}\n\n"
+                if state["status"] in job.TERMINAL:
+                    return
+        finally:
+            job.unwatch(watcher)
+    
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@app.get("/reports/{report_id}")
+async def get_report(report_id: str):
+    """Get a stored report by id"""
+    report = db.snapshot().reports_by_id.get(report_id)
+    if report is None:
+        raise HTTPException(status_code=404, detail=f"Report '{report_id}' not found")
+    
+    return {"report": report}
+
+# Telemetry Ingestion
+# Each new (service, metric) series costs a fixed ring buffer, so ingestion is
+# limited to inventory services, a total series count and a payload size
+INGEST_MAX_BYTES = int(os.getenv("SENTINEL_INGEST_MAX_BYTES", str(8 * 1024 * 1024)))
+INGEST_MAX_SERIES = int(os.getenv("SENTINEL_INGEST_MAX_SERIES", "1024"))
+
+async def read_body(request: Request, limit: int) -> bytes:
+    """The request body, or 413 once it grows past limit bytes"""
+    declared = request.headers.get("content-length")
+    if declared is not None and declared.isdigit() and int(declared) > limit:
+        raise HTTPException(status_code=413, detail=f"Payload exceeds {limit} bytes")
+    
+    chunks, size = [], 0
+    async for chunk in request.stream():
+        size += len(chunk)
+        if size > limit:
+            raise HTTPException(status_code=413, detail=f"Payload exceeds {limit} bytes")
+        chunks.append(chunk)
+    return b"".join(chunks)
+
+def ingest_rejection(block: ingest.MetricBlock) -> str:
+    """Why a well-formed block cannot be stored, or "" when it can"""
+    if block.service not in db.services_by_name:
+        return f"unknown service '{block.service}'"
+    if block.metric != db.LATENCY_SAMPLE_METRIC and (block.service, block.metric) not in db.metrics \
+            and len(db.metrics) >= INGEST_MAX_SERIES:
+        return f"series limit of {INGEST_MAX_SERIES} reached"
+    return ""
+
+@app.post("/ingest/metrics")
+async def ingest_metrics(request: Request, response: Response):
+    """Bulk-ingest columnar metric blocks (NDJSON or the binary format in ingest.py)
+    
+    Rejected blocks are listed in the acknowledgement; when nothing at all
+    could be stored the answer is 422.
+    """
+    body = await read_body(request, INGEST_MAX_BYTES)
+    try:
+        blocks = ingest.parse_payload(body, request.headers.get("content-type", ""))
+    except ingest.IngestError as error:
+        status = 415 if "content type" in str(error) else 400
+        raise HTTPException(status_code=status, detail=str(error))
+    
+    now = time.time()
+    masks, errors = [], []
+    for index, block in enumerate(blocks):
+        mask, reason = ingest.validate_block(block, now)
+        if not reason:
+            reason = ingest_rejection(block)
+            if reason:
+                mask = np.zeros(len(block.values), dtype=bool)
+        if reason:
+            errors.append({"block": index, "service": block.service, "metric": block.metric, "error": reason})
+        elif mask.all():
+            mask = db.ingest_block(block.service, block.metric, block.timestamps, block.values)
+        elif mask.any():
+            mask[mask] = db.ingest_block(block.service, block.metric, block.timestamps[mask], block.values[mask])
+        masks.append(mask)
+    
+    summary = ingest.summarize(blocks, masks, errors)
+    if errors and not summary["accepted"]:
+        response.status_code = 422
+    return summary
+
 # AI Analysis Endpoints
 @app.get("/ai/incident/{incident_id}")
 async def analyze_incident_with_ai(incident_id: str):
     """Get AI-powered analysis of an incident"""
-    incident = next((i for i in db.incidents if i["id"] == incident_id), None)
+    incident = db.incidents.get(incident_id)
     
     if not incident:
         raise HTTPException(status_code=404, detail=f"Incident '{incident_id}' not found")
     
-    analysis = ai_analyzer.analyze_incident(incident)
+    analysis = await get_incident_analysis(incident)
     
     return {
         "incident": incident,
@@ -505,10 +1264,33 @@ async def analyze_incident_with_ai(incident_id: str):
         "analysis_timestamp": datetime.now().isoformat()
     }
 
+@app.post("/ai/incidents/analyze-batch")
+async def analyze_incidents_batch_with_ai(request: BatchAnalysisRequest):
+    """Analyze many incidents at once, streaming NDJSON results as they complete"""
+    incident_ids = list(dict.fromkeys(request.incident_ids))  # Drop repeated ids, keep order
+    
+    if not incident_ids:
+        raise HTTPException(status_code=422, detail="incident_ids must not be empty")
+    if len(incident_ids) > BATCH_MAX_INCIDENTS:
+        raise HTTPException(status_code=422, detail=f"At most {BATCH_MAX_INCIDENTS} incidents per batch")
+    
+    max_workers = max(1, min(request.max_workers or BATCH_DEFAULT_WORKERS, BATCH_MAX_WORKERS))
+    incidents = [db.incidents.get(incident_id) for incident_id in incident_ids]
+    missing = [incident_id for incident_id, incident in zip(incident_ids, incidents) if incident is None]
+    found = [incident for incident in incidents if incident is not None]
+    
+    async def stream():
+        for incident_id in missing:
+            yield json.dumps({"incident_id": incident_id, "status": "not_found"}) + "\n"
+        async for result in analyze_incidents_batch(found, max_workers):
+            yield json.dumps(result) + "\n"
+    
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
 @app.get("/ai/executive-summary")
 async def get_executive_summary():
     """Get AI-generated executive summary"""
-    summary = ai_analyzer.generate_executive_summary()
+    summary = get_executive_summary_cached()
     
     return {
         "summary": summary,
@@ -516,32 +1298,31 @@ async def get_executive_summary():
         "source": "Sentinel-AI TPM Intelligence"
     }
 
+@app.get("/ai/cache/stats")
+async def get_ai_cache_stats():
+    """Get hit/miss counters for the AI response caches"""
+    return {
+        "timestamp": datetime.now().isoformat(),
+        "incident_analysis": analysis_cache.stats(),
+        "executive_summary": summary_cache.stats(),
+        "similar_incidents": llm_analyzer.similarity_cache.stats() if llm_analyzer is not None else None
+    }
+
 @app.get("/ai/risk-prediction")
 async def predict_risks(lookahead_days: int = 30):
     """Predict risks for the next N days"""
     
-    # Simple prediction based on historical data
-    recent_incidents = [i for i in db.incidents 
-                       if datetime.fromisoformat(i["timestamp"]) > datetime.now() - timedelta(days=30)]
-    
-    incidents_per_day = len(recent_incidents) / 30
-    predicted_incidents = int(incidents_per_day * lookahead_days)
-    
-    # Identify services at risk
-    service_incident_counts = {}
-    for incident in recent_incidents:
-        service_incident_counts[incident["service"]] = service_incident_counts.get(incident["service"], 0) + 1
-    
-    high_risk_services = [
-        service for service, count in service_incident_counts.items()
-        if count > 2  # More than 2 incidents in last 30 days
-    ]
+    # Exponentially weighted per-service incident rates, maintained on every incident change
+    prediction = db.risk.predict(lookahead_days)
+    predicted_incidents = int(prediction["predicted_incidents"])
+    high_risk_services = prediction["high_risk_services"]
     
     return {
         "prediction_period_days": lookahead_days,
         "predicted_incidents": predicted_incidents,
-        "predicted_sev1_incidents": max(0, int(predicted_incidents * 0.1)),  # Assume 10% are SEV1
+        "predicted_sev1_incidents": int(prediction["predicted_sev1_incidents"]),
         "high_risk_services": high_risk_services,
+        "service_risks": prediction["service_risks"],
         "confidence_score": 0.75,  # Prediction confidence
         "recommendations": [
             f"Increase monitoring for: {', '.join(high_risk_services[:3])}" if high_risk_services else "No high-risk services identified",
@@ -551,30 +1332,44 @@ async def predict_risks(lookahead_days: int = 30):
     }
 
 # Real-time Monitoring Endpoint
-@app.get("/monitoring/realtime")
-async def get_realtime_metrics():
-    """Get real-time platform metrics (simulated)"""
+def build_realtime_metrics():
+    """Build one real-time metrics payload (simulated)"""
+    
+    # Add some random variation to every service's reading to simulate real-time data (display only, never recorded)
+    snapshot = db.snapshot()
+    services, metrics = snapshot.services, snapshot.service_metrics
+    count = len(services)
+    readings = {
+        **metrics,
+        "health": np.clip(metrics["health"] + np.random.uniform(-5, 5, count), 50, 100),
+        "latency": np.maximum(10, metrics["latency"] + np.random.randint(-20, 21, count)),
+        "error_rate": np.maximum(0, metrics["error_rate"] + np.random.uniform(-0.1, 0.1, count))
+    }
+    
+    # Composite health for every service and the platform in one vectorized pass
+    scores, overall_health = scoring_engine.score_services(services, readings)
     
-    # Generate simulated real-time metrics
     realtime_metrics = []
-    for service in db.services:
-        # Add some random variation to simulate real-time data
-        current_health = max(50, min(100, service["health"] + random.uniform(-5, 5)))
-        current_latency = max(10, service["latency"] + random.randint(-20, 20))
-        current_errors = max(0, service["error_rate"] + random.uniform(-0.1, 0.1))
+    for index, service in enumerate(services):
+        current_health = round(float(scores[index]), 1)
+        current_latency = int(readings["latency"][index])
+        current_errors = float(readings["error_rate"][index])
+        
+        # Percentiles come only from ingested or reported request latencies; None until there are some
+        percentiles = db.latency.percentiles(service["name"], 1)
         
         realtime_metrics.append({
             "service": service["name"],
-            "health": round(current_health, 1),
+            "health": current_health,
             "latency_ms": current_latency,
+            "latency_p50_ms": percentiles["p50"],
+            "latency_p95_ms": percentiles["p95"],
+            "latency_p99_ms": percentiles["p99"],
             "error_rate": round(current_errors, 3),
             "status": "healthy" if current_health > 90 else "degraded" if current_health > 80 else "critical",
             "last_updated": datetime.now().isoformat()
         })
     
-    # Calculate overall platform health
-    overall_health = round(sum(m["health"] for m in realtime_metrics) / len(realtime_metrics), 1)
-    
     return {
         "timestamp": datetime.now().isoformat(),
         "platform_health": overall_health,
@@ -588,6 +1383,69 @@ async def get_realtime_metrics():
         ] if overall_health < 90 else []
     }
 
+def build_stream_snapshot():
+    """Real-time payload keyed by service, the shape streamed deltas are computed on"""
+    payload = build_realtime_metrics()
+    payload["metrics"] = {
+        metric["service"]: {field: value for field, value in metric.items() if field not in ("service", "last_updated")}
+        for metric in payload["metrics"]
+    }
+    return payload
+
+async def sample_service_metrics():
+    """Background sampler so metric history accrues even when nobody is polling"""
+    interval = float(os.getenv("SENTINEL_SAMPLE_INTERVAL", "10"))
+    while True:
+        db.record_service_samples()
+        await asyncio.sleep(interval)
+
+# One producer shared by every streaming client
+metrics_broadcaster = MetricsBroadcaster(
+    build_stream_snapshot,
+    interval=float(os.getenv("SENTINEL_STREAM_INTERVAL", "5")),
+    queue_size=int(os.getenv("SENTINEL_STREAM_QUEUE_SIZE", "16"))
+)
+
+@app.get("/monitoring/realtime")
+async def get_realtime_metrics():
+    """Get real-time platform metrics (simulated)"""
+    return build_realtime_metrics()
+
+@app.get("/monitoring/stream")
+async def stream_realtime_metrics():
+    """Server-Sent Events: a full snapshot, then per-tick deltas"""
+    subscription = metrics_broadcaster.subscribe()
+    
+    async def events():
+        try:
+            while True:
+                message = await subscription.get()
+                yield f"event: {message['type']}\ndata: {json.dumps(message['data'])}\n\n"
+        finally:
+            metrics_broadcaster.unsubscribe(subscription)
+    
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@app.websocket("/monitoring/ws")
+async def realtime_metrics_websocket(websocket: WebSocket):
+    """WebSocket: a full snapshot, then per-tick deltas"""
+    await websocket.accept()
+    subscription = metrics_broadcaster.subscribe()
+    
+    try:
+        while True:
+            await websocket.send_json(await subscription.get())
+    except WebSocketDisconnect:
+        pass
+    finally:
+        metrics_broadcaster.unsubscribe(subscription)
+
+@app.get("/monitoring/stream/stats")
+async def get_stream_stats():
+    """Get subscriber and tick counters for the metrics stream"""
+    return metrics_broadcaster.stats()
+
 # Health Check Endpoint
 @app.get("/health/check")
 async def health_check():
@@ -601,9 +1459,15 @@ async def health_check():
             "ai_engine": "operational"
         },
         "version": "1.0.0",
-        "uptime": "0 days 0 hours 0 minutes"  # In production, calculate actual uptime
+        "uptime": telemetry.format_uptime(telemetry.uptime_seconds()),
+        "uptime_seconds": round(telemetry.uptime_seconds(), 1)
     }
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """Prometheus exposition of request, span and process metrics"""
+    return PlainTextResponse(telemetry.registry.render(), media_type=telemetry.Registry.CONTENT_TYPE)
+
 # Run the server
 if __name__ == "__main__":
     import uvicorn
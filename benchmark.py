@@ -0,0 +1,461 @@
+# benchmark.py - Offline load test for the TPM API and analyzer
+#
+# Seeds TPMDatabase with synthetic data, drives every endpoint in-process at a
+# fixed concurrency through httpx's ASGI transport, and reports throughput and
+# P50/P95/P99 latency. Report jobs are timed from submission until they finish;
+# SSE and WebSocket streams are timed to their first event. Results can be saved as a baseline and later runs fail
+# when they regress past a tolerance.
+#
+#   python benchmark.py --preset medium --concurrency 100 --save-baseline baseline.json
+#   python benchmark.py --preset medium --baseline baseline.json --p95-budget-ms 200
+
+import os
+
+# Always benchmark the simulated analyzer: no network, no API key
+os.environ["SENTINEL_AI_MODE"] = "simulated"
+os.environ.setdefault("SENTINEL_DATABASE_URL", "memory://")
+
+import argparse
+
+import asyncio
+
+import json
+
+import random
+
+import sys
+
+import time
+
+from datetime import datetime
+
+from typing import Callable, Dict, List, Optional, Tuple
+
+import httpx
+
+import numpy as np
+
+import api
+
+PRESETS = {
+    "small": {"incidents": 1_000, "services": 10, "programs": 4},
+    "medium": {"incidents": 100_000, "services": 1_000, "programs": 50},
+    "large": {"incidents": 1_000_000, "services": 10_000, "programs": 200},
+}
+
+TIERS = ("tier1", "tier2", "tier3")
+SEVERITIES = ("SEV1", "SEV2", "SEV3")
+STATUSES = ("resolved", "investigating", "mitigated")
+DESCRIPTIONS = (
+    "Latency spike above threshold",
+    "Increased error rates",
+    "Service timeout failures",
+    "Database connection pool exhausted",
+    "Cache miss storm detected",
+)
+
+
+def synthetic_platform(incidents: int, services: int, programs: int, days: int = 60, seed: int = 7) -> Dict:
+    """Services, incidents and dependency edges shaped like the demo data, at any size"""
+    rng = np.random.default_rng(seed)
+    names = [f"svc-{i:05d}" for i in range(services)]
+    service_rows = [
+        {"id": i + 1, "name": name, "type": TIERS[int(tier)], "health": int(health),
+         "latency": int(latency), "error_rate": round(float(error_rate), 2)}
+        for i, (name, tier, health, latency, error_rate) in enumerate(zip(
+            names, rng.integers(0, 3, services), rng.integers(75, 100, services),
+            rng.integers(20, 400, services), rng.uniform(0, 2, services)))
+    ]
+
+    # Each service depends on up to two lower-numbered services, so the graph is acyclic
+    service_edges = [
+        (names[i], names[int(target)], round(float(weight), 2))
+        for i in range(1, services)
+        for target, weight in zip(rng.integers(0, i, min(i, 2)), rng.uniform(0.3, 1.0, 2))
+    ]
+    program_ids = [f"prog-{j:03d}" for j in range(programs)]
+    program_edges = [
+        (program, names[int(target)], 1.0)
+        for program in program_ids
+        for target in set(rng.integers(0, services, min(services, 5)).tolist())
+    ]
+
+    now = np.datetime64(datetime.now(), "us")
+    offsets = rng.integers(0, days * 86400 * 10**6, incidents).astype("timedelta64[us]")
+    timestamps = np.datetime_as_string(now - offsets, unit="us")
+    service_picks = rng.integers(0, services, incidents)
+    severity_picks = rng.choice(3, incidents, p=(0.1, 0.3, 0.6))
+    status_picks = rng.integers(0, 3, incidents)
+    description_picks = rng.integers(0, len(DESCRIPTIONS), incidents)
+    incident_rows = [
+        {"id": f"INC-{1000 + i}", "service": names[service], "severity": SEVERITIES[severity],
+         "timestamp": str(timestamp), "description": DESCRIPTIONS[description],
+         "status": STATUSES[status], "impact": "Synthetic benchmark incident",
+         "assigned_to": f"Engineer-{i % 5 + 1}"}
+        for i, (service, severity, timestamp, description, status) in enumerate(zip(
+            service_picks.tolist(), severity_picks.tolist(), timestamps.tolist(),
+            description_picks.tolist(), status_picks.tolist()))
+    ]
+
+    return {
+        "services": service_rows,
+        "incidents": incident_rows,
+        "service_dependencies": service_edges,
+        "program_ids": program_ids,
+        "program_dependencies": program_edges,
+    }
+
+
+def install_database(platform: Dict) -> api.TPMDatabase:
+    """Swap api.db for a database holding the synthetic platform"""
+    database = api.TPMDatabase(
+        "memory://",
+        services=platform["services"],
+        incidents=platform["incidents"],
+        service_dependencies=platform["service_dependencies"],
+        program_dependencies=platform["program_dependencies"],
+    )
+    database.programs = [
+        {"id": program, "name": f"Program {program}", "confidence": 60 + (position * 7) % 40,
+         "risk": "Medium", "owner": "Benchmark TPM"}
+        for position, program in enumerate(platform["program_ids"])
+    ]
+    database.programs_by_id = {program["id"]: program for program in database.programs}
+    database.program_positions = {program["id"]: position for position, program in enumerate(database.programs)}
+    database.dependencies.warm()
+
+    api.db = database
+    api.analysis_cache.clear()
+    api.summary_cache.clear()
+    return database
+
+
+# (name, method, request builder) - builders return (path, keyword arguments for httpx)
+RequestBuilder = Callable[[random.Random], Tuple[str, Dict]]
+
+# A FLOW scenario's builder is an async (client, rng) -> (status, seconds) callable that times itself
+FLOW = "FLOW"
+JOB_POLL_SECONDS = 0.005
+STREAM_TIMEOUT_SECONDS = 10.0
+
+
+async def first_message(scope_type: str, path: str) -> Tuple[int, float]:
+    """Drive a streaming endpoint directly over ASGI until its first message, then disconnect
+
+    httpx's ASGI transport buffers the whole response, which never ends for
+    a stream, so SSE and WebSocket endpoints are called without it.
+    """
+    scope = {
+        "type": scope_type, "asgi": {"version": "3.0"}, "http_version": "1.1", "scheme": "http",
+        "path": path, "raw_path": path.encode("ascii"), "query_string": b"", "root_path": "",
+        "headers": [(b"host", b"benchmark")], "client": ("127.0.0.1", 1), "server": ("benchmark", 80),
+    }
+    if scope_type == "http":
+        scope["method"] = "GET"
+        opening, closing = {"type": "http.request", "body": b"", "more_body": False}, {"type": "http.disconnect"}
+    else:
+        scope["subprotocols"] = []
+        opening, closing = {"type": "websocket.connect"}, {"type": "websocket.disconnect", "code": 1000}
+    opened, disconnected = False, asyncio.Event()
+    loop = asyncio.get_running_loop()
+    first = loop.create_future()
+    status = 200
+
+    async def receive():
+        nonlocal opened
+        if not opened:
+            opened = True
+            return opening
+        await disconnected.wait()
+        return closing
+
+    async def send(message):
+        nonlocal status
+        kind = message["type"]
+        if kind == "http.response.start":
+            status = message["status"]
+        elif kind == "websocket.close":
+            status = 403
+        if first.done():
+            return
+        if (kind == "http.response.body" and message.get("body")) or kind == "websocket.send" \
+                or kind == "websocket.close" or (kind == "http.response.body" and not message.get("more_body")):
+            first.set_result(time.perf_counter())
+
+    start = time.perf_counter()
+    task = asyncio.create_task(api.app(scope, receive, send))
+    try:
+        arrived = await asyncio.wait_for(asyncio.shield(first), STREAM_TIMEOUT_SECONDS)
+    except asyncio.TimeoutError:
+        status, arrived = 504, time.perf_counter()
+    disconnected.set()
+    # A WebSocket handler only sees the disconnect on its next send, so stop it rather than wait a tick
+    await asyncio.sleep(0)
+    task.cancel()
+    try:
+        await task
+    except asyncio.CancelledError:
+        pass
+    except Exception:
+        status = 500
+    return status, arrived - start
+
+
+async def submit_report(client: httpx.AsyncClient, rng: random.Random) -> Tuple[int, Optional[str]]:
+    # A few distinct titles, so concurrent submissions also exercise coalescing
+    response = await client.post("/reports/generate", params={"title": f"Benchmark {rng.randrange(8)}"})
+    return response.status_code, response.json()["job"]["id"] if response.status_code == 202 else None
+
+
+async def report_job_flow(client: httpx.AsyncClient, rng: random.Random) -> Tuple[int, float]:
+    """Submit a report and poll its job until it finishes"""
+    start = time.perf_counter()
+    status, job_id = await submit_report(client, rng)
+    while job_id is not None:
+        response = await client.get(f"/reports/jobs/{job_id}")
+        if response.status_code != 200:
+            status = response.status_code
+            break
+        job = response.json()["job"]
+        if job["status"] == "succeeded":
+            break
+        if job["status"] == "failed":
+            status = 500
+            break
+        await asyncio.sleep(JOB_POLL_SECONDS)
+    return status, time.perf_counter() - start
+
+
+async def report_events_flow(client: httpx.AsyncClient, rng: random.Random) -> Tuple[int, float]:
+    """Submit a report (untimed), then time its SSE stream to the first event"""
+    status, job_id = await submit_report(client, rng)
+    if job_id is None:
+        return status, 0.0
+    return await first_message("http", f"/reports/jobs/{job_id}/events")
+
+
+async def realtime_stream_flow(client: httpx.AsyncClient, rng: random.Random) -> Tuple[int, float]:
+    return await first_message("http", "/monitoring/stream")
+
+
+async def realtime_websocket_flow(client: httpx.AsyncClient, rng: random.Random) -> Tuple[int, float]:
+    return await first_message("websocket", "/monitoring/ws")
+
+
+def scenarios(platform: Dict) -> List[Tuple[str, str, RequestBuilder]]:
+    services = [service["name"] for service in platform["services"]]
+    incident_ids = [incident["id"] for incident in platform["incidents"]]
+    programs = platform["program_ids"]
+    ndjson = (json.dumps({"service": services[0], "metric": "request_latency_ms",
+                          "timestamps": [time.time()] * 50, "values": list(range(50))}) + "\n").encode("utf-8")
+
+    return [
+        ("GET /", "GET", lambda rng: ("/", {})),
+        ("GET /health", "GET", lambda rng: ("/health", {})),
+        ("GET /health/check", "GET", lambda rng: ("/health/check", {})),
+        ("GET /services", "GET", lambda rng: ("/services", {"params": {"limit": 100}})),
+        ("GET /services/{name}", "GET", lambda rng: (f"/services/{rng.choice(services)}", {})),
+        ("GET /services/{name}/impact", "GET", lambda rng: (f"/services/{rng.choice(services)}/impact", {})),
+        ("GET /services/{name}/metrics", "GET", lambda rng: (f"/services/{rng.choice(services)}/metrics", {})),
+        ("POST /services/{name}/latency", "POST", lambda rng: (
+            f"/services/{rng.choice(services)}/latency", {"json": {"samples_ms": [rng.uniform(10, 300) for _ in range(20)]}})),
+        ("GET /incidents", "GET", lambda rng: ("/incidents", {"params": {"limit": 20}})),
+        ("GET /incidents?severity", "GET", lambda rng: ("/incidents", {"params": {"limit": 20, "severity": rng.choice(SEVERITIES)}})),
+        ("GET /incidents/{id}", "GET", lambda rng: (f"/incidents/{rng.choice(incident_ids)}", {})),
+        ("POST /incidents", "POST", lambda rng: ("/incidents", {"json": {
+            "service": rng.choice(services), "severity": rng.choice(SEVERITIES),
+            "description": rng.choice(DESCRIPTIONS), "impact": "Benchmark"}})),
+        ("PUT /incidents/{id}/resolve", "PUT", lambda rng: (f"/incidents/{rng.choice(incident_ids)}/resolve", {})),
+        ("GET /programs/risks", "GET", lambda rng: ("/programs/risks", {})),
+        ("GET /programs/{id}", "GET", lambda rng: (f"/programs/{rng.choice(programs)}", {})),
+        ("GET /reports", "GET", lambda rng: ("/reports", {})),
+        ("POST /ingest/metrics", "POST", lambda rng: ("/ingest/metrics", {
+            "content": ndjson, "headers": {"Content-Type": "application/x-ndjson"}})),
+        ("GET /ai/incident/{id}", "GET", lambda rng: (f"/ai/incident/{rng.choice(incident_ids)}", {})),
+        ("POST /ai/incidents/analyze-batch", "POST", lambda rng: ("/ai/incidents/analyze-batch", {
+            "json": {"incident_ids": rng.sample(incident_ids, min(20, len(incident_ids)))}})),
+        ("GET /ai/executive-summary", "GET", lambda rng: ("/ai/executive-summary", {})),
+        ("GET /ai/risk-prediction", "GET", lambda rng: ("/ai/risk-prediction", {"params": {"lookahead_days": rng.choice((7, 30, 90))}})),
+        ("GET /reports/{id}", "GET", lambda rng: (f"/reports/REPORT-{rng.randint(1, 3)}", {})),
+        ("POST /reports/generate", "POST", lambda rng: ("/reports/generate", {"params": {"title": f"Benchmark {rng.randrange(8)}"}})),
+        ("report job: submit -> done", FLOW, report_job_flow),
+        ("GET /reports/jobs/stats", "GET", lambda rng: ("/reports/jobs/stats", {})),
+        ("SSE /reports/jobs/{id}/events", FLOW, report_events_flow),
+        ("GET /monitoring/realtime", "GET", lambda rng: ("/monitoring/realtime", {})),
+        ("SSE /monitoring/stream", FLOW, realtime_stream_flow),
+        ("WS /monitoring/ws", FLOW, realtime_websocket_flow),
+        ("GET /monitoring/stream/stats", "GET", lambda rng: ("/monitoring/stream/stats", {})),
+        ("GET /metrics", "GET", lambda rng: ("/metrics", {})),
+    ]
+
+
+def summarize(latencies: List[float], elapsed: float, errors: int) -> Dict:
+    values = np.asarray(latencies) * 1000
+    p50, p95, p99 = np.percentile(values, (50, 95, 99)) if len(values) else (0.0, 0.0, 0.0)
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "throughput_rps": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": round(float(p50), 2),
+        "p95_ms": round(float(p95), 2),
+        "p99_ms": round(float(p99), 2),
+    }
+
+
+async def run_endpoint(client: httpx.AsyncClient, method: str, builder: RequestBuilder,
+                       requests: int, concurrency: int, seed: int) -> Dict:
+    """Issue `requests` requests (or flows) with `concurrency` workers and collect latencies"""
+    rng = random.Random(seed)
+    if method == FLOW:
+        planned = [random.Random(rng.random()) for _ in range(requests)]
+    else:
+        planned = [builder(rng) for _ in range(requests)]
+    latencies: List[float] = []
+    errors = 0
+    position = 0
+
+    async def worker():
+        nonlocal position, errors
+        while position < len(planned):
+            plan = planned[position]
+            position += 1
+            if method == FLOW:
+                status, elapsed = await builder(client, plan)
+            else:
+                path, kwargs = plan
+                start = time.perf_counter()
+                status = (await client.request(method, path, **kwargs)).status_code
+                elapsed = time.perf_counter() - start
+            latencies.append(elapsed)
+            errors += status >= 400
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(max(1, min(concurrency, requests)))))
+    return summarize(latencies, time.perf_counter() - start, errors)
+
+
+def run_analyzer(platform: Dict, requests: int, seed: int) -> Dict:
+    """Call the simulated analyzer directly, without HTTP, on random incidents"""
+    rng = random.Random(seed)
+    incidents = rng.sample(platform["incidents"], min(requests, len(platform["incidents"])))
+    latencies = []
+    start = time.perf_counter()
+    for incident in incidents:
+        began = time.perf_counter()
+        api.ai_analyzer.analyze_incident(incident)
+        latencies.append(time.perf_counter() - began)
+    return summarize(latencies, time.perf_counter() - start, 0)
+
+
+async def run(args) -> Dict:
+    sizes = dict(PRESETS[args.preset])
+    for field in ("incidents", "services", "programs"):
+        if getattr(args, field) is not None:
+            sizes[field] = getattr(args, field)
+
+    started = time.perf_counter()
+    platform = synthetic_platform(sizes["incidents"], sizes["services"], sizes["programs"], seed=args.seed)
+    install_database(platform)
+    seed_seconds = time.perf_counter() - started
+    print(f"Seeded {sizes['incidents']:,} incidents, {sizes['services']:,} services, "
+          f"{sizes['programs']:,} programs in {seed_seconds:.1f}s", file=sys.stderr)
+
+    results = {}
+    selected = [scenario for scenario in scenarios(platform)
+                if not args.only or any(term in scenario[0] for term in args.only)]
+    transport = httpx.ASGITransport(app=api.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as client:
+        for index, (name, method, builder) in enumerate(selected):
+            if args.warmup:
+                await run_endpoint(client, method, builder, args.warmup, args.concurrency, args.seed + index)
+            results[name] = await run_endpoint(client, method, builder, args.requests, args.concurrency,
+                                               args.seed + index)
+            print(f"  {name:<36} {results[name]['throughput_rps']:>9.1f} rps  "
+                  f"p95 {results[name]['p95_ms']:>8.2f} ms", file=sys.stderr)
+
+    if not args.only or any(term in "analyzer.analyze_incident" for term in args.only):
+        results["analyzer.analyze_incident"] = run_analyzer(platform, args.requests, args.seed)
+
+    return {
+        "timestamp": datetime.now().isoformat(),
+        "preset": args.preset,
+        "sizes": sizes,
+        "concurrency": args.concurrency,
+        "requests_per_endpoint": args.requests,
+        "seed_seconds": round(seed_seconds, 2),
+        "endpoints": results,
+    }
+
+
+def compare(report: Dict, baseline: Dict, tolerance: float, p95_budget_ms: Optional[float]) -> List[str]:
+    """Regressions against the baseline (slower P95 or lower throughput) and budget breaches"""
+    failures = []
+    for name, result in report["endpoints"].items():
+        if result["errors"]:
+            failures.append(f"{name}: {result['errors']} error responses")
+        if p95_budget_ms is not None and result["p95_ms"] > p95_budget_ms:
+            failures.append(f"{name}: P95 {result['p95_ms']}ms exceeds budget {p95_budget_ms}ms")
+
+        before = baseline.get("endpoints", {}).get(name) if baseline else None
+        if before is None:
+            continue
+        if result["p95_ms"] > before["p95_ms"] * (1 + tolerance):
+            failures.append(f"{name}: P95 {result['p95_ms']}ms vs baseline {before['p95_ms']}ms")
+        if result["throughput_rps"] < before["throughput_rps"] * (1 - tolerance):
+            failures.append(f"{name}: {result['throughput_rps']} rps vs baseline {before['throughput_rps']} rps")
+    return failures
+
+
+def print_table(report: Dict, baseline: Optional[Dict]):
+    header = f"{'endpoint':<36} {'rps':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errors':>7}"
+    if baseline:
+        header += f" {'Δp95':>8}"
+    print(header)
+    print("-" * len(header))
+    for name, result in report["endpoints"].items():
+        line = (f"{name:<36} {result['throughput_rps']:>9.1f} {result['p50_ms']:>9.2f} "
+                f"{result['p95_ms']:>9.2f} {result['p99_ms']:>9.2f} {result['errors']:>7}")
+        before = baseline.get("endpoints", {}).get(name) if baseline else None
+        if before and before["p95_ms"]:
+            line += f" {(result['p95_ms'] / before['p95_ms'] - 1) * 100:>+7.1f}%"
+        print(line)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Offline load test for the Sentinel-AI API")
+    parser.add_argument("--preset", choices=sorted(PRESETS), default="small")
+    parser.add_argument("--incidents", type=int, help="Override the preset's incident count")
+    parser.add_argument("--services", type=int, help="Override the preset's service count")
+    parser.add_argument("--programs", type=int, help="Override the preset's program count")
+    parser.add_argument("--requests", type=int, default=200, help="Measured requests per endpoint")
+    parser.add_argument("--warmup", type=int, default=20, help="Unmeasured requests per endpoint first")
+    parser.add_argument("--concurrency", type=int, default=100, help="Concurrent in-flight requests")
+    parser.add_argument("--only", nargs="*", help="Only endpoints whose name contains one of these")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output", help="Write the JSON report here")
+    parser.add_argument("--baseline", help="Baseline report to compare against")
+    parser.add_argument("--save-baseline", help="Write this run's report as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed regression (0.25 = 25%%)")
+    parser.add_argument("--p95-budget-ms", type=float, help="Fail if any endpoint's P95 exceeds this")
+    args = parser.parse_args(argv)
+
+    report = asyncio.run(run(args))
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as handle:
+            baseline = json.load(handle)
+    print_table(report, baseline)
+
+    for path in filter(None, (args.output, args.save_baseline)):
+        with open(path, "w") as handle:
+            json.dump(report, handle, indent=2)
+
+    failures = compare(report, baseline, args.tolerance, args.p95_budget_ms)
+    for failure in failures:
+        print(f"FAIL {failure}", file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,143 @@
+# cache.py - Small LRU cache with TTL expiry for expensive responses
+
+import asyncio
+
+import hashlib
+
+import json
+
+import threading
+
+import time
+
+from collections import OrderedDict
+
+from collections.abc import Mapping
+
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+_MISSING = object()
+
+
+def _jsonable(value: Any):
+    # Read-only records hash like the dicts they stand for
+    return dict(value) if isinstance(value, Mapping) else str(value)
+
+
+def content_hash(data: Any) -> str:
+    """Stable hash of a JSON-serialisable value"""
+    encoded = json.dumps(data, sort_keys=True, default=_jsonable).encode("utf-8")
+    return hashlib.sha1(encoded).hexdigest()
+
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries also expire after a TTL
+
+    Each entry can carry a version tag (e.g. a content hash); a lookup with a
+    different version counts as a miss, so stale data is never served. Values
+    for which `cacheable` returns False (e.g. stand-in answers produced during
+    an outage) are handed back to the caller but never stored.
+    """
+
+    def __init__(self, maxsize: int = 256, ttl: float = 300.0, clock: Callable[[], float] = time.monotonic,
+                 cacheable: Optional[Callable[[Any], bool]] = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.cacheable = cacheable
+        self._clock = clock
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._inflight: Dict[tuple, asyncio.Future] = {}
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable, version: Hashable = None, default: Any = None) -> Any:
+        """Return a fresh cached value, or default on a miss"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, entry_version, expires_at = entry
+                if entry_version == version and expires_at > self._clock():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+
+            self.misses += 1
+            return default
+
+    def set(self, key: Hashable, value: Any, version: Hashable = None):
+        """Store a value, evicting the least recently used entry when full"""
+        if self.cacheable is not None and not self.cacheable(value):
+            return
+        with self._lock:
+            self._entries[key] = (value, version, self._clock() + self.ttl)
+            self._entries.move_to_end(key)
+
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], Any], version: Hashable = None) -> Any:
+        """Return the cached value or compute, store and return it"""
+        value = self.get(key, version, _MISSING)
+        if value is _MISSING:
+            value = compute()
+            self.set(key, value, version)
+        return value
+
+    async def get_or_compute_async(self, key: Hashable, compute: Callable[[], Awaitable[Any]],
+                                   version: Hashable = None) -> Any:
+        """Async get_or_compute; concurrent misses for the same key share one computation"""
+        value = self.get(key, version, _MISSING)
+        if value is not _MISSING:
+            return value
+
+        flight_key = (key, version)
+        task = self._inflight.get(flight_key)
+        if task is None:
+            task = asyncio.ensure_future(compute())
+            self._inflight[flight_key] = task
+            task.add_done_callback(lambda done: self._finish_flight(flight_key, key, version, done))
+
+        # Shielded so one cancelled caller doesn't cancel the shared computation
+        return await asyncio.shield(task)
+
+    def _finish_flight(self, flight_key: tuple, key: Hashable, version: Hashable, task: asyncio.Future):
+        self._inflight.pop(flight_key, None)
+        if not task.cancelled() and task.exception() is None:
+            self.set(key, task.result(), version)
+
+    def invalidate(self, key: Hashable) -> bool:
+        """Drop a single entry"""
+        with self._lock:
+            if self._entries.pop(key, None) is None:
+                return False
+            self.invalidations += 1
+            return True
+
+    def clear(self):
+        """Drop every entry"""
+        with self._lock:
+            self.invalidations += len(self._entries)
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Optional[float]]:
+        """Counters for sizing the cache"""
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else None,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
@@ -0,0 +1,71 @@
+# concurrency.py - Small synchronisation primitives shared by the stores
+
+import re
+
+import threading
+
+from typing import Hashable, Iterable
+
+
+class AtomicCounter:
+    """Monotonic counter whose increments never collide across threads"""
+
+    def __init__(self, start: int = 0):
+        self._value = start
+        self._lock = threading.Lock()
+
+    @property
+    def value(self) -> int:
+        return self._value
+
+    def increment(self, amount: int = 1) -> int:
+        """Add to the counter and return the new value"""
+        with self._lock:
+            self._value += amount
+            return self._value
+
+    def advance_to(self, value: int):
+        """Move the counter forward to at least value (never backwards)"""
+        with self._lock:
+            self._value = max(self._value, value)
+
+
+class IdAllocator:
+    """Allocates PREFIX-<n> ids from an atomic counter
+
+    Seeded past the highest id already in use, so ids stay unique after a
+    restart against a durable store and never depend on collection size.
+    """
+
+    def __init__(self, prefix: str = "INC-", start: int = 1000, existing: Iterable[str] = ()):
+        self.prefix = prefix
+        self._pattern = re.compile(rf"^{re.escape(prefix)}(\d+)$")
+        self._counter = AtomicCounter(start - 1)
+        for identifier in existing:
+            self.observe(identifier)
+
+    def observe(self, identifier: str):
+        """Account for an id allocated elsewhere (loaded, or written by another worker)"""
+        match = self._pattern.match(identifier)
+        if match:
+            self._counter.advance_to(int(match.group(1)))
+
+    def allocate(self) -> str:
+        return f"{self.prefix}{self._counter.increment()}"
+
+
+class StripedLock:
+    """A fixed pool of locks; each key always maps to the same stripe
+
+    Writers to different keys (e.g. different services) rarely contend,
+    while memory stays constant however many keys there are.
+    """
+
+    def __init__(self, stripes: int = 64):
+        self._locks = [threading.RLock() for _ in range(stripes)]
+
+    def lock_for(self, key: Hashable) -> threading.RLock:
+        return self._locks[hash(key) % len(self._locks)]
+
+    def __len__(self) -> int:
+        return len(self._locks)
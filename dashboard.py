@@ -7,18 +7,9 @@ import pandas as pd
 from datetime import datetime
 
 # Import our modules
-from database import db
-
 from ai_engine import analyzer
 
-
-# In dashboard.py, replace the database import with:
-import requests
-
-# Example: Fetch platform health
-response = requests.get("http://localhost:8000/health")
-data = response.json()
-platform_health = data["platform_health"]
+from dashboard_data import APIError, DashboardData
 
 # Page configuration
 st.set_page_config(
@@ -49,6 +40,20 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
+@st.cache_resource
+def get_data() -> DashboardData:
+    """One pooled, cached API client per server process, shared across reruns and sessions"""
+    return DashboardData(analyzer=analyzer)
+
+def load(page):
+    """Prefetch everything a page renders in parallel; stop the page if the API is down"""
+    results = get_data().prefetch_page(page)
+    errors = [result for result in results.values() if isinstance(result, APIError)]
+    if errors:
+        st.error(f"Could not load dashboard data: {errors[0]}")
+        st.stop()
+    return results
+
 def main():
     """Main dashboard function"""
     
@@ -63,24 +68,29 @@ def main():
         ["Dashboard", "Platform Health", "Program Risks", "Incident Analysis", "AI Insights"]
     )
     
+    data = load(page)
+    
     if page == "Dashboard":
-        show_dashboard()
+        show_dashboard(data)
     elif page == "Platform Health":
-        show_platform_health()
+        show_platform_health(data)
     elif page == "Program Risks":
-        show_program_risks()
+        show_program_risks(data)
     elif page == "Incident Analysis":
-        show_incident_analysis()
+        show_incident_analysis(data)
     elif page == "AI Insights":
-        show_ai_insights()
+        show_ai_insights(data)
 
-def show_dashboard():
+def show_dashboard(data):
     """Main dashboard view"""
     
     # Get data
-    platform_health = db.get_platform_health()
-    services = db.services
-    risks = db.get_program_risks()
+    health = data["health"]
+    platform_health = health["platform_health"]
+    risks = data["program_risks"]
+    incidents = data["incidents"]
+    # The page holds only the newest incidents; the API reports the store-wide total
+    total_incidents = get_data().incident_page()["total"]
     
     # Top metrics row
     st.markdown("## 📊 Executive Summary")
@@ -91,16 +101,14 @@ def show_dashboard():
         st.metric("Platform Health", f"{platform_health:.0f}%", "+2%")
     
     with col2:
-        high_risks = sum(1 for r in risks if r["level"] == "High")
+        high_risks = sum(1 for r in risks if r["risk_level"] in ("High", "Critical"))
         st.metric("High Risk Programs", high_risks)
     
     with col3:
-        total_incidents = len(db.incidents)
         st.metric("Recent Incidents", total_incidents)
     
     with col4:
-        services_healthy = sum(1 for s in services if s["health"] > 90)
-        st.metric("Healthy Services", f"{services_healthy}/{len(services)}")
+        st.metric("Healthy Services", f"{health['services_healthy']}/{health['services_total']}")
     
     # Platform Health Gauge
     st.markdown("## 🏥 Platform Health Score")
@@ -131,31 +139,25 @@ def show_dashboard():
     with col1:
         if st.button("📋 Generate Weekly Report", type="primary"):
             with st.spinner("Generating report..."):
-                platform_data = {
-                    "health": platform_health,
-                    "services": services,
-                    "incidents": db.incidents[:3]  # Last 3 incidents
-                }
-                summary = analyzer.generate_exec_summary(platform_data)
+                summary = get_data().executive_summary(platform_health, data["services"], total_incidents)
                 st.success("Report Generated!")
-                st.info(summary)
+                st.info(summary["text"])
     
     with col2:
         if st.button("🔍 Analyze Latest Incident"):
-            if db.incidents:
-                latest = db.incidents[0]
-                analysis = analyzer.analyze_incident(latest)
+            if incidents:
+                analysis = get_data().incident_analysis(incidents[0]["id"])
                 st.json(analysis)
             else:
                 st.warning("No incidents found")
 
-def show_platform_health():
+def show_platform_health(data):
     """Platform health details"""
     st.markdown("## 🏥 Platform Health Details")
     
     # Create service health table
     service_data = []
-    for service in db.services:
+    for service in data["services"]:
         status = "✅ Healthy" if service["health"] > 90 else "⚠️ Degraded" if service["health"] > 80 else "🔴 Critical"
         
         service_data.append({
@@ -182,11 +184,11 @@ def show_platform_health():
     
     st.plotly_chart(fig, use_container_width=True)
 
-def show_program_risks():
+def show_program_risks(data):
     """Program risk analysis"""
     st.markdown("## 🎯 Program Risk Analysis")
     
-    risks = db.get_program_risks()
+    risks = data["program_risks"]
     
     if not risks:
         st.info("No program risks identified")
@@ -196,17 +198,17 @@ def show_program_risks():
     risk_data = []
     for risk in risks:
         risk_data.append({
-            "Program": risk["program"],
-            "Risk Level": risk["level"],
+            "Program": risk["program_name"],
+            "Risk Level": risk["risk_level"],
             "Risk Score": risk["risk_score"],
-            "Delivery Confidence": f"{risk['confidence']}%"
+            "Delivery Confidence": f"{risk['confidence_score']}%"
         })
     
     df = pd.DataFrame(risk_data)
     
     # Color coding
     def color_risk(val):
-        if val == "High":
+        if val in ("High", "Critical"):
             return 'background-color: #FECACA; color: black'
         elif val == "Medium":
             return 'background-color: #FEF3C7; color: black'
@@ -225,6 +227,7 @@ def show_program_risks():
         names=risk_counts.index,
         color=risk_counts.index,
         color_discrete_map={
+            "Critical": "darkred",
             "High": "red",
             "Medium": "yellow",
             "Low": "green"
@@ -233,11 +236,11 @@ def show_program_risks():
     
     st.plotly_chart(fig, use_container_width=True)
 
-def show_incident_analysis():
+def show_incident_analysis(data):
     """Incident analysis"""
     st.markdown("## 🚨 Incident Analysis")
     
-    incidents = db.incidents
+    incidents = data["incidents"]
     
     if not incidents:
         st.success("🎉 No recent incidents!")
@@ -250,7 +253,7 @@ def show_incident_analysis():
             "ID": incident["id"],
             "Service": incident["service"],
             "Severity": incident["severity"],
-            "Time": incident["time"],
+            "Time": incident["timestamp"],
             "Description": incident["description"]
         })
     
@@ -268,10 +271,9 @@ def show_incident_analysis():
     if st.button("Analyze with AI", type="primary"):
         # Find selected incident
         incident_id = selected_incident.split(":")[0]
-        incident = next(i for i in incidents if i["id"] == incident_id)
         
         with st.spinner("Analyzing business impact..."):
-            analysis = analyzer.analyze_incident(incident)
+            analysis = get_data().incident_analysis(incident_id)
             
             # Display results
             st.success("Analysis Complete!")
@@ -294,7 +296,7 @@ def show_incident_analysis():
                 st.markdown("##### ⚡ Recommended Action")
                 st.success(analysis.get("recommended_action", "Monitor situation"))
 
-def show_ai_insights():
+def show_ai_insights(data):
     """AI insights page"""
     st.markdown("## 🤖 AI Insights Engine")
     
@@ -316,7 +318,7 @@ def show_ai_insights():
         
         service = st.selectbox(
             "Service",
-            ["auth-service", "payment-service", "inventory-service", "notification-service"]
+            [s["name"] for s in data["services"]]
         )
         
         severity = st.selectbox("Severity", ["SEV1", "SEV2", "SEV3"])
@@ -330,15 +332,11 @@ def show_ai_insights():
         st.markdown("##### AI Analysis Results")
         
         if st.button("Generate AI Analysis", type="primary"):
-            incident_data = {
-                "service": service,
-                "severity": severity,
-                "time": datetime.now().strftime("%Y-%m-%d %H:%M"),
-                "description": description
-            }
-            
             with st.spinner("AI analyzing..."):
-                analysis = analyzer.analyze_incident(incident_data)
+                # Identical inputs reuse the earlier answer instead of another LLM call
+                analysis = get_data().analyze_custom_incident(
+                    service, severity, description, datetime.now().strftime("%Y-%m-%d %H:%M")
+                )
                 
                 # Display formatted results
                 st.markdown("**Business Impact:**")
@@ -0,0 +1,195 @@
+# dashboard_data.py - Cached, pooled data access for the Streamlit dashboard
+
+import os
+
+import threading
+
+from concurrent.futures import ThreadPoolExecutor
+
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import requests
+
+from requests.adapters import HTTPAdapter
+
+from urllib3.util.retry import Retry
+
+from cache import TTLCache
+
+API_BASE_URL = os.getenv("SENTINEL_API_URL", "http://localhost:8000")
+
+# Seconds each endpoint's data stays fresh before the client revalidates it
+ENDPOINT_TTLS = {
+    "health": 10,
+    "services": 10,
+    "incidents": 15,
+    "program_risks": 60,
+    "executive_summary": 120,
+    "incident_analysis": 3600,
+    "custom_analysis": 3600,
+}
+
+# Analyses the API produced while the LLM was down are shown but not kept for the TTL
+CACHEABLE = {
+    "executive_summary": lambda summary: not summary["fallback"],
+    "incident_analysis": lambda analysis: not analysis["fallback"],
+    "custom_analysis": lambda analysis: not analysis["fallback"],
+}
+
+# What each dashboard page renders, fetched together when the page loads
+PAGE_DATA = {
+    "Dashboard": ("health", "services", "program_risks", "incidents"),
+    "Platform Health": ("services",),
+    "Program Risks": ("program_risks",),
+    "Incident Analysis": ("incidents",),
+    "AI Insights": ("services",),
+}
+
+
+class APIError(RuntimeError):
+    """Raised when the Sentinel-AI API cannot be reached or errors"""
+
+
+def normalize_analysis(analysis: Dict) -> Dict:
+    """Map simulated and LLM analyses onto the keys the dashboard renders"""
+    return {
+        "summary": analysis.get("summary") or analysis.get("business_impact_summary", "No summary available"),
+        "affected_programs": analysis.get("affected_programs", []),
+        "timeline_impact": analysis.get("timeline_impact") or (
+            f"{analysis['estimated_delay_days']} days delay" if "estimated_delay_days" in analysis else "Unknown"
+        ),
+        "recommended_action": analysis.get("recommended_action")
+                              or analysis.get("escalation_recommendation", "Monitor situation"),
+        "fallback": bool(analysis.get("fallback")),
+    }
+
+
+class DashboardData:
+    """One pooled HTTP session plus per-endpoint TTL caches for the dashboard
+
+    Streamlit reruns the whole script on every interaction; keeping one of
+    these per server process (st.cache_resource) means reruns read cached
+    data instead of refetching it. Expired entries are revalidated with
+    If-None-Match, so unchanged lists cost a 304 rather than a full payload.
+    """
+
+    def __init__(self, base_url: str = API_BASE_URL, timeout: float = 5.0, pool_size: int = 8,
+                 ttls: Optional[Dict[str, float]] = None, analyzer=None):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.analyzer = analyzer
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size,
+                              max_retries=Retry(total=2, backoff_factor=0.2, allowed_methods=("GET",),
+                                                status_forcelist=(502, 503, 504)))
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers["Accept-Encoding"] = "br, gzip"
+
+        ttls = {**ENDPOINT_TTLS, **(ttls or {})}
+        self._caches = {name: TTLCache(maxsize=128, ttl=ttl, cacheable=CACHEABLE.get(name))
+                        for name, ttl in ttls.items()}
+        self._etags: Dict[Tuple, Tuple[str, Dict]] = {}
+        self._etag_lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix="dashboard-fetch")
+
+    def _get(self, path: str, params: Optional[Dict] = None) -> Dict:
+        """GET a JSON endpoint, revalidating against the last ETag seen for it"""
+        key = (path, tuple(sorted((params or {}).items())))
+        with self._etag_lock:
+            previous = self._etags.get(key)
+        headers = {"If-None-Match": previous[0]} if previous else {}
+
+        try:
+            response = self.session.get(f"{self.base_url}{path}", params=params, headers=headers,
+                                        timeout=self.timeout)
+        except requests.RequestException as error:
+            raise APIError(f"Sentinel-AI API unreachable at {self.base_url}: {error}")
+
+        if response.status_code == 304 and previous:
+            return previous[1]
+        if response.status_code >= 400:
+            raise APIError(f"GET {path} failed with HTTP {response.status_code}")
+
+        data = response.json()
+        etag = response.headers.get("ETag")
+        if etag:
+            with self._etag_lock:
+                self._etags[key] = (etag, data)
+        return data
+
+    def _cached(self, name: str, key, fetch):
+        return self._caches[name].get_or_compute(key, fetch)
+
+    # Endpoints
+    def health(self) -> Dict:
+        return self._cached("health", "health", lambda: self._get("/health"))
+
+    def services(self) -> List[Dict]:
+        return self._cached("services", "services", lambda: self._get("/services")["services"])
+
+    def incident_page(self, limit: int = 50) -> Dict:
+        """The newest incidents plus the store-wide total and severity counts"""
+        return self._cached("incidents", limit, lambda: self._get("/incidents", {"limit": limit}))
+
+    def incidents(self, limit: int = 50) -> List[Dict]:
+        return self.incident_page(limit)["incidents"]
+
+    def program_risks(self) -> List[Dict]:
+        return self._cached("program_risks", "program_risks", lambda: self._get("/programs/risks")["program_risks"])
+
+    def executive_summary(self, health: float, services: List[Dict], incident_count: int) -> Dict:
+        """Narrative summary for leadership from the analyzer, reused while the inputs are unchanged"""
+        if self.analyzer is None:
+            raise APIError("No analyzer configured for executive summaries")
+
+        def generate():
+            text = self.analyzer.generate_exec_summary({
+                "health": health, "services": services, "incident_count": incident_count
+            })
+            return {"text": text, "fallback": text == self.analyzer.FALLBACK_EXEC_SUMMARY}
+
+        return self._cached("executive_summary", (health, len(services), incident_count), generate)
+
+    def incident_analysis(self, incident_id: str) -> Dict:
+        """Server-side analysis of a stored incident (each incident is analyzed once per TTL)"""
+        return self._cached("incident_analysis", incident_id, lambda: normalize_analysis(
+            self._get(f"/ai/incident/{incident_id}")["ai_analysis"]
+        ))
+
+    def analyze_custom_incident(self, service: str, severity: str, description: str, time: str) -> Dict:
+        """Analyze an ad-hoc incident locally; identical inputs reuse the earlier answer"""
+        if self.analyzer is None:
+            raise APIError("No analyzer configured for ad-hoc incidents")
+        key = (service, severity, description.strip())
+        return self._cached("custom_analysis", key, lambda: normalize_analysis(self.analyzer.analyze_incident({
+            "service": service, "severity": severity, "description": description, "time": time
+        })))
+
+    # Prefetch
+    def prefetch(self, names: Iterable[str]) -> Dict[str, object]:
+        """Fetch several endpoints in parallel; failures come back as APIError values"""
+        futures = {name: self._executor.submit(getattr(self, name)) for name in names}
+        results = {}
+        for name, future in futures.items():
+            try:
+                results[name] = future.result()
+            except APIError as error:
+                results[name] = error
+        return results
+
+    def prefetch_page(self, page: str) -> Dict[str, object]:
+        return self.prefetch(PAGE_DATA.get(page, ()))
+
+    def invalidate(self, *names: str):
+        """Drop cached data (e.g. after an action that changes it)"""
+        for name in names or self._caches:
+            self._caches[name].clear()
+
+    def stats(self) -> Dict:
+        return {name: cache.stats() for name, cache in self._caches.items()}
+
+    def close(self):
+        self._executor.shutdown(wait=False)
+        self.session.close()
@@ -4,6 +4,10 @@
 import json
 from datetime import datetime, timedelta
 import random
+
+from health_scoring import scoring_engine
+
+
 class SimpleDatabase:
     
     """A simple database simulator for TPM data"""
@@ -46,8 +50,7 @@ class SimpleDatabase:
     
     def get_platform_health(self):
         """Calculate overall platform health"""
-        total_health = sum(service["health"] for service in self.services)
-        return total_health / len(self.services)
+        return scoring_engine.score_services(self.services)[1]
     
     def get_program_risks(self):
         """Get program risk data"""
@@ -0,0 +1,175 @@
+# dependency_graph.py - Service and program dependency graph with cached impact closure
+
+import heapq
+
+import threading
+
+from collections import defaultdict
+
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+
+class DependencyGraph:
+    """Weighted dependency graph: services depend on services, programs on services
+
+    An edge (dependent, dependency, weight) means a failure in `dependency`
+    reaches `dependent` with that weight (0-1). Edges are indexed in both
+    directions. Transitive closures are cached per node and weighted by the
+    strongest path (product of edge weights), so "which programs does a
+    service affect" is a dictionary lookup once warm.
+
+    Changing an edge only drops the cached closures that pass through it:
+    every closure that reaches the edge's endpoint is tracked in a reverse
+    membership index.
+    """
+
+    def __init__(self):
+        self._dependencies: Dict[str, Dict[str, float]] = defaultdict(dict)
+        self._dependents: Dict[str, Dict[str, float]] = defaultdict(dict)
+        self.programs: Set[str] = set()
+
+        # node -> (closure weights, programs sorted by weight)
+        self._impact: Dict[str, Tuple[Dict[str, float], List[Tuple[str, float]]]] = {}
+        # node -> closure weights of everything it depends on
+        self._support: Dict[str, Dict[str, float]] = {}
+        # node -> cached sources whose closure contains it
+        self._impact_members: Dict[str, Set[str]] = defaultdict(set)
+        self._support_members: Dict[str, Set[str]] = defaultdict(set)
+        self._lock = threading.RLock()
+
+    @classmethod
+    def from_edges(cls, service_edges: Iterable[Tuple], program_edges: Iterable[Tuple]) -> "DependencyGraph":
+        """Build from (service, depends_on[, weight]) and (program, service[, weight]) tuples"""
+        graph = cls()
+        for edge in service_edges:
+            graph.add_dependency(*edge)
+        for program, *rest in program_edges:
+            graph.programs.add(program)
+            graph.add_dependency(program, *rest)
+        return graph
+
+    # Edges
+    def add_dependency(self, dependent: str, dependency: str, weight: float = 1.0):
+        """Add or reweight an edge"""
+        if not 0 < weight <= 1:
+            raise ValueError("Dependency weight must be in (0, 1]")
+        with self._lock:
+            self._dependencies[dependent][dependency] = weight
+            self._dependents[dependency][dependent] = weight
+            self._invalidate(dependent, dependency)
+
+    def add_program(self, program: str, services: Dict[str, float]):
+        """Register a program and the services it depends on directly"""
+        with self._lock:
+            self.programs.add(program)
+            for service, weight in services.items():
+                self.add_dependency(program, service, weight)
+
+    def remove_dependency(self, dependent: str, dependency: str):
+        with self._lock:
+            if self._dependencies.get(dependent, {}).pop(dependency, None) is None:
+                raise KeyError(f"No dependency {dependent} -> {dependency}")
+            self._dependents[dependency].pop(dependent, None)
+            self._invalidate(dependent, dependency)
+
+    def dependencies(self, node: str) -> Dict[str, float]:
+        """Direct dependencies of a node"""
+        return dict(self._dependencies.get(node, {}))
+
+    def dependents(self, node: str) -> Dict[str, float]:
+        """Nodes that depend directly on a node"""
+        return dict(self._dependents.get(node, {}))
+
+    def _invalidate(self, dependent: str, dependency: str):
+        # Impact closures reaching `dependency` and support closures reaching
+        # `dependent` are the only ones this edge can change
+        for source in self._impact_members.pop(dependency, set()) | {dependency}:
+            self._drop(source, self._impact, self._impact_members, lambda entry: entry[0])
+        for source in self._support_members.pop(dependent, set()) | {dependent}:
+            self._drop(source, self._support, self._support_members, lambda entry: entry)
+
+    @staticmethod
+    def _drop(source: str, cache: Dict, members: Dict[str, Set[str]], weights_of):
+        entry = cache.pop(source, None)
+        if entry is None:
+            return
+        for node in weights_of(entry):
+            members[node].discard(source)
+
+    # Closures
+    @staticmethod
+    def _closure(source: str, edges: Dict[str, Dict[str, float]]) -> Dict[str, float]:
+        """Strongest-path weight to every node reachable from source (source excluded)"""
+        best: Dict[str, float] = {}
+        heap = [(-1.0, source)]
+        while heap:
+            weight, node = heapq.heappop(heap)
+            weight = -weight
+            if node in best:
+                continue
+            best[node] = weight
+            for neighbour, edge_weight in edges.get(node, {}).items():
+                if neighbour not in best:
+                    heapq.heappush(heap, (-weight * edge_weight, neighbour))
+        del best[source]
+        return best
+
+    def _impact_entry(self, service: str) -> Tuple[Dict[str, float], List[Tuple[str, float]]]:
+        entry = self._impact.get(service)
+        if entry is not None:
+            return entry
+        with self._lock:
+            entry = self._impact.get(service)
+            if entry is None:
+                weights = self._closure(service, self._dependents)
+                programs = sorted(((node, weight) for node, weight in weights.items() if node in self.programs),
+                                  key=lambda item: (-item[1], item[0]))
+                entry = self._impact[service] = (weights, programs)
+                for node in weights:
+                    self._impact_members[node].add(service)
+            return entry
+
+    def impact(self, service: str) -> Dict[str, float]:
+        """Every service and program a failure in `service` reaches, with its weight"""
+        return dict(self._impact_entry(service)[0])
+
+    def affected_programs(self, service: str) -> List[Tuple[str, float]]:
+        """Programs reached by a failure in `service`, strongest first"""
+        return list(self._impact_entry(service)[1])
+
+    def program_weight(self, service: str, program: str) -> float:
+        """How strongly a failure in `service` reaches `program` (0 if it does not)"""
+        return self._impact_entry(service)[0].get(program, 0.0)
+
+    def supporting_services(self, node: str) -> Dict[str, float]:
+        """Every service `node` depends on, directly or transitively, with its weight"""
+        weights = self._support.get(node)
+        if weights is None:
+            with self._lock:
+                weights = self._support.get(node)
+                if weights is None:
+                    weights = self._support[node] = {
+                        dependency: weight for dependency, weight in self._closure(node, self._dependencies).items()
+                        if dependency not in self.programs
+                    }
+                    for dependency in weights:
+                        self._support_members[dependency].add(node)
+        return dict(weights)
+
+    def warm(self, services: Optional[Iterable[str]] = None):
+        """Precompute closures (every known service and program by default)"""
+        if services is None:
+            services = [node for node in set(self._dependents) | set(self._dependencies) if node not in self.programs]
+        for service in services:
+            self._impact_entry(service)
+        for program in self.programs:
+            self.supporting_services(program)
+
+    def stats(self) -> Dict:
+        return {
+            "nodes": len(set(self._dependents) | set(self._dependencies)),
+            "programs": len(self.programs),
+            "edges": sum(len(edges) for edges in self._dependencies.values()),
+            "cached_impacts": len(self._impact),
+            "cached_supports": len(self._support),
+        }
@@ -0,0 +1,111 @@
+# health_scoring.py - Vectorized composite health scores (Documents/METRICES.md)
+
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+
+def linear_score(values: np.ndarray, good: float, bad: float) -> np.ndarray:
+    """100 at or better than `good`, 0 at or worse than `bad`, linear between (NaN passes through)"""
+    return np.clip((bad - values) / (bad - good) * 100.0, 0.0, 100.0)
+
+
+def nanmean_rows(stack: np.ndarray) -> np.ndarray:
+    """Column-wise mean ignoring NaN; NaN where a column has no values"""
+    counts = (~np.isnan(stack)).sum(axis=0)
+    return np.where(counts > 0, np.nansum(stack, axis=0) / np.maximum(counts, 1), np.nan)
+
+
+class HealthScoringEngine:
+    """Service and platform health from raw metric columns in one NumPy pass
+
+    Service Health = 0.4 x Availability + 0.4 x Performance + 0.2 x Resource,
+    where a component with no data (NaN) drops out and the remaining weights
+    are rescaled. Platform Health = sum(health x criticality) / sum(criticality)
+    with Tier 1/2/3 criticality 3/2/1.
+
+    Availability blends the service's reported health with its error-rate
+    score; performance scores latency against the P50/P99 targets; resource
+    scores CPU and memory utilisation against their targets.
+    """
+
+    WEIGHTS = {"availability": 0.4, "performance": 0.4, "resource": 0.2}
+    TIER_CRITICALITY = {"tier1": 3.0, "tier2": 2.0, "tier3": 1.0}
+    DEFAULT_CRITICALITY = 1.0
+
+    # (score 100 at or below, score 0 at or above)
+    ERROR_RATE_PCT = (0.1, 5.0)
+    LATENCY_MS = (100.0, 500.0)
+    CPU_PCT = (70.0, 100.0)
+    MEMORY_PCT = (80.0, 100.0)
+
+    HEALTHY_THRESHOLD = 90
+
+    def score(self, health: np.ndarray, latency: np.ndarray, error_rate: np.ndarray,
+              cpu: Optional[np.ndarray] = None, memory: Optional[np.ndarray] = None) -> np.ndarray:
+        """Composite health score per service (0-100)"""
+        health = np.asarray(health, dtype=np.float64)
+        missing = np.full(health.shape, np.nan)
+
+        availability = nanmean_rows(np.vstack([
+            np.clip(health, 0.0, 100.0),
+            linear_score(np.asarray(error_rate, dtype=np.float64), *self.ERROR_RATE_PCT),
+        ]))
+        performance = linear_score(np.asarray(latency, dtype=np.float64), *self.LATENCY_MS)
+
+        resource = nanmean_rows(np.vstack([
+            linear_score(np.asarray(cpu, dtype=np.float64), *self.CPU_PCT) if cpu is not None else missing,
+            linear_score(np.asarray(memory, dtype=np.float64), *self.MEMORY_PCT) if memory is not None else missing,
+        ]))
+
+        components = np.vstack([availability, performance, resource])
+        weights = np.array([self.WEIGHTS["availability"], self.WEIGHTS["performance"],
+                            self.WEIGHTS["resource"]])[:, None] * ~np.isnan(components)
+        totals = weights.sum(axis=0)
+        scores = np.nansum(components * weights, axis=0) / np.where(totals > 0, totals, 1.0)
+        return np.where(totals > 0, scores, np.nan)
+
+    def criticality(self, tiers: Iterable[str]) -> np.ndarray:
+        return np.fromiter((self.TIER_CRITICALITY.get(tier, self.DEFAULT_CRITICALITY) for tier in tiers),
+                           dtype=np.float64)
+
+    def platform(self, scores: np.ndarray, criticality: np.ndarray) -> float:
+        """Criticality-weighted platform health"""
+        valid = ~np.isnan(scores)
+        if not valid.any():
+            return 100.0
+        return round(float(np.average(scores[valid], weights=criticality[valid])), 1)
+
+    @staticmethod
+    def _column(services: List[Dict], field: str) -> Optional[np.ndarray]:
+        values = np.fromiter((service.get(field, np.nan) for service in services),
+                             dtype=np.float64, count=len(services))
+        return None if np.isnan(values).all() else values
+
+    def score_services(self, services: List[Dict], overrides: Optional[Dict[str, np.ndarray]] = None
+                       ) -> Tuple[np.ndarray, float]:
+        """Score a list of service dicts; returns (per-service scores, platform health)
+
+        `overrides` replaces whole columns (e.g. jittered real-time readings).
+        """
+        if not services:
+            return np.array([]), 100.0
+
+        overrides = overrides or {}
+        columns = {
+            field: overrides[field] if field in overrides else self._column(services, field)
+            for field in ("health", "latency", "error_rate", "cpu", "memory")
+        }
+        missing = np.full(len(services), np.nan)
+        scores = self.score(
+            columns["health"] if columns["health"] is not None else missing,
+            columns["latency"] if columns["latency"] is not None else missing,
+            columns["error_rate"] if columns["error_rate"] is not None else missing,
+            columns["cpu"],
+            columns["memory"],
+        )
+        return scores, self.platform(scores, self.criticality(service.get("type") for service in services))
+
+
+# Shared engine instance
+scoring_engine = HealthScoringEngine()
@@ -0,0 +1,250 @@
+# incident_store.py - Indexed in-memory incident store for the TPM API
+
+import threading
+
+from bisect import bisect_left, insort
+
+from heapq import merge
+
+from itertools import compress, islice
+
+from typing import Dict, Iterable, Iterator, List, Optional
+
+import numpy as np
+
+from records import IncidentColumns, IncidentRecord, parse_timestamp, vocabulary
+
+
+class DuplicateIncident(ValueError):
+    """Raised when an incident id is already taken"""
+
+
+class IncidentStore:
+    """Incident collection with a primary key index and secondary indexes
+
+    Every index keeps (timestamp, id) keys in ascending order, with the
+    timestamp as wall-clock microseconds, so "latest N" queries walk an
+    index backwards and time ranges are two bisects away.
+
+    Writers serialise on one lock; readers take none. New keys are appended
+    in place (readers only look below the length they started with), while
+    out-of-order inserts, removals and incident updates build a new list or
+    record and swap it in, so a reader never sees a half-applied change.
+    Stored incidents are read-only IncidentRecords and can be handed out
+    without copying; `columns` mirrors their categorical fields in arrays so
+    multi-filter queries are answered without decoding records. `version()`
+    moves on every write, like the SQLite store's.
+    """
+
+    # Fields that get a secondary index
+    INDEXED_FIELDS = ("service", "severity", "status")
+
+    def __init__(self, incidents: Optional[Iterable[Dict]] = None):
+        self._by_id: Dict[str, Dict] = {}
+        self._timeline: List[tuple] = []
+        self._indexes: Dict[str, Dict[str, List[tuple]]] = {field: {} for field in self.INDEXED_FIELDS}
+        self.columns = IncidentColumns()
+        self._version = 0
+        self._write_lock = threading.Lock()
+
+        for incident in incidents or []:
+            self.add(incident)
+
+    @staticmethod
+    def _key(incident: IncidentRecord) -> tuple:
+        return (incident.timestamp_micros, incident["id"])
+
+    @staticmethod
+    def _insert(keys: List[tuple], key: tuple) -> List[tuple]:
+        """Add key, returning the list to keep (the same one when appending)"""
+        # New incidents are almost always the most recent, so appending is the common case
+        if not keys or keys[-1] < key:
+            keys.append(key)
+            return keys
+        keys = list(keys)
+        insort(keys, key)
+        return keys
+
+    @staticmethod
+    def _remove(keys: List[tuple], key: tuple) -> List[tuple]:
+        """Return a copy of keys without key"""
+        position = bisect_left(keys, key)
+        if position < len(keys) and keys[position] == key:
+            return keys[:position] + keys[position + 1:]
+        return keys
+
+    def __len__(self) -> int:
+        return len(self._by_id)
+
+    def __contains__(self, incident_id: str) -> bool:
+        return incident_id in self._by_id
+
+    def __iter__(self) -> Iterator[Dict]:
+        """Iterate over all incidents, most recent first"""
+        return (self._by_id[key[1]] for key in reversed(self._timeline))
+
+    def version(self) -> int:
+        """Write counter; changes whenever an incident is added or updated"""
+        return self._version
+
+    def get(self, incident_id: str) -> Optional[Dict]:
+        """Look up an incident by id"""
+        return self._by_id.get(incident_id)
+
+    def add(self, incident: Dict) -> Dict:
+        """Add an incident and register it in every index"""
+        with self._write_lock:
+            if incident["id"] in self._by_id:
+                raise DuplicateIncident(f"Incident '{incident['id']}' already exists")
+
+            incident = IncidentRecord.from_mapping(incident)
+            key = self._key(incident)  # Raises ValueError before anything is published
+            # Published first, so any index key a reader sees resolves
+            self._by_id[incident["id"]] = incident
+            self.columns.append(incident)
+            for field, index in self._indexes.items():
+                value = incident.get(field)
+                index[value] = self._insert(index.get(value, []), key)
+            self._timeline = self._insert(self._timeline, key)
+            self._version += 1
+
+        return incident
+
+    def add_many(self, incidents: Iterable[Dict]) -> int:
+        """Add a batch of incidents in any order, sorting each index once"""
+        with self._write_lock:
+            records = [IncidentRecord.from_mapping(incident) for incident in incidents]
+            ids = [record["id"] for record in records]
+            keys = [self._key(record) for record in records]
+            seen = set()
+            for incident_id in ids:
+                if incident_id in self._by_id or incident_id in seen:
+                    raise DuplicateIncident(f"Incident '{incident_id}' already exists")
+                seen.add(incident_id)
+            start = len(self.columns)
+            self._by_id.update(zip(ids, records))
+            self.columns.extend(records)
+
+            arrays = self.columns.arrays()
+            for field, index in self._indexes.items():
+                # Group by the new rows' codes rather than decoding each record's value
+                values = vocabulary(field).values
+                grouped: Dict[str, List[tuple]] = {}
+                for record, key, code in zip(records, keys, arrays[field][start:].tolist()):
+                    grouped.setdefault(values[code] if code >= 0 else record.get(field), []).append(key)
+                for value, added in grouped.items():
+                    index[value] = sorted(index.get(value, []) + added)
+            self._timeline = sorted(self._timeline + keys)
+            self._version += 1
+
+        return len(records)
+
+    def update(self, incident_id: str, **changes) -> Optional[Dict]:
+        """Apply field changes to an incident, moving it between indexes as needed"""
+        if "id" in changes or "timestamp" in changes:
+            raise ValueError("Incident id and timestamp cannot be changed")
+
+        with self._write_lock:
+            incident = self._by_id.get(incident_id)
+            if incident is None:
+                return None
+
+            updated = incident.replace(**changes)
+            self.columns.update(updated)
+            key = self._key(incident)
+            for field, value in changes.items():
+                index = self._indexes.get(field)
+                if index is not None and incident.get(field) != value:
+                    index[value] = self._insert(index.get(value, []), key)
+                    index[incident.get(field)] = self._remove(index.get(incident.get(field), []), key)
+            # Readers holding the old record keep a consistent copy
+            self._by_id[incident_id] = updated
+            self._version += 1
+
+        return updated
+
+    def _keys_for(self, service: Optional[str], severity: Optional[str], status: Optional[str]) -> List[tuple]:
+        """Pick the smallest index that satisfies one of the filters"""
+        filters = {"service": service, "severity": severity, "status": status}
+        candidates = [
+            self._indexes[field].get(value, [])
+            for field, value in filters.items()
+            if value is not None
+        ]
+        if not candidates:
+            return self._timeline
+        return min(candidates, key=len)
+
+    @staticmethod
+    def _bounds(keys: List[tuple], since: Optional[int], until: Optional[int],
+                before: Optional[tuple] = None) -> tuple:
+        """Positions [start, end) of the keys inside the time range"""
+        start = 0 if since is None else bisect_left(keys, (since,))
+        end = len(keys) if until is None else bisect_left(keys, (until,))
+        if before is not None:
+            timestamp, incident_id = before
+            if isinstance(timestamp, str):
+                timestamp = parse_timestamp(timestamp)
+            end = min(end, bisect_left(keys, (timestamp, incident_id)))
+        return start, max(start, end)
+
+    def latest(self, limit: Optional[int] = None, service: Optional[str] = None,
+               severity: Optional[str] = None, status: Optional[str] = None,
+               before: Optional[tuple] = None, since: Optional[int] = None,
+               until: Optional[int] = None) -> List[Dict]:
+        """Get the most recent incidents matching every given filter
+
+        `since` and `until` bound the timestamp to [since, until) in wall-clock
+        microseconds. `before` is a (timestamp, id) key, with the timestamp as
+        ISO text or microseconds; only older incidents are returned.
+        """
+        filters = {"service": service, "severity": severity, "status": status}
+        wanted = {field: value for field, value in filters.items() if value is not None}
+
+        keys = self._keys_for(service, severity, status)
+        start, end = self._bounds(keys, since, until, before)
+        if len(wanted) > 1:
+            matches = self._matching(keys, start, end, wanted)
+        else:
+            # Every key in a single filter's index already matches it
+            matches = (self._by_id[keys[position][1]] for position in range(end - 1, start - 1, -1))
+        return list(islice(matches, None if limit is None else max(limit, 0)))
+
+    def _matching(self, keys: List[tuple], lo: int, end: int, wanted: Dict[str, str]) -> Iterator[Dict]:
+        """Incidents among keys[lo:end], newest first, that match every filter
+
+        Candidates are checked against the columns a chunk at a time, with
+        chunks growing so a small limit stays cheap and a scan stays fast.
+        """
+        codes = self.columns.codes(**wanted)
+        if codes is None:
+            return
+        chunk = 64
+        while end > lo:
+            start = max(lo, end - chunk)
+            ids = [keys[position][1] for position in range(end - 1, start - 1, -1)]
+            arrays = self.columns.arrays()
+            rows = np.fromiter((self.columns.row(incident_id) for incident_id in ids), dtype=np.int64, count=len(ids))
+            matched = np.ones(len(ids), dtype=bool)
+            for field, code in codes.items():
+                matched &= arrays[field][rows] == code
+            for incident_id in compress(ids, matched):
+                yield self._by_id[incident_id]
+            end, chunk = start, min(chunk * 4, 16384)
+
+    def latest_for_services(self, services: Iterable[str], limit: Optional[int] = None) -> List[Dict]:
+        """Get the most recent incidents across several services"""
+        streams = [reversed(self._indexes["service"].get(service, [])) for service in set(services)]
+        keys = merge(*streams, reverse=True)
+        return [self._by_id[key[1]] for key in islice(keys, None if limit is None else max(limit, 0))]
+
+    def count(self, service: Optional[str] = None, severity: Optional[str] = None,
+              status: Optional[str] = None, since: Optional[int] = None,
+              until: Optional[int] = None) -> int:
+        """Count incidents matching every given filter within [since, until)"""
+        filters = {"service": service, "severity": severity, "status": status}
+        wanted = {field: value for field, value in filters.items() if value is not None}
+        if len(wanted) <= 1:
+            start, end = self._bounds(self._keys_for(service, severity, status), since, until)
+            return end - start
+        return int(self.columns.mask(since=since, until=until, **wanted).sum())
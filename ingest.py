@@ -0,0 +1,153 @@
+# ingest.py - Parsing and bulk validation for batched telemetry payloads
+
+import json
+
+import re
+
+import struct
+
+import time
+
+from typing import Dict, Iterable, List, NamedTuple, Tuple
+
+import numpy as np
+
+NDJSON_CONTENT_TYPES = ("application/x-ndjson", "application/ndjson", "application/jsonl")
+BINARY_CONTENT_TYPE = "application/x-sentinel-metrics"
+
+# Binary layout (little-endian), one columnar block per series:
+#   header:  b"SNTL" | u8 version | u32 block count
+#   block:   u16 service length | service utf-8 | u8 metric length | metric utf-8
+#            | u32 sample count n | n x f64 timestamps | n x f64 values
+BINARY_MAGIC = b"SNTL"
+BINARY_VERSION = 1
+_HEADER = struct.Struct("<4sBI")
+
+NAME_PATTERN = re.compile(r"^[A-Za-z0-9_.:-]{1,128}$")
+MAX_CLOCK_SKEW_SECONDS = 300
+
+
+class IngestError(ValueError):
+    """Raised when a payload cannot be parsed at all"""
+
+
+class MetricBlock(NamedTuple):
+    service: str
+    metric: str
+    timestamps: np.ndarray
+    values: np.ndarray
+
+
+def parse_ndjson(body: bytes) -> List[MetricBlock]:
+    """Parse NDJSON where every line is one columnar block
+
+    Each line looks like {"service": ..., "metric": ..., "timestamps": [...],
+    "values": [...]}; a single "timestamp" may replace "timestamps". Both
+    arrays must be flat and of equal length.
+    """
+    blocks = []
+    for line_number, line in enumerate(body.splitlines(), start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+            values = np.asarray(row["values"], dtype=np.float64)
+            if "timestamps" in row:
+                timestamps = np.asarray(row["timestamps"], dtype=np.float64)
+            else:
+                timestamps = np.full(values.shape, float(row["timestamp"]))
+            if values.ndim != 1 or timestamps.ndim != 1:
+                raise ValueError("timestamps and values must be flat arrays")
+            if len(timestamps) != len(values):
+                raise ValueError("timestamps and values differ in length")
+            blocks.append(MetricBlock(str(row["service"]), str(row["metric"]), timestamps, values))
+        except (ValueError, KeyError, TypeError) as error:
+            raise IngestError(f"Line {line_number}: {error}")
+    return blocks
+
+
+def parse_binary(body: bytes) -> List[MetricBlock]:
+    """Parse the compact columnar binary format (arrays are zero-copy views)"""
+    if len(body) < _HEADER.size:
+        raise IngestError("Payload shorter than header")
+    magic, version, block_count = _HEADER.unpack_from(body, 0)
+    if magic != BINARY_MAGIC or version != BINARY_VERSION:
+        raise IngestError("Unrecognised binary payload header")
+
+    blocks, offset = [], _HEADER.size
+    try:
+        for _ in range(block_count):
+            (service_length,) = struct.unpack_from("<H", body, offset)
+            offset += 2
+            service = body[offset:offset + service_length].decode("utf-8")
+            offset += service_length
+            (metric_length,) = struct.unpack_from("<B", body, offset)
+            offset += 1
+            metric = body[offset:offset + metric_length].decode("utf-8")
+            offset += metric_length
+            (count,) = struct.unpack_from("<I", body, offset)
+            offset += 4
+
+            timestamps = np.frombuffer(body, dtype="<f8", count=count, offset=offset)
+            offset += 8 * count
+            values = np.frombuffer(body, dtype="<f8", count=count, offset=offset)
+            offset += 8 * count
+            blocks.append(MetricBlock(service, metric, timestamps, values))
+    except (struct.error, ValueError, UnicodeDecodeError) as error:
+        raise IngestError(f"Truncated or malformed binary payload: {error}")
+    return blocks
+
+
+def encode_binary(blocks: Iterable[Tuple[str, str, Iterable[float], Iterable[float]]]) -> bytes:
+    """Encode (service, metric, timestamps, values) blocks in the binary format"""
+    blocks = list(blocks)
+    parts = [_HEADER.pack(BINARY_MAGIC, BINARY_VERSION, len(blocks))]
+    for service, metric, timestamps, values in blocks:
+        service_bytes, metric_bytes = service.encode("utf-8"), metric.encode("utf-8")
+        timestamps = np.ascontiguousarray(timestamps, dtype="<f8")
+        values = np.ascontiguousarray(values, dtype="<f8")
+        parts.append(struct.pack("<H", len(service_bytes)) + service_bytes)
+        parts.append(struct.pack("<B", len(metric_bytes)) + metric_bytes)
+        parts.append(struct.pack("<I", len(values)))
+        parts.append(timestamps.tobytes())
+        parts.append(values.tobytes())
+    return b"".join(parts)
+
+
+def parse_payload(body: bytes, content_type: str) -> List[MetricBlock]:
+    """Dispatch on content type"""
+    media_type = content_type.split(";")[0].strip().lower()
+    if media_type == BINARY_CONTENT_TYPE:
+        return parse_binary(body)
+    if media_type in NDJSON_CONTENT_TYPES:
+        return parse_ndjson(body)
+    raise IngestError(f"Unsupported content type '{media_type}'")
+
+
+def validate_block(block: MetricBlock, now: float = None) -> Tuple[np.ndarray, str]:
+    """Vectorized validation of one block
+
+    Returns a boolean mask of acceptable samples and, when the whole block is
+    rejected, the reason.
+    """
+    if not NAME_PATTERN.match(block.service) or not NAME_PATTERN.match(block.metric):
+        return np.zeros(len(block.values), dtype=bool), "invalid service or metric name"
+    if len(block.timestamps) != len(block.values):
+        return np.zeros(len(block.values), dtype=bool), "timestamps and values differ in length"
+
+    now = time.time() if now is None else now
+    mask = (np.isfinite(block.values) & np.isfinite(block.timestamps)
+            & (block.timestamps > 0) & (block.timestamps <= now + MAX_CLOCK_SKEW_SECONDS))
+    return mask, ""
+
+
+def summarize(blocks: List[MetricBlock], masks: List[np.ndarray], errors: List[Dict]) -> Dict:
+    """Single acknowledgement for the whole payload"""
+    accepted = int(sum(int(mask.sum()) for mask in masks))
+    total = int(sum(len(block.values) for block in blocks))
+    return {
+        "blocks": len(blocks),
+        "accepted": accepted,
+        "rejected": total - accepted,
+        "errors": errors[:20],
+    }
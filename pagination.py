@@ -0,0 +1,62 @@
+# pagination.py - Opaque keyset cursors and field projection for list endpoints
+
+import base64
+
+import json
+
+from itertools import islice
+
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+
+def encode_cursor(key: Sequence) -> str:
+    """Opaque, URL-safe cursor for a sort key"""
+    encoded = json.dumps(list(key), separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(encoded).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, types: Optional[Sequence[type]] = None) -> tuple:
+    """Sort key from a cursor; raises ValueError for anything malformed
+
+    With `types`, the key must have one element of exactly that type per
+    entry (so a bool is not accepted as an int).
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        key = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except (ValueError, UnicodeError) as error:
+        raise ValueError(f"Invalid cursor: {error}")
+    if not isinstance(key, list) or not key:
+        raise ValueError("Invalid cursor")
+    if types is not None and (len(key) != len(types) or any(type(item) is not kind for item, kind in zip(key, types))):
+        raise ValueError("Invalid cursor")
+    return tuple(key)
+
+
+def parse_fields(fields: Optional[str]) -> Optional[Tuple[str, ...]]:
+    """Comma-separated field list, or None for whole records"""
+    if not fields:
+        return None
+    return tuple(field.strip() for field in fields.split(",") if field.strip()) or None
+
+
+def project(records: Iterable[Dict], fields: Optional[Tuple[str, ...]]) -> List[Dict]:
+    """Keep only the requested fields of each record"""
+    if fields is None:
+        return list(records)
+    return [{field: record[field] for field in fields if field in record} for record in records]
+
+
+def take_page(records: Iterable[Dict], limit: Optional[int],
+              key: Callable[[Dict], Sequence]) -> Tuple[List[Dict], Optional[str]]:
+    """First `limit` records of an already positioned iterator, plus the next cursor
+
+    Reads one record past the page to learn whether another page exists.
+    """
+    if limit is None:
+        return list(records), None
+    limit = max(limit, 0)
+    page = list(islice(records, limit + 1))
+    if len(page) <= limit or not limit:
+        return page[:limit], None
+    return page[:limit], encode_cursor(key(page[limit - 1]))
@@ -0,0 +1,131 @@
+# realtime.py - Shared producer and fan-out for streamed real-time metrics
+
+import asyncio
+
+from datetime import datetime
+
+from typing import Any, Callable, Dict, Optional, Set
+
+
+def diff_snapshots(previous: Dict, current: Dict) -> Dict:
+    """Describe what changed between two metric snapshots
+
+    Snapshots map service name -> metric dict under "metrics"; every other
+    top-level key is compared as a whole value.
+    """
+    delta: Dict[str, Any] = {"changed": {}, "removed": []}
+
+    for service, metrics in current["metrics"].items():
+        before = previous["metrics"].get(service, {})
+        changed = {field: value for field, value in metrics.items() if before.get(field) != value}
+        if changed:
+            delta["changed"][service] = changed
+    delta["removed"] = [service for service in previous["metrics"] if service not in current["metrics"]]
+
+    for key, value in current.items():
+        if key != "metrics" and previous.get(key) != value:
+            delta[key] = value
+    return delta
+
+
+class Subscription:
+    """One client's bounded message queue"""
+
+    def __init__(self, maxsize: int):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+
+    def offer(self, message: Dict, snapshot: Dict) -> bool:
+        """Queue a message; a client that has fallen behind is reset to one full snapshot
+
+        Returns True when the client had to be resynchronised.
+        """
+        try:
+            self.queue.put_nowait(message)
+            return False
+        except asyncio.QueueFull:
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait({"type": "snapshot", "data": snapshot})
+            return True
+
+    async def get(self) -> Dict:
+        return await self.queue.get()
+
+
+class MetricsBroadcaster:
+    """Computes one snapshot per tick and fans deltas out to every subscriber
+
+    The producer task only runs while at least one client is subscribed.
+    Each subscriber holds at most queue_size messages, so a slow client costs
+    bounded memory and is resynchronised instead of buffering forever.
+    """
+
+    def __init__(self, producer: Callable[[], Dict], interval: float = 5.0, queue_size: int = 16):
+        self.producer = producer
+        self.interval = interval
+        self.queue_size = queue_size
+        self.snapshot: Optional[Dict] = None
+        self.ticks = 0
+        self.resyncs = 0
+
+        self._subscribers: Set[Subscription] = set()
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    def subscribe(self) -> Subscription:
+        """Register a client; its first message is the current full snapshot"""
+        subscription = Subscription(self.queue_size)
+        idle = self._task is None or self._task.done()
+        if self.snapshot is None or idle:
+            # Nobody was listening, so the last snapshot may be stale
+            self._publish()
+        subscription.offer({"type": "snapshot", "data": self.snapshot}, self.snapshot)
+        self._subscribers.add(subscription)
+
+        if idle:
+            self._task = asyncio.create_task(self._run())
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        self._subscribers.discard(subscription)
+
+    def _publish(self):
+        snapshot = self.producer()
+        previous, self.snapshot = self.snapshot, snapshot
+        self.ticks += 1
+
+        if previous is None:
+            return
+        delta = diff_snapshots(previous, snapshot)
+        message = {"type": "delta", "data": delta}
+        for subscription in list(self._subscribers):
+            self.resyncs += subscription.offer(message, snapshot)
+
+    async def _run(self):
+        while self._subscribers:
+            await asyncio.sleep(self.interval)
+            if self._subscribers:
+                self._publish()
+
+    async def stop(self):
+        """Stop the producer task and drop every subscriber"""
+        self._subscribers.clear()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> Dict:
+        return {
+            "subscribers": len(self._subscribers),
+            "interval_seconds": self.interval,
+            "ticks": self.ticks,
+            "resyncs": self.resyncs,
+            "timestamp": datetime.now().isoformat(),
+        }
@@ -0,0 +1,372 @@
+# records.py - Compact slot-based incident records and array-backed incident columns
+
+import sys
+
+import threading
+
+import time
+
+from collections.abc import Mapping
+
+from datetime import datetime, timedelta
+
+from typing import Dict, Iterator, List, Optional
+
+import numpy as np
+
+_MISSING = object()
+_WALL_EPOCH = datetime(1970, 1, 1)
+_MICROSECOND = timedelta(microseconds=1)
+
+
+class Vocabulary:
+    """Interns the values of one categorical field as small integer codes
+
+    Codes are handed out on first sight and never reused, so a code stays
+    valid for the life of the process.
+    """
+
+    def __init__(self):
+        self._codes: Dict[str, int] = {}
+        self.values: List[str] = []
+        self._lock = threading.Lock()
+
+    def code(self, value: str) -> int:
+        code = self._codes.get(value)
+        if code is None:
+            with self._lock:
+                code = self._codes.get(value)
+                if code is None:
+                    code = self._codes[value] = len(self.values)
+                    self.values.append(sys.intern(value))
+        return code
+
+    def lookup(self, value, default: Optional[int] = None) -> Optional[int]:
+        """Code of a value already seen, without adding it"""
+        return self._codes.get(value, default)
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+
+_vocabularies: Dict[str, Vocabulary] = {}
+_vocabularies_lock = threading.Lock()
+
+
+def vocabulary(field: str) -> Vocabulary:
+    """The process-wide vocabulary for a categorical field"""
+    found = _vocabularies.get(field)
+    if found is None:
+        with _vocabularies_lock:
+            found = _vocabularies.setdefault(field, Vocabulary())
+    return found
+
+
+def wall_micros(moment: datetime) -> int:
+    """Wall-clock microseconds since 1970-01-01 (aware times are converted to local time first)"""
+    if moment.tzinfo is not None:
+        moment = moment.astimezone().replace(tzinfo=None)
+    return (moment - _WALL_EPOCH) // _MICROSECOND
+
+
+def parse_timestamp(text: str) -> int:
+    """Wall-clock microseconds of any ISO-8601 timestamp; raises ValueError otherwise"""
+    if not isinstance(text, str):
+        raise ValueError(f"Invalid timestamp {text!r}")
+    return wall_micros(datetime.fromisoformat(text))
+
+
+def encode_timestamp(text) -> Optional[int]:
+    """Wall-clock microseconds of a naive ISO timestamp that decodes back to the same text
+
+    None for anything else (other spellings, explicit offsets), which is then
+    stored as text. No time zone is applied, so this is pure arithmetic.
+    """
+    if not isinstance(text, str):
+        return None
+    try:
+        moment = datetime.fromisoformat(text)
+    except ValueError:
+        return None
+    if moment.tzinfo is not None or moment.isoformat() != text:
+        return None
+    return (moment - _WALL_EPOCH) // _MICROSECOND
+
+
+def decode_timestamp(micros: int) -> str:
+    return (_WALL_EPOCH + timedelta(microseconds=micros)).isoformat()
+
+
+def month_range(moment: datetime) -> tuple:
+    """[start, end) wall-clock microseconds of the calendar month containing moment"""
+    start = moment.replace(day=1, hour=0, minute=0, second=0, microsecond=0, tzinfo=None)
+    end = start.replace(year=start.year + 1, month=1) if start.month == 12 else start.replace(month=start.month + 1)
+    return wall_micros(start), wall_micros(end)
+
+
+def local_offset_micros() -> int:
+    """The host's current UTC offset, to turn wall-clock microseconds into epoch ones"""
+    return time.localtime().tm_gmtoff * 1_000_000
+
+
+def _categorical_encoder(codes: Vocabulary):
+    def encode(value):
+        return codes.code(value) if isinstance(value, str) else _MISSING
+    return encode
+
+
+def _timestamp_encoder(value):
+    micros = encode_timestamp(value)
+    return _MISSING if micros is None else micros
+
+
+def _text_encoder(value):
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+class CompactRecord(Mapping):
+    """Read-only mapping whose known fields live in slots, encoded by kind
+
+    Subclasses list FIELDS (in JSON key order) with one `_<field>` slot
+    each, plus which fields are CATEGORICAL (stored as vocabulary codes),
+    TIMESTAMPS (ISO strings stored as wall-clock microseconds) and TEXT
+    (interned). Values that do not fit their encoding, and fields outside
+    FIELDS, are kept verbatim in `_extra`. Reads decode back to exactly
+    the values given, so the record serialises to the same JSON as a dict.
+    """
+
+    __slots__ = ("_extra",)
+
+    FIELDS = ()
+    CATEGORICAL = frozenset()
+    TIMESTAMPS = frozenset()
+    TEXT = frozenset()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        layout, encoders = {}, []
+        for field in cls.FIELDS:
+            if field in cls.CATEGORICAL:
+                encode, decode = _categorical_encoder(vocabulary(field)), vocabulary(field).values.__getitem__
+            elif field in cls.TIMESTAMPS:
+                encode, decode = _timestamp_encoder, decode_timestamp
+            else:
+                encode, decode = (_text_encoder if field in cls.TEXT else None), None
+            layout[field] = ("_" + field, decode)
+            encoders.append((field, "_" + field, encode))
+        cls._LAYOUT = layout
+        cls._ENCODERS = tuple(encoders)
+
+    @classmethod
+    def from_mapping(cls, data: Mapping) -> "CompactRecord":
+        if type(data) is cls:
+            return data
+        record = cls.__new__(cls)
+        set_slot = object.__setattr__
+        extra = None
+        present = 0
+        for field, slot, encode in cls._ENCODERS:
+            value = data.get(field, _MISSING)
+            if value is not _MISSING:
+                present += 1
+                if encode is not None:
+                    encoded = encode(value)
+                    if encoded is _MISSING:
+                        extra = extra or {}
+                        extra[field] = value
+                    value = encoded
+            set_slot(record, slot, value)
+        if len(data) > present:
+            extra = extra or {}
+            extra.update((key, value) for key, value in data.items() if key not in cls._LAYOUT)
+        set_slot(record, "_extra", extra)
+        return record
+
+    def __setattr__(self, name, value):
+        raise TypeError(f"{type(self).__name__} is read-only; use replace()")
+
+    def __getitem__(self, key):
+        layout = self._LAYOUT.get(key)
+        if layout is not None:
+            value = getattr(self, layout[0])
+            if value is not _MISSING:
+                return value if layout[1] is None else layout[1](value)
+        if self._extra is not None and key in self._extra:
+            return self._extra[key]
+        raise KeyError(key)
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def __contains__(self, key) -> bool:
+        layout = self._LAYOUT.get(key)
+        if layout is not None and getattr(self, layout[0]) is not _MISSING:
+            return True
+        return self._extra is not None and key in self._extra
+
+    def __iter__(self) -> Iterator[str]:
+        for field, (slot, _) in self._LAYOUT.items():
+            if getattr(self, slot) is not _MISSING:
+                yield field
+        if self._extra is not None:
+            yield from (key for key in self._extra if key not in self._LAYOUT)
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def replace(self, **changes) -> "CompactRecord":
+        """A new record with the given fields changed"""
+        return type(self).from_mapping({**self, **changes})
+
+    def code(self, field: str) -> int:
+        """Vocabulary code of a categorical field (-1 when absent or not a string)"""
+        value = getattr(self, self._LAYOUT[field][0])
+        return -1 if value is _MISSING else value
+
+    def __reduce__(self):
+        # Codes are only meaningful in this process, so pickle the decoded fields
+        return (type(self).from_mapping, (dict(self),))
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({dict(self)!r})"
+
+
+class IncidentRecord(CompactRecord):
+    """An incident in a fraction of the memory of the equivalent dict (no per-record hash table or strings)"""
+
+    __slots__ = ("_id", "_service", "_severity", "_timestamp", "_description",
+                 "_status", "_impact", "_assigned_to")
+
+    FIELDS = ("id", "service", "severity", "timestamp", "description", "status", "impact", "assigned_to")
+    CATEGORICAL = frozenset({"service", "severity", "status", "assigned_to"})
+    TIMESTAMPS = frozenset({"timestamp"})
+    TEXT = frozenset({"description", "impact"})
+
+    @property
+    def timestamp_micros(self) -> int:
+        """Timestamp as wall-clock microseconds (parsed at ingest unless it was kept as text)"""
+        value = self._timestamp
+        return parse_timestamp(self["timestamp"]) if value is _MISSING or isinstance(value, str) else value
+
+
+class IncidentColumns:
+    """Array-backed incident columns for analytical scans
+
+    One row per incident in insertion order. Categorical columns hold
+    vocabulary codes (-1 when absent); `timestamp` holds wall-clock
+    microseconds. Rows are appended in place and arrays are replaced, not
+    resized, when they grow, so a reader holding `arrays()` keeps a
+    consistent prefix.
+    """
+
+    CATEGORICAL = ("service", "severity", "status")
+
+    def __init__(self, capacity: int = 1024):
+        self._arrays = self._allocate(capacity)
+        self._rows: Dict[str, int] = {}
+        self.ids: List[str] = []
+        self._length = 0
+
+    def _allocate(self, capacity: int) -> Dict[str, np.ndarray]:
+        arrays = {field: np.full(capacity, -1, dtype=np.int32) for field in self.CATEGORICAL}
+        arrays["timestamp"] = np.zeros(capacity, dtype=np.int64)
+        return arrays
+
+    def __len__(self) -> int:
+        return self._length
+
+    def row(self, incident_id: str) -> int:
+        return self._rows[incident_id]
+
+    def _write(self, arrays: Dict[str, np.ndarray], row: int, record: IncidentRecord):
+        for field in self.CATEGORICAL:
+            arrays[field][row] = record.code(field)
+        arrays["timestamp"][row] = record.timestamp_micros
+
+    def append(self, record: IncidentRecord):
+        """Add a row for a new incident (callers serialise writes)"""
+        row = self._length
+        arrays = self._arrays
+        if row >= len(arrays["timestamp"]):
+            grown = self._allocate(2 * len(arrays["timestamp"]))
+            for field, array in arrays.items():
+                grown[field][:row] = array[:row]
+            arrays = grown
+        self._write(arrays, row, record)
+        self.ids.append(record["id"])
+        self._rows[record["id"]] = row
+        self._arrays = arrays
+        self._length = row + 1
+
+    def extend(self, records: List[IncidentRecord]):
+        """Add rows for a batch of new incidents, filling each column at once"""
+        start, count = self._length, len(records)
+        arrays = self._arrays
+        capacity = len(arrays["timestamp"])
+        if start + count > capacity:
+            while start + count > capacity:
+                capacity *= 2
+            grown = self._allocate(capacity)
+            for field, array in arrays.items():
+                grown[field][:start] = array[:start]
+            arrays = grown
+        for field in self.CATEGORICAL:
+            arrays[field][start:start + count] = [record.code(field) for record in records]
+        arrays["timestamp"][start:start + count] = [record.timestamp_micros for record in records]
+        ids = [record["id"] for record in records]
+        self.ids.extend(ids)
+        self._rows.update(zip(ids, range(start, start + count)))
+        self._arrays = arrays
+        self._length = start + count
+
+    def update(self, record: IncidentRecord):
+        """Rewrite the row of an existing incident"""
+        self._write(self._arrays, self._rows[record["id"]], record)
+
+    def arrays(self) -> Dict[str, np.ndarray]:
+        """Every column trimmed to the current row count"""
+        length, arrays = self._length, self._arrays
+        return {field: array[:length] for field, array in arrays.items()}
+
+    def codes(self, **filters) -> Optional[Dict[str, int]]:
+        """Vocabulary codes for categorical filters; None if a value was never seen"""
+        codes = {}
+        for field, value in filters.items():
+            code = vocabulary(field).lookup(value)
+            if code is None:
+                return None
+            codes[field] = code
+        return codes
+
+    def mask(self, since: Optional[int] = None, until: Optional[int] = None, **filters) -> np.ndarray:
+        """Boolean row mask for incidents matching every categorical filter, within [since, until)"""
+        arrays = self.arrays()
+        codes = self.codes(**filters)
+        if codes is None:
+            return np.zeros(len(arrays["timestamp"]), dtype=bool)
+        mask = np.ones(len(arrays["timestamp"]), dtype=bool)
+        for field, code in codes.items():
+            mask &= arrays[field] == code
+        if since is not None:
+            mask &= arrays["timestamp"] >= since
+        if until is not None:
+            mask &= arrays["timestamp"] < until
+        return mask
+
+    def value_counts(self, field: str, mask: Optional[np.ndarray] = None) -> Dict[str, int]:
+        """Incidents per value of a categorical field, optionally among masked rows"""
+        codes = self.arrays()[field]
+        if mask is not None:
+            codes = codes[mask]
+        counts = np.bincount(codes[codes >= 0])
+        values = vocabulary(field).values
+        return {values[code]: int(count) for code, count in enumerate(counts) if count}
@@ -0,0 +1,204 @@
+# report_jobs.py - Background report generation with coalescing and progress events
+
+import asyncio
+
+from collections import OrderedDict
+
+from datetime import datetime
+
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+from concurrency import IdAllocator
+
+
+class QueueFull(Exception):
+    """Raised when a job is submitted while the queue is at capacity"""
+
+
+class ReportJob:
+    """One queued report and its progress"""
+
+    TERMINAL = ("succeeded", "failed")
+
+    def __init__(self, job_id: str, key: tuple, params: Dict):
+        self.id = job_id
+        self.key = key
+        self.params = params
+        self.status = "queued"
+        self.submitted_at = datetime.now().isoformat()
+        self.started_at: Optional[str] = None
+        self.finished_at: Optional[str] = None
+        self.result: Optional[Dict] = None
+        self.error: Optional[str] = None
+        self._watchers: Set[asyncio.Queue] = set()
+
+    @property
+    def finished(self) -> bool:
+        return self.status in self.TERMINAL
+
+    def to_dict(self) -> Dict:
+        return {
+            "id": self.id,
+            "status": self.status,
+            "params": self.params,
+            "submitted_at": self.submitted_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "report": self.result,
+            "error": self.error,
+        }
+
+    def watch(self) -> asyncio.Queue:
+        """Register for state changes; the first message is the current state"""
+        watcher: asyncio.Queue = asyncio.Queue()
+        watcher.put_nowait(self.to_dict())
+        if not self.finished:
+            self._watchers.add(watcher)
+        return watcher
+
+    def unwatch(self, watcher: asyncio.Queue):
+        self._watchers.discard(watcher)
+
+    def _transition(self, status: str, **fields: Any):
+        self.status = status
+        for name, value in fields.items():
+            setattr(self, name, value)
+        state = self.to_dict()
+        # A job changes state at most three times, so watcher queues stay tiny
+        for watcher in list(self._watchers):
+            watcher.put_nowait(state)
+        if self.finished:
+            self._watchers.clear()
+
+
+class ReportJobQueue:
+    """A bounded worker pool that builds reports off the request path
+
+    Submitting returns a job at once. Requests with the same parameters
+    as a queued or running job join that job instead of building the
+    report again. Finished jobs stay retrievable until `retain` newer ones
+    have finished. Workers start on the first submission and are
+    restarted if the event loop they ran on has gone away.
+    """
+
+    def __init__(self, builder: Callable[[Dict], Awaitable[Dict]], workers: int = 2,
+                 max_pending: int = 64, retain: int = 256):
+        self.builder = builder
+        self.workers = workers
+        self.max_pending = max_pending
+        self.retain = retain
+        self.submitted = 0
+        self.coalesced = 0
+        self.succeeded = 0
+        self.failed = 0
+
+        self._ids = IdAllocator(prefix="JOB-", start=1)
+        self._jobs: Dict[str, ReportJob] = {}
+        self._in_flight: Dict[tuple, ReportJob] = {}
+        self._finished: "OrderedDict[str, None]" = OrderedDict()
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._running = 0
+
+    @property
+    def pending(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    @property
+    def running(self) -> int:
+        return self._running
+
+    def get(self, job_id: str) -> Optional[ReportJob]:
+        return self._jobs.get(job_id)
+
+    def submit(self, params: Dict) -> Tuple[ReportJob, bool]:
+        """Queue a report, returning (job, coalesced)
+
+        Raises QueueFull when max_pending jobs are already waiting.
+        """
+        self._ensure_workers()
+        key = tuple(sorted(params.items()))
+        job = self._in_flight.get(key)
+        if job is not None:
+            self.coalesced += 1
+            return job, True
+
+        if self._queue.qsize() >= self.max_pending:
+            raise QueueFull(f"{self.max_pending} report jobs already pending")
+
+        job = ReportJob(self._ids.allocate(), key, dict(params))
+        self._jobs[job.id] = job
+        self._in_flight[key] = job
+        self._queue.put_nowait(job)
+        self.submitted += 1
+        return job, False
+
+    def _ensure_workers(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is loop and self._tasks:
+            return
+        # First use, or the previous loop was shut down: jobs it never started are queued again
+        waiting = []
+        while self._queue is not None and not self._queue.empty():
+            waiting.append(self._queue.get_nowait())
+        self._loop = loop
+        self._queue = asyncio.Queue()
+        for job in waiting:
+            self._queue.put_nowait(job)
+        self._tasks = [asyncio.create_task(self._work()) for _ in range(self.workers)]
+
+    async def _work(self):
+        while True:
+            job = await self._queue.get()
+            self._running += 1
+            job._transition("running", started_at=datetime.now().isoformat())
+            try:
+                result = await self.builder(job.params)
+            except asyncio.CancelledError:
+                self._finish(job, "failed", error="Cancelled during shutdown")
+                raise
+            except Exception as error:
+                self._finish(job, "failed", error=str(error) or type(error).__name__)
+            else:
+                self._finish(job, "succeeded", result=result)
+            finally:
+                self._running -= 1
+
+    def _finish(self, job: ReportJob, status: str, **fields: Any):
+        if self._in_flight.get(job.key) is job:
+            del self._in_flight[job.key]
+        job._transition(status, finished_at=datetime.now().isoformat(), **fields)
+        if status == "succeeded":
+            self.succeeded += 1
+        else:
+            self.failed += 1
+
+        self._finished[job.id] = None
+        while len(self._finished) > self.retain:
+            expired, _ = self._finished.popitem(last=False)
+            self._jobs.pop(expired, None)
+
+    async def stop(self):
+        """Cancel the workers; jobs they were running are marked failed"""
+        tasks, self._tasks = self._tasks, []
+        for task in tasks:
+            task.cancel()
+        for task in tasks:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+    def stats(self) -> Dict:
+        return {
+            "workers": self.workers,
+            "pending": self.pending,
+            "running": self.running,
+            "submitted": self.submitted,
+            "coalesced": self.coalesced,
+            "succeeded": self.succeeded,
+            "failed": self.failed,
+            "retained": len(self._jobs),
+            "timestamp": datetime.now().isoformat(),
+        }
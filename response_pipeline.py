@@ -0,0 +1,182 @@
+# response_pipeline.py - Fast JSON rendering, conditional GETs and negotiated compression
+
+import gzip
+
+import hashlib
+
+import json
+
+from collections.abc import Mapping
+
+from typing import Any, Callable, Dict, Hashable, Optional
+
+from fastapi import Request
+
+from fastapi.responses import JSONResponse, Response
+
+from cache import TTLCache
+
+try:
+    import orjson
+except ImportError:  # Optional; the stdlib encoder is used instead
+    orjson = None
+
+try:
+    import brotli
+except ImportError:  # Optional; gzip is offered instead
+    brotli = None
+
+
+def _default(value: Any):
+    # Compact records, NumPy scalars and arrays, datetimes and anything else with a sensible str()
+    if isinstance(value, Mapping):
+        return dict(value)
+    if hasattr(value, "tolist"):
+        return value.tolist()
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    return str(value)
+
+
+def dumps(content: Any) -> bytes:
+    """Serialize to compact UTF-8 JSON, with orjson when it is installed"""
+    if orjson is not None:
+        return orjson.dumps(content, default=_default,
+                            option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(content, default=_default, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered with `dumps` (the app's default response class)"""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+class ConditionalJSON:
+    """ETag/If-None-Match handling for read endpoints keyed by a data version
+
+    The ETag is derived from the request URL and the caller's version token,
+    so it is known before the payload is built: a matching If-None-Match
+    returns 304 immediately, and a repeated request for the same version is
+    served from the rendered bytes without calling the builder again. The
+    version itself is echoed in X-Snapshot-Version.
+    """
+
+    def __init__(self, maxsize: int = 256, ttl: float = 300):
+        self._rendered = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    @staticmethod
+    def etag(request: Request, version: Hashable) -> str:
+        digest = hashlib.sha1(f"{request.url.path}?{request.url.query}|{version!r}".encode("utf-8"))
+        return f'W/"{digest.hexdigest()[:20]}"'
+
+    @staticmethod
+    def _matches(request: Request, etag: str) -> bool:
+        header = request.headers.get("if-none-match")
+        if not header:
+            return False
+        candidates = {tag.strip() for tag in header.split(",")}
+        return "*" in candidates or etag in candidates or etag[2:] in candidates
+
+    def respond(self, request: Request, version: Hashable, build: Callable[[], Dict]) -> Response:
+        etag = self.etag(request, version)
+        headers = {"ETag": etag, "Cache-Control": "no-cache", "X-Snapshot-Version": str(version)}
+        if self._matches(request, etag):
+            return Response(status_code=304, headers=headers)
+
+        body = self._rendered.get_or_compute(etag, lambda: dumps(build()))
+        return Response(body, media_type="application/json", headers=headers)
+
+    def clear(self):
+        """Forget every rendered body (e.g. when the data behind the versions is replaced)"""
+        self._rendered.clear()
+
+    def stats(self) -> Dict:
+        return self._rendered.stats()
+
+
+class CompressionMiddleware:
+    """Compress complete responses with brotli or gzip, as the client prefers
+
+    Only bodies sent in a single message are compressed; streamed responses
+    such as SSE pass through untouched so they are never buffered.
+    """
+
+    SKIP_MEDIA_TYPES = ("text/event-stream", "image/", "video/", "application/zip", "application/gzip")
+
+    def __init__(self, app, minimum_size: int = 1024, gzip_level: int = 6, brotli_quality: int = 4):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    def _choose(self, accept_encoding: str) -> Optional[str]:
+        offered = {}
+        for part in accept_encoding.split(","):
+            name, _, params = part.strip().partition(";")
+            quality = 1.0
+            if params.strip().startswith("q="):
+                try:
+                    quality = float(params.strip()[2:])
+                except ValueError:
+                    quality = 0.0
+            if name:
+                offered[name.lower()] = quality
+        for encoding in (("br",) if brotli is not None else ()) + ("gzip",):
+            if offered.get(encoding, offered.get("*", 0)) > 0:
+                return encoding
+        return None
+
+    def _compress(self, body: bytes, encoding: str) -> bytes:
+        if encoding == "br":
+            return brotli.compress(body, quality=self.brotli_quality)
+        return gzip.compress(body, compresslevel=self.gzip_level)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict((key.lower(), value) for key, value in scope["headers"])
+        encoding = self._choose(headers.get(b"accept-encoding", b"").decode("latin-1"))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+
+        async def send_compressed(message):
+            nonlocal start_message
+            if message["type"] == "http.response.start":
+                start_message = message
+                return
+            if start_message is None:
+                await send(message)
+                return
+
+            start, start_message = start_message, None
+            body = message.get("body", b"")
+            response_headers = dict((key.lower(), value) for key, value in start["headers"])
+            media_type = response_headers.get(b"content-type", b"").decode("latin-1")
+
+            if (message.get("more_body") or len(body) < self.minimum_size
+                    or b"content-encoding" in response_headers
+                    or any(media_type.startswith(skip) for skip in self.SKIP_MEDIA_TYPES)):
+                await send(start)
+                await send(message)
+                return
+
+            compressed = self._compress(body, encoding)
+            new_headers = [(key, value) for key, value in start["headers"]
+                           if key.lower() not in (b"content-length", b"vary")]
+            vary = response_headers.get(b"vary")
+            new_headers += [
+                (b"content-encoding", encoding.encode("latin-1")),
+                (b"content-length", str(len(compressed)).encode("latin-1")),
+                (b"vary", vary + b", Accept-Encoding" if vary else b"Accept-Encoding"),
+            ]
+            await send({**start, "headers": new_headers})
+            await send({**message, "body": compressed})
+
+        await self.app(scope, receive, send_compressed)
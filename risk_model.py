@@ -0,0 +1,183 @@
+# risk_model.py - Incremental per-service incident rate model for risk prediction
+
+import threading
+
+import time
+
+from datetime import datetime
+
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from records import local_offset_micros
+
+SECONDS_PER_DAY = 86400
+
+
+def incident_epoch(incident: Dict) -> float:
+    """Epoch seconds of an incident's ISO timestamp (pre-parsed on compact records)"""
+    if hasattr(incident, "timestamp_micros"):
+        return (incident.timestamp_micros - local_offset_micros()) / 1e6
+    return datetime.fromisoformat(incident["timestamp"]).timestamp()
+
+
+class RiskModel:
+    """Exponentially weighted Poisson incident rates, kept up to date per mutation
+
+    Each service owns a row of daily incident counters (and SEV1 and open
+    counters) over a sliding window of `window_days`. A service's daily rate
+    is the exponentially weighted mean of its daily counts with the given
+    half-life, so recent days dominate. Incidents are counted once when they
+    are created or changed; predictions are one matrix-vector product over
+    the counters and never touch incident history.
+
+    The EWMA rate forecasts; it front-loads recent days, so one incident
+    today projects to about three per 30 days. High risk is therefore judged
+    on the plain windowed rate, which matches the real count in the window.
+    """
+
+    HIGH_RISK_INCIDENTS_PER_30_DAYS = 2
+
+    def __init__(self, window_days: int = 30, half_life_days: float = 7.0, clock=time.time):
+        self.window_days = window_days
+        self.half_life_days = half_life_days
+        self.clock = clock
+
+        self._rows: Dict[str, int] = {}
+        self._names: List[str] = []
+        capacity = 64
+        self._counts = np.zeros((capacity, window_days), dtype=np.float64)
+        self._sev1 = np.zeros((capacity, window_days), dtype=np.float64)
+        self._open = np.zeros(capacity, dtype=np.int64)
+        self._day_ids = np.full(window_days, -1, dtype=np.int64)
+        self._newest_day = -1
+        self._lock = threading.Lock()
+
+    def _row(self, service: str) -> int:
+        row = self._rows.get(service)
+        if row is None:
+            row = self._rows[service] = len(self._names)
+            self._names.append(service)
+            if row >= len(self._open):
+                grow = len(self._open)
+                self._counts = np.vstack([self._counts, np.zeros((grow, self.window_days))])
+                self._sev1 = np.vstack([self._sev1, np.zeros((grow, self.window_days))])
+                self._open = np.concatenate([self._open, np.zeros(grow, dtype=np.int64)])
+        return row
+
+    def _advance(self, day: int):
+        """Recycle the columns of days that have slid out of the window"""
+        if day <= self._newest_day:
+            return
+        for stale in range(max(self._newest_day + 1, day - self.window_days + 1), day + 1):
+            column = stale % self.window_days
+            self._counts[:, column] = 0
+            self._sev1[:, column] = 0
+            self._day_ids[column] = stale
+        self._newest_day = day
+
+    def _apply(self, incident: Dict, sign: int, timestamp: float):
+        row = self._row(incident["service"])
+        if incident["status"] != "resolved":
+            self._open[row] += sign
+
+        day = int(timestamp // SECONDS_PER_DAY)
+        self._advance(max(day, int(self.clock() // SECONDS_PER_DAY)))
+        if day <= self._newest_day - self.window_days:
+            return  # Older than the window
+        column = day % self.window_days
+        self._counts[row, column] += sign
+        if incident["severity"] == "SEV1":
+            self._sev1[row, column] += sign
+
+    def add_incident(self, incident: Dict):
+        """Count a newly created (or loaded) incident"""
+        with self._lock:
+            self._apply(incident, 1, incident_epoch(incident))
+
+    def add_columns(self, services: Sequence[str], service_codes: np.ndarray, epoch_micros: np.ndarray,
+                    sev1: np.ndarray, open_: np.ndarray):
+        """Count many loaded incidents at once from columnar data
+
+        `service_codes` index into `services`; the other arrays are parallel
+        per-incident columns. Equivalent to add_incident for each row.
+        """
+        if not len(service_codes):
+            return
+        with self._lock:
+            present = np.unique(service_codes)
+            row_of = np.zeros(int(present.max()) + 1, dtype=np.int64)
+            row_of[present] = [self._row(services[code]) for code in present]
+            rows = row_of[service_codes]
+            np.add.at(self._open, rows[open_], 1)
+
+            days = epoch_micros // (SECONDS_PER_DAY * 1_000_000)
+            self._advance(max(int(days.max()), int(self.clock() // SECONDS_PER_DAY)))
+            live = days > self._newest_day - self.window_days
+            columns = days[live] % self.window_days
+            np.add.at(self._counts, (rows[live], columns), 1)
+            np.add.at(self._sev1, (rows[live & sev1], days[live & sev1] % self.window_days), 1)
+
+    def update_incident(self, incident: Dict, changes: Dict):
+        """Account for changes about to be applied to an incident"""
+        if not any(field in changes and changes[field] != incident[field]
+                   for field in ("service", "severity", "status")):
+            return
+        timestamp = incident_epoch(incident)
+        with self._lock:
+            self._apply(incident, -1, timestamp)
+            self._apply({**incident, **changes}, 1, timestamp)
+
+    def _live(self) -> np.ndarray:
+        ages = self._newest_day - self._day_ids
+        return (self._day_ids >= 0) & (ages < self.window_days)
+
+    def _weights(self) -> np.ndarray:
+        ages = self._newest_day - self._day_ids
+        weights = np.where(self._live(), 0.5 ** (ages / self.half_life_days), 0.0)
+        # Normalise over the whole window so days without incidents count as zeros
+        full = 0.5 ** (np.arange(self.window_days) / self.half_life_days)
+        return weights / full.sum()
+
+    def rates(self) -> Dict[str, np.ndarray]:
+        """Expected incidents per day for every service (and SEV1 only)
+
+        "window" is the unweighted mean daily count over the window.
+        """
+        with self._lock:
+            self._advance(int(self.clock() // SECONDS_PER_DAY))
+            weights = self._weights()
+            count = len(self._names)
+            return {
+                "all": self._counts[:count] @ weights,
+                "window": self._counts[:count] @ (self._live() / self.window_days),
+                "sev1": self._sev1[:count] @ weights,
+                "open": self._open[:count].copy(),
+            }
+
+    def predict(self, lookahead_days: float, top: Optional[int] = 10) -> Dict:
+        """Expected incidents over the next lookahead_days, platform-wide and per service"""
+        rates = self.rates()
+        expected = rates["all"] * lookahead_days
+        probability = 1.0 - np.exp(-expected)
+
+        high_risk = np.flatnonzero(rates["window"] * 30 > self.HIGH_RISK_INCIDENTS_PER_30_DAYS)
+        high_risk = high_risk[np.argsort(-rates["window"][high_risk], kind="stable")]
+        ranked = np.argsort(-expected, kind="stable")[:top]
+
+        return {
+            "predicted_incidents": float(expected.sum()),
+            "predicted_sev1_incidents": float(rates["sev1"].sum() * lookahead_days),
+            "high_risk_services": [self._names[row] for row in high_risk],
+            "service_risks": [
+                {
+                    "service": self._names[row],
+                    "expected_incidents": round(float(expected[row]), 2),
+                    "incident_probability": round(float(probability[row]), 3),
+                    "open_incidents": int(rates["open"][row]),
+                }
+                for row in ranked if expected[row] > 0
+            ],
+        }
+
@@ -0,0 +1,189 @@
+# similarity_cache.py - Near-duplicate incident cache for AI analyses
+
+import re
+
+import threading
+
+import zlib
+
+from collections import OrderedDict
+
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+_MAX_HASH = (1 << 32) - 1
+
+
+def shingles(text: str, size: int = 3) -> set:
+    """Hashed character n-grams of normalised text"""
+    normalised = " ".join(re.findall(r"[a-z0-9]+", text.lower()))
+    if len(normalised) <= size:
+        return {zlib.crc32(normalised.encode("utf-8"))}
+    return {
+        zlib.crc32(normalised[i:i + size].encode("utf-8"))
+        for i in range(len(normalised) - size + 1)
+    }
+
+
+class MinHasher:
+    """MinHash signatures with fixed, seeded permutations (stable across processes)
+
+    Permutations are multiply-shift hashes over 64-bit words, evaluated for all
+    features and permutations in one NumPy pass.
+    """
+
+    def __init__(self, num_perm: int = 64, seed: int = 1):
+        rng = np.random.default_rng(seed)
+        self.num_perm = num_perm
+        self._a = rng.integers(1, 1 << 63, size=(num_perm, 1), dtype=np.uint64) | np.uint64(1)
+        self._b = rng.integers(0, 1 << 63, size=(num_perm, 1), dtype=np.uint64)
+
+    def signature(self, features: set) -> np.ndarray:
+        """uint32 signature, one minimum per permutation"""
+        if not features:
+            return np.full(self.num_perm, _MAX_HASH, dtype=np.uint32)
+        values = np.fromiter(features, dtype=np.uint64, count=len(features))
+        hashed = (self._a * values + self._b) >> np.uint64(32)
+        return hashed.min(axis=1).astype(np.uint32)
+
+    @staticmethod
+    def similarity(left: np.ndarray, right: np.ndarray) -> np.ndarray:
+        """Estimated Jaccard similarity of a signature against one or many (rows of right)"""
+        return (np.asarray(right) == np.asarray(left)).mean(axis=-1)
+
+
+class IncidentSimilarityCache:
+    """Reuse analyses for incidents whose description nearly matches a cached one
+
+    Only incidents on the same service with the same severity are compared.
+    Signatures are banded into an LSH index, so a lookup only scores the few
+    entries that share a band; bucket sizes are capped to keep that bounded.
+    Signatures live in one uint32 matrix, so the candidates are scored in a
+    single vectorized comparison.
+    """
+
+    def __init__(self, threshold: float = 0.8, num_perm: int = 64, bands: int = 16,
+                 max_entries: int = 100_000, max_bucket_size: int = 32):
+        if num_perm % bands:
+            raise ValueError("num_perm must be divisible by bands")
+
+        self.threshold = threshold
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.max_entries = max_entries
+        self.max_bucket_size = max_bucket_size
+        self.hasher = MinHasher(num_perm)
+
+        # entry id -> (matrix row, analysis, band keys); rows of evicted entries are reused
+        self._entries: "OrderedDict[int, tuple]" = OrderedDict()
+        self._buckets: Dict[tuple, List[int]] = {}
+        self._signatures = np.zeros((1024, num_perm), dtype=np.uint32)
+        self._free_rows: List[int] = []
+        self._next_row = 0
+        self._next_id = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @staticmethod
+    def _scope(incident: Dict) -> tuple:
+        return (incident.get("service"), incident.get("severity"))
+
+    def _band_keys(self, scope: tuple, signature: np.ndarray) -> List[tuple]:
+        band_bytes = signature.tobytes()
+        width = self.rows * signature.itemsize
+        return [(scope, band, band_bytes[band * width:(band + 1) * width]) for band in range(self.bands)]
+
+    def _signature(self, incident: Dict) -> np.ndarray:
+        return self.hasher.signature(shingles(incident.get("description", "")))
+
+    def _best_match(self, band_keys: List[tuple], signature: np.ndarray) -> Tuple[Optional[int], float]:
+        candidates = list(dict.fromkeys(
+            entry_id for key in band_keys for entry_id in self._buckets.get(key, ())
+        ))
+        if not candidates:
+            return None, 0.0
+        rows = np.fromiter((self._entries[entry_id][0] for entry_id in candidates), dtype=np.int64, count=len(candidates))
+        scores = MinHasher.similarity(signature, self._signatures[rows])
+        best = int(scores.argmax())
+        return candidates[best], float(scores[best])
+
+    def _allocate_row(self) -> int:
+        if self._free_rows:
+            return self._free_rows.pop()
+        row = self._next_row
+        if row == len(self._signatures):
+            self._signatures = np.vstack([self._signatures, np.zeros_like(self._signatures)])
+        self._next_row += 1
+        return row
+
+    def lookup(self, incident: Dict) -> Optional[Dict]:
+        """Return the analysis of a cached near-duplicate, if any"""
+        signature = self._signature(incident)
+        band_keys = self._band_keys(self._scope(incident), signature)
+
+        with self._lock:
+            entry_id, score = self._best_match(band_keys, signature)
+            if entry_id is not None and score >= self.threshold:
+                self._entries.move_to_end(entry_id)
+                self.hits += 1
+                return self._entries[entry_id][1]
+
+            self.misses += 1
+            return None
+
+    def add(self, incident: Dict, analysis: Dict):
+        """Cache an analysis for an incident"""
+        signature = self._signature(incident)
+        band_keys = self._band_keys(self._scope(incident), signature)
+
+        with self._lock:
+            entry_id = self._next_id
+            self._next_id += 1
+            row = self._allocate_row()
+            self._signatures[row] = signature
+            self._entries[entry_id] = (row, analysis, band_keys)
+
+            for key in band_keys:
+                bucket = self._buckets.setdefault(key, [])
+                bucket.append(entry_id)
+                if len(bucket) > self.max_bucket_size:
+                    bucket.pop(0)
+
+            while len(self._entries) > self.max_entries:
+                self._evict_oldest()
+
+    def _evict_oldest(self):
+        entry_id, (row, _, band_keys) = self._entries.popitem(last=False)
+        self._free_rows.append(row)
+        for key in band_keys:
+            bucket = self._buckets.get(key)
+            if bucket and entry_id in bucket:
+                bucket.remove(entry_id)
+                if not bucket:
+                    del self._buckets[key]
+
+    def clear(self):
+        """Drop every cached analysis"""
+        with self._lock:
+            self._entries.clear()
+            self._buckets.clear()
+            self._free_rows.clear()
+            self._next_row = 0
+
+    def stats(self) -> Dict:
+        """Counters for sizing the cache"""
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_entries": self.max_entries,
+            "threshold": self.threshold,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else None,
+        }
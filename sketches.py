@@ -0,0 +1,250 @@
+# sketches.py - Mergeable quantile sketches for service latency percentiles
+
+import math
+
+import threading
+
+import time
+
+from collections import deque
+
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+
+class DDSketch:
+    """DDSketch quantile sketch with relative-error guarantees
+
+    Values are counted in logarithmic bins, so any quantile is accurate to
+    within relative_accuracy, memory is capped at max_bins, and two sketches
+    built with the same accuracy merge by adding bin counts.
+    """
+
+    def __init__(self, relative_accuracy: float = 0.01, max_bins: int = 2048):
+        self.relative_accuracy = relative_accuracy
+        self.max_bins = max_bins
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+
+        self.bins: Dict[int, int] = {}
+        self.zero_count = 0
+        self.count = 0
+        self.sum = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def _index(self, value: float) -> int:
+        return math.ceil(math.log(value) / self._log_gamma)
+
+    def _value(self, index: int) -> float:
+        # Midpoint of the bin, which keeps the relative error within bounds
+        return 2 * self.gamma ** index / (self.gamma + 1)
+
+    def add(self, value: float, count: int = 1):
+        """Record a value (values <= 0 land in the zero bin)"""
+        if value > 0:
+            index = self._index(value)
+            self.bins[index] = self.bins.get(index, 0) + count
+        else:
+            self.zero_count += count
+        self.count += count
+        self.sum += value * count
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+        self._collapse()
+
+    def add_many(self, values: np.ndarray):
+        """Record a batch of values in one vectorized pass"""
+        values = np.asarray(values, dtype=np.float64)
+        if not len(values):
+            return
+        positive = values[values > 0]
+        if len(positive):
+            indexes, counts = np.unique(np.ceil(np.log(positive) / self._log_gamma).astype(np.int64),
+                                        return_counts=True)
+            for index, count in zip(indexes.tolist(), counts.tolist()):
+                self.bins[index] = self.bins.get(index, 0) + count
+        self.zero_count += int(len(values) - len(positive))
+        self.count += int(len(values))
+        self.sum += float(values.sum())
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+        self._collapse()
+
+    def _collapse(self):
+        """Fold the lowest bins together once over max_bins (keeps high percentiles exact)"""
+        if len(self.bins) <= self.max_bins:
+            return
+        indexes = sorted(self.bins)
+        excess = len(indexes) - self.max_bins
+        target = indexes[excess]
+        for index in indexes[:excess]:
+            self.bins[target] += self.bins.pop(index)
+
+    def merge(self, other: "DDSketch"):
+        """Fold another sketch with the same accuracy into this one"""
+        if not math.isclose(other.gamma, self.gamma):
+            raise ValueError("Cannot merge sketches with different relative accuracy")
+        for index, count in other.bins.items():
+            self.bins[index] = self.bins.get(index, 0) + count
+        self.zero_count += other.zero_count
+        self.count += other.count
+        self.sum += other.sum
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self._collapse()
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Estimate the q-quantile (0 <= q <= 1)"""
+        if not self.count:
+            return None
+        rank = q * (self.count - 1)
+        if rank < self.zero_count:
+            return max(0.0, self.min)
+
+        seen = self.zero_count
+        for index in sorted(self.bins):
+            seen += self.bins[index]
+            if seen > rank:
+                return min(max(self._value(index), self.min), self.max)
+        return self.max
+
+    def to_dict(self) -> Dict:
+        """Serialisable form, for merging sketches across workers"""
+        return {
+            "relative_accuracy": self.relative_accuracy,
+            "bins": {str(index): count for index, count in self.bins.items()},
+            "zero_count": self.zero_count,
+            "count": self.count,
+            "sum": self.sum,
+            "min": self.min if self.count else None,
+            "max": self.max if self.count else None,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict, max_bins: int = 2048) -> "DDSketch":
+        sketch = cls(data["relative_accuracy"], max_bins)
+        sketch.bins = {int(index): count for index, count in data["bins"].items()}
+        sketch.zero_count = data["zero_count"]
+        sketch.count = data["count"]
+        sketch.sum = data["sum"]
+        if sketch.count:
+            sketch.min, sketch.max = data["min"], data["max"]
+        return sketch
+
+
+class LatencySketches:
+    """Per-service latency sketches in one-minute windows
+
+    Each service keeps at most `windows` minute sketches, so memory per
+    service is constant; wider ranges are answered by merging windows.
+    """
+
+    PERCENTILES = (("p50", 0.50), ("p95", 0.95), ("p99", 0.99))
+
+    def __init__(self, window_seconds: int = 60, windows: int = 60,
+                 relative_accuracy: float = 0.01, clock=time.time):
+        self.window_seconds = window_seconds
+        self.windows = windows
+        self.relative_accuracy = relative_accuracy
+        self.clock = clock
+        self._services: Dict[str, deque] = {}
+        self._lock = threading.Lock()
+
+    def _window(self, service: str, timestamp: float) -> Optional[DDSketch]:
+        """Sketch for the window holding timestamp, creating it in time order if missing
+
+        None when the window is older than every retained one.
+        """
+        start = int(timestamp // self.window_seconds) * self.window_seconds
+        windows = self._services.setdefault(service, deque(maxlen=self.windows))
+
+        if not windows or windows[-1][0] < start:
+            windows.append((start, DDSketch(self.relative_accuracy)))
+            return windows[-1][1]
+        position = len(windows)
+        for window_start, sketch in reversed(windows):
+            if window_start == start:
+                return sketch
+            if window_start < start:
+                break
+            position -= 1
+        if position == 0 and len(windows) == windows.maxlen:
+            return None
+        # A backfilled minute between (or before) the retained windows
+        if len(windows) == windows.maxlen:
+            windows.popleft()
+            position -= 1
+        sketch = DDSketch(self.relative_accuracy)
+        windows.insert(position, (start, sketch))
+        return sketch
+
+    def record(self, service: str, latency_ms: float, timestamp: Optional[float] = None):
+        """Record one request latency"""
+        with self._lock:
+            sketch = self._window(service, self.clock() if timestamp is None else timestamp)
+            if sketch is not None:
+                sketch.add(latency_ms)
+
+    def record_many(self, service: str, latencies_ms: Iterable[float], timestamp: Optional[float] = None):
+        """Record a batch of request latencies observed in the same window"""
+        with self._lock:
+            sketch = self._window(service, self.clock() if timestamp is None else timestamp)
+            if sketch is not None:
+                sketch.add_many(np.asarray(latencies_ms, dtype=np.float64))
+
+    def record_batch(self, service: str, timestamps: np.ndarray, latencies_ms: np.ndarray) -> np.ndarray:
+        """Record latencies with their own timestamps, one sketch update per window
+
+        Returns a mask of the samples recorded; samples older than every
+        retained window are dropped.
+        """
+        timestamps = np.asarray(timestamps, dtype=np.float64)
+        latencies_ms = np.asarray(latencies_ms, dtype=np.float64)
+        recorded = np.zeros(len(timestamps), dtype=bool)
+        if not len(timestamps):
+            return recorded
+        starts = (timestamps // self.window_seconds).astype(np.int64) * self.window_seconds
+        # Newest window first, so backfilled minutes slot in behind it rather than evicting it
+        order = np.argsort(-starts, kind="stable")
+        starts, latencies_ms = starts[order], latencies_ms[order]
+        boundaries = np.flatnonzero(np.diff(starts)) + 1
+
+        with self._lock:
+            for window_start, chunk, rows in zip(starts[np.r_[0, boundaries]], np.split(latencies_ms, boundaries),
+                                                 np.split(order, boundaries)):
+                sketch = self._window(service, float(window_start))
+                if sketch is not None:
+                    sketch.add_many(chunk)
+                    recorded[rows] = True
+        return recorded
+
+    def merged(self, service: str, minutes: int = 1) -> DDSketch:
+        """Merge the service's windows covering the last `minutes` minutes
+
+        Windows that start in the future (samples from a fast clock) are left
+        out until their minute arrives.
+        """
+        now = self.clock()
+        cutoff = now - minutes * 60
+        merged = DDSketch(self.relative_accuracy)
+        with self._lock:
+            for window_start, sketch in self._services.get(service, ()):
+                if window_start + self.window_seconds > cutoff and window_start <= now:
+                    merged.merge(sketch)
+        return merged
+
+    def percentiles(self, service: str, minutes: int = 1) -> Dict:
+        """P50/P95/P99 latency over the last `minutes` minutes"""
+        sketch = self.merged(service, minutes)
+        result = {}
+        for name, q in self.PERCENTILES:
+            value = sketch.quantile(q)
+            result[name] = round(value, 1) if value is not None else None
+        result["samples"] = sketch.count
+        result["window_minutes"] = minutes
+        return result
+
+    def services(self) -> List[str]:
+        return list(self._services)
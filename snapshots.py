@@ -0,0 +1,135 @@
+# snapshots.py - Versioned, immutable views of platform state for lock-free reads
+
+import threading
+
+from types import MappingProxyType
+
+from typing import Any, Callable, Dict, Mapping, NamedTuple, Tuple
+
+import numpy as np
+
+from records import CompactRecord
+
+# Numeric service fields mirrored as read-only arrays for vectorized scoring
+SERVICE_METRICS = ("health", "latency", "error_rate", "cpu", "memory")
+
+
+class FrozenRecord(dict):
+    """A dict that refuses changes once published
+
+    Still a real dict, so JSON encoders and `{**record, **changes}` work
+    unchanged; writers build a new record instead of editing a shared one.
+    """
+
+    __slots__ = ()
+
+    def _readonly(self, *args, **kwargs):
+        raise TypeError("FrozenRecord is read-only; build a new record instead")
+
+    __setitem__ = __delitem__ = __ior__ = _readonly
+    clear = pop = popitem = setdefault = update = _readonly
+
+    def __reduce__(self):
+        return (FrozenRecord, (dict(self),))
+
+    def __copy__(self) -> "FrozenRecord":
+        return self
+
+    def __deepcopy__(self, memo) -> "FrozenRecord":
+        return self
+
+
+def freeze(value: Any) -> Any:
+    """Deep-freeze a record: dicts become FrozenRecords and lists become tuples"""
+    if isinstance(value, (FrozenRecord, CompactRecord)):
+        return value
+    if isinstance(value, dict):
+        return FrozenRecord((key, freeze(item)) for key, item in value.items())
+    if isinstance(value, list):
+        return tuple(freeze(item) for item in value)
+    return value
+
+
+class PlatformSnapshot(NamedTuple):
+    """Everything a read endpoint needs, as of one version"""
+    version: int
+    services: Tuple[FrozenRecord, ...]
+    services_by_name: Mapping[str, FrozenRecord]
+    reports: Tuple[FrozenRecord, ...]        # Oldest first
+    reports_by_id: Mapping[str, FrozenRecord]
+    report_keys: Tuple[tuple, ...]           # (generated_at, id), parallel to reports
+    service_metrics: Mapping[str, np.ndarray]  # Parallel to services; NaN where a service lacks the field
+
+
+def _metric_columns(services) -> Mapping[str, np.ndarray]:
+    columns = {}
+    for field in SERVICE_METRICS:
+        values = np.fromiter((service.get(field, np.nan) for service in services),
+                             dtype=np.float64, count=len(services))
+        values.flags.writeable = False
+        columns[field] = values
+    return MappingProxyType(columns)
+
+
+def platform_snapshot(services, reports=(), version: int = 0) -> PlatformSnapshot:
+    services = tuple(freeze(service) for service in services)
+    reports = tuple(freeze(report) for report in reports)
+    return PlatformSnapshot(
+        version=version,
+        services=services,
+        services_by_name=MappingProxyType({service["name"]: service for service in services}),
+        reports=reports,
+        reports_by_id=MappingProxyType({report["id"]: report for report in reports}),
+        report_keys=tuple((report["generated_at"], report["id"]) for report in reports),
+        service_metrics=_metric_columns(services),
+    )
+
+
+def replace_service(snapshot: PlatformSnapshot, position: int, service: FrozenRecord) -> Dict:
+    """Snapshot fields with the service at position swapped for a new record"""
+    services = snapshot.services[:position] + (service,) + snapshot.services[position + 1:]
+    metrics = dict(snapshot.service_metrics)
+    for field, column in metrics.items():
+        column = column.copy()
+        column[position] = service.get(field, np.nan)
+        column.flags.writeable = False
+        metrics[field] = column
+    return {
+        "services": services,
+        "services_by_name": MappingProxyType({**snapshot.services_by_name, service["name"]: service}),
+        "service_metrics": MappingProxyType(metrics),
+    }
+
+
+def append_report(snapshot: PlatformSnapshot, report: FrozenRecord) -> Dict:
+    """Snapshot fields with report added as the newest one"""
+    return {
+        "reports": snapshot.reports + (report,),
+        "reports_by_id": MappingProxyType({**snapshot.reports_by_id, report["id"]: report}),
+        "report_keys": snapshot.report_keys + ((report["generated_at"], report["id"]),),
+    }
+
+
+class SnapshotPublisher:
+    """Holds the current snapshot; writers swap in a successor atomically
+
+    Readers just take `current` - one attribute read, no lock, no copy - and
+    keep a consistent view for as long as they hold it. Writers serialise
+    on a short lock while deriving the next snapshot from the latest one,
+    so concurrent writers never lose each other's changes.
+    """
+
+    def __init__(self, snapshot: PlatformSnapshot):
+        self._current = snapshot
+        self._lock = threading.Lock()
+
+    @property
+    def current(self) -> PlatformSnapshot:
+        return self._current
+
+    def publish(self, change: Callable[[PlatformSnapshot], Dict] = lambda snapshot: {}) -> PlatformSnapshot:
+        """Replace the fields returned by change(current) and bump the version"""
+        with self._lock:
+            current = self._current
+            self._current = current._replace(version=current.version + 1, **change(current))
+            return self._current
@@ -0,0 +1,316 @@
+# storage.py - Pluggable incident storage backends for the TPM API
+
+import json
+
+import os
+
+import queue
+
+import sqlite3
+
+from contextlib import contextmanager
+
+from heapq import merge
+
+from itertools import islice
+
+from typing import Dict, Iterable, Iterator, List, Optional
+
+import numpy as np
+
+from incident_store import DuplicateIncident, IncidentStore
+
+from records import parse_timestamp
+
+# Where incidents are kept; "memory://" or "sqlite:///path/to/sentinel.db"
+DEFAULT_DATABASE_URL = "memory://"
+
+
+class ConnectionPool:
+    """Fixed-size pool of SQLite connections shared across request threads"""
+
+    def __init__(self, path: str, size: int = 5, timeout: float = 30.0):
+        self.path = path
+        self.timeout = timeout
+        self._pool = queue.LifoQueue(maxsize=size)
+
+        for _ in range(size):
+            self._pool.put(self._connect())
+
+    def _connect(self) -> sqlite3.Connection:
+        # isolation_level=None: transactions are opened explicitly by the caller
+        conn = sqlite3.connect(
+            self.path,
+            timeout=self.timeout,
+            check_same_thread=False,
+            isolation_level=None,
+            cached_statements=256,
+        )
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA foreign_keys=ON")
+        return conn
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        """Borrow a connection for the duration of the block"""
+        conn = self._pool.get(timeout=self.timeout)
+        try:
+            yield conn
+        finally:
+            self._pool.put(conn)
+
+    @contextmanager
+    def transaction(self) -> Iterator[sqlite3.Connection]:
+        """Borrow a connection inside a write transaction"""
+        with self.connection() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+
+    def close(self):
+        """Close every pooled connection"""
+        while not self._pool.empty():
+            self._pool.get_nowait().close()
+
+
+class SQLiteIncidentStore:
+    """Durable incident store with the same query surface as IncidentStore
+
+    The schema and statements stick to portable SQL so they carry over to
+    PostgreSQL with only a placeholder change. Timestamps are kept as wall-
+    clock microseconds next to the original text, and every index used by the
+    API ends in (timestamp_micros, id), so "latest N" reads and time ranges are
+    index scans whatever spelling or offset the timestamps were written with.
+
+    Every write transaction also bumps a stored version, so processes sharing
+    the database can tell from `version()` when someone else changed it.
+    """
+
+    INDEXED_FIELDS = IncidentStore.INDEXED_FIELDS
+
+    SCHEMA = (
+        """CREATE TABLE IF NOT EXISTS incidents (
+            id TEXT PRIMARY KEY,
+            service TEXT NOT NULL,
+            severity TEXT NOT NULL,
+            status TEXT NOT NULL,
+            timestamp TEXT NOT NULL,
+            timestamp_micros INTEGER NOT NULL,
+            data TEXT NOT NULL
+        )""",
+        """CREATE TABLE IF NOT EXISTS store_version (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            version INTEGER NOT NULL
+        )""",
+        "INSERT INTO store_version (id, version) SELECT 1, 0 WHERE NOT EXISTS (SELECT 1 FROM store_version)",
+    )
+
+    INDEXES = (
+        "CREATE INDEX IF NOT EXISTS idx_incidents_time ON incidents (timestamp_micros, id)",
+        "CREATE INDEX IF NOT EXISTS idx_incidents_service_time ON incidents (service, severity, timestamp_micros, id)",
+        "CREATE INDEX IF NOT EXISTS idx_incidents_severity_time ON incidents (severity, timestamp_micros, id)",
+        "CREATE INDEX IF NOT EXISTS idx_incidents_status_time ON incidents (status, timestamp_micros, id)",
+    )
+
+    # Indexes from the layout that ordered by the timestamp text
+    LEGACY_INDEXES = ("idx_incidents_timestamp", "idx_incidents_service", "idx_incidents_severity",
+                      "idx_incidents_status")
+
+    INSERT_SQL = ("INSERT INTO incidents (id, service, severity, status, timestamp, timestamp_micros, data) "
+                  "VALUES (?, ?, ?, ?, ?, ?, ?)")
+    UPDATE_SQL = "UPDATE incidents SET service = ?, severity = ?, status = ?, data = ? WHERE id = ?"
+    SELECT_BY_ID_SQL = "SELECT data FROM incidents WHERE id = ?"
+    BUMP_VERSION_SQL = "UPDATE store_version SET version = version + 1 WHERE id = 1"
+    SELECT_VERSION_SQL = "SELECT version FROM store_version WHERE id = 1"
+
+    def __init__(self, path: str, pool_size: int = 5):
+        self.pool = ConnectionPool(path, size=pool_size)
+
+        with self.pool.transaction() as conn:
+            for statement in self.SCHEMA:
+                conn.execute(statement)
+            self._migrate(conn)
+            for statement in self.INDEXES:
+                conn.execute(statement)
+
+    def _migrate(self, conn: sqlite3.Connection):
+        """Add and fill timestamp_micros in a database written by the text-ordered layout"""
+        columns = {row["name"] for row in conn.execute("PRAGMA table_info(incidents)")}
+        if "timestamp_micros" in columns:
+            return
+        conn.execute("ALTER TABLE incidents ADD COLUMN timestamp_micros INTEGER NOT NULL DEFAULT 0")
+        rows = conn.execute("SELECT id, timestamp FROM incidents").fetchall()
+        conn.executemany("UPDATE incidents SET timestamp_micros = ? WHERE id = ?",
+                         [(parse_timestamp(row["timestamp"]), row["id"]) for row in rows])
+        for index in self.LEGACY_INDEXES:
+            conn.execute(f"DROP INDEX IF EXISTS {index}")
+        conn.execute(self.BUMP_VERSION_SQL)
+
+    @staticmethod
+    def _row(incident: Dict) -> tuple:
+        return (
+            incident["id"],
+            incident["service"],
+            incident["severity"],
+            incident["status"],
+            incident["timestamp"],
+            parse_timestamp(incident["timestamp"]),  # Same ValueError as IncidentStore, before anything is written
+            json.dumps(incident),
+        )
+
+    def _where(self, filters: Dict[str, Optional[str]], since: Optional[int] = None,
+               until: Optional[int] = None):
+        conditions = [(f"{field} = ?", value) for field, value in filters.items() if value is not None]
+        if since is not None:
+            conditions.append(("timestamp_micros >= ?", since))
+        if until is not None:
+            conditions.append(("timestamp_micros < ?", until))
+        if not conditions:
+            return "", ()
+        clause = " WHERE " + " AND ".join(condition for condition, _ in conditions)
+        return clause, tuple(value for _, value in conditions)
+
+    def __len__(self) -> int:
+        return self.count()
+
+    def __contains__(self, incident_id: str) -> bool:
+        return self.get(incident_id) is not None
+
+    def __iter__(self) -> Iterator[Dict]:
+        """Iterate over all incidents, most recent first"""
+        return iter(self.latest())
+
+    def version(self) -> int:
+        """Write counter shared by every process using the database"""
+        with self.pool.connection() as conn:
+            return conn.execute(self.SELECT_VERSION_SQL).fetchone()[0]
+
+    def get(self, incident_id: str) -> Optional[Dict]:
+        """Look up an incident by id"""
+        with self.pool.connection() as conn:
+            row = conn.execute(self.SELECT_BY_ID_SQL, (incident_id,)).fetchone()
+        return json.loads(row["data"]) if row else None
+
+    def add(self, incident: Dict) -> Dict:
+        """Persist a single incident"""
+        row = self._row(incident)
+        try:
+            with self.pool.transaction() as conn:
+                conn.execute(self.INSERT_SQL, row)
+                conn.execute(self.BUMP_VERSION_SQL)
+        except sqlite3.IntegrityError:
+            raise DuplicateIncident(f"Incident '{incident['id']}' already exists")
+        return incident
+
+    def add_many(self, incidents: Iterable[Dict]) -> int:
+        """Persist a batch of incidents in one transaction"""
+        rows = [self._row(incident) for incident in incidents]
+        try:
+            with self.pool.transaction() as conn:
+                conn.executemany(self.INSERT_SQL, rows)
+                conn.execute(self.BUMP_VERSION_SQL)
+        except sqlite3.IntegrityError as error:
+            raise DuplicateIncident(f"Batch repeats an existing incident id: {error}")
+        return len(rows)
+
+    def update(self, incident_id: str, **changes) -> Optional[Dict]:
+        """Apply field changes to an incident atomically"""
+        if "id" in changes or "timestamp" in changes:
+            raise ValueError("Incident id and timestamp cannot be changed")
+
+        with self.pool.transaction() as conn:
+            row = conn.execute(self.SELECT_BY_ID_SQL, (incident_id,)).fetchone()
+            if row is None:
+                return None
+
+            incident = json.loads(row["data"])
+            incident.update(changes)
+            conn.execute(self.UPDATE_SQL, (
+                incident["service"], incident["severity"], incident["status"],
+                json.dumps(incident), incident_id,
+            ))
+            conn.execute(self.BUMP_VERSION_SQL)
+        return incident
+
+    def latest(self, limit: Optional[int] = None, service: Optional[str] = None,
+               severity: Optional[str] = None, status: Optional[str] = None,
+               before: Optional[tuple] = None, since: Optional[int] = None,
+               until: Optional[int] = None) -> List[Dict]:
+        """Get the most recent incidents matching every given filter
+
+        `since` and `until` bound the timestamp to [since, until) in wall-clock
+        microseconds. `before` is a (timestamp, id) key, with the timestamp as
+        ISO text or microseconds; only older incidents are returned.
+        """
+        where, params = self._where({"service": service, "severity": severity, "status": status}, since, until)
+        if before is not None:
+            timestamp, incident_id = before
+            if isinstance(timestamp, str):
+                timestamp = parse_timestamp(timestamp)
+            where += " AND " if where else " WHERE "
+            where += "(timestamp_micros < ? OR (timestamp_micros = ? AND id < ?))"
+            params += (timestamp, timestamp, incident_id)
+        sql = f"SELECT data FROM incidents{where} ORDER BY timestamp_micros DESC, id DESC"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params += (max(limit, 0),)
+
+        with self.pool.connection() as conn:
+            rows = conn.execute(sql, params).fetchall()
+        return [json.loads(row["data"]) for row in rows]
+
+    def latest_for_services(self, services: Iterable[str], limit: Optional[int] = None) -> List[Dict]:
+        """Get the most recent incidents across several services"""
+        # One index scan per service, merged like the in-memory store does
+        streams = [self.latest(limit, service=service) for service in set(services)]
+        keys = merge(*streams, key=lambda incident: (parse_timestamp(incident["timestamp"]), incident["id"]),
+                     reverse=True)
+        return list(islice(keys, None if limit is None else max(limit, 0)))
+
+    def count(self, service: Optional[str] = None, severity: Optional[str] = None,
+              status: Optional[str] = None, since: Optional[int] = None,
+              until: Optional[int] = None) -> int:
+        """Count incidents matching every given filter within [since, until)"""
+        where, params = self._where({"service": service, "severity": severity, "status": status}, since, until)
+        with self.pool.connection() as conn:
+            return conn.execute(f"SELECT COUNT(*) FROM incidents{where}", params).fetchone()[0]
+
+    def tallies(self) -> Dict[str, np.ndarray]:
+        """Service, severity, status and timestamp_micros of every incident as parallel arrays
+
+        Read from the table columns alone, so aggregates can be rebuilt
+        without decoding any stored incident.
+        """
+        with self.pool.connection() as conn:
+            rows = conn.execute("SELECT service, severity, status, timestamp_micros FROM incidents").fetchall()
+        fields = ("service", "severity", "status")
+        tallies = {field: np.array([row[field] for row in rows], dtype=object) for field in fields}
+        tallies["timestamp_micros"] = np.fromiter((row["timestamp_micros"] for row in rows), dtype=np.int64,
+                                                  count=len(rows))
+        return tallies
+
+    def close(self):
+        """Release pooled connections"""
+        self.pool.close()
+
+
+def create_incident_store(url: Optional[str] = None):
+    """Build the incident store named by a database URL
+
+    Falls back to SENTINEL_DATABASE_URL, then to the in-memory store.
+    """
+    url = url or os.getenv("SENTINEL_DATABASE_URL", DEFAULT_DATABASE_URL)
+
+    if url.startswith("memory://"):
+        return IncidentStore()
+    if url.startswith("sqlite:///"):
+        pool_size = int(os.getenv("SENTINEL_DB_POOL_SIZE", "5"))
+        return SQLiteIncidentStore(url[len("sqlite:///"):], pool_size=pool_size)
+
+    raise ValueError(f"Unsupported database URL '{url}'")
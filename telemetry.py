@@ -0,0 +1,316 @@
+# telemetry.py - Request/span instrumentation and Prometheus text exposition
+
+import threading
+
+import time
+
+from bisect import bisect_left
+
+from contextlib import contextmanager
+
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+PROCESS_START = time.time()
+
+# Seconds; dense around the PRD's 200ms P95 target
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.15, 0.2, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Tuple[str, ...], values: Tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, help_text: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict) -> Tuple:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, labelnames: Iterable[str] = ()):
+        super().__init__(name, help_text, labelnames)
+        self._values: Dict[Tuple, float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        return self.header() + [f"{self.name}{_labels(self.labelnames, key)} {_number(value)}" for key, value in values]
+
+
+class Gauge(_Metric):
+    """Gauge set directly or read from a callback at scrape time"""
+    kind = "gauge"
+
+    def __init__(self, name: str, help_text: str, labelnames: Iterable[str] = (),
+                 callback: Optional[Callable[[], float]] = None):
+        super().__init__(name, help_text, labelnames)
+        self._values: Dict[Tuple, float] = {}
+        self.callback = callback
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def render(self) -> List[str]:
+        if self.callback is not None:
+            return self.header() + [f"{self.name} {_number(self.callback())}"]
+        with self._lock:
+            values = sorted(self._values.items())
+        return self.header() + [f"{self.name}{_labels(self.labelnames, key)} {_number(value)}" for key, value in values]
+
+
+class Histogram(_Metric):
+    """Cumulative-bucket histogram per label set (quantiles via histogram_quantile)"""
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labelnames: Iterable[str] = (),
+                 buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[Tuple, list] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self) -> List[str]:
+        with self._lock:
+            snapshot = sorted((key, (list(counts), total, count)) for key, (counts, total, count) in self._series.items())
+        lines = self.header()
+        for key, (counts, total, count) in snapshot:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = 'le="' + _number(bound) + '"'
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {_number(total)}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {count}")
+        return lines
+
+
+class Registry:
+    """Named metrics rendered together in Prometheus text format 0.0.4"""
+
+    CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric '{metric.name}' already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help_text: str, labelnames: Iterable[str] = ()) -> Counter:
+        return self.register(Counter(name, help_text, labelnames))
+
+    def gauge(self, name: str, help_text: str, labelnames: Iterable[str] = (), callback=None) -> Gauge:
+        return self.register(Gauge(name, help_text, labelnames, callback))
+
+    def histogram(self, name: str, help_text: str, labelnames: Iterable[str] = (),
+                  buckets: Tuple[float, ...] = LATENCY_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, help_text, labelnames, buckets))
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+REQUEST_LATENCY = registry.histogram(
+    "sentinel_http_request_duration_seconds", "Time to serve a request (first byte for streams)",
+    ("method", "route", "status"))
+REQUESTS_IN_FLIGHT = registry.gauge(
+    "sentinel_http_requests_in_flight", "Requests currently being served", ("method",))
+RESPONSE_SIZE = registry.histogram(
+    "sentinel_http_response_size_bytes", "Response body size as sent", ("route",), SIZE_BUCKETS)
+REQUEST_SIZE = registry.histogram(
+    "sentinel_http_request_size_bytes", "Request body size from Content-Length", ("route",), SIZE_BUCKETS)
+REQUEST_ERRORS = registry.counter(
+    "sentinel_http_request_errors_total", "Requests answered with 5xx or raising", ("route", "status"))
+SPAN_LATENCY = registry.histogram(
+    "sentinel_span_duration_seconds", "Time spent in instrumented storage and AI calls", ("span",))
+SPAN_ERRORS = registry.counter(
+    "sentinel_span_errors_total", "Instrumented calls that raised", ("span",))
+registry.gauge("process_start_time_seconds", "Start time of the process since unix epoch",
+               callback=lambda: PROCESS_START)
+registry.gauge("process_uptime_seconds", "Seconds since the process started",
+               callback=lambda: time.time() - PROCESS_START)
+
+
+def uptime_seconds() -> float:
+    return time.time() - PROCESS_START
+
+
+def format_uptime(seconds: float) -> str:
+    minutes, _ = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    days, hours = divmod(hours, 24)
+    return f"{days} days {hours} hours {minutes} minutes"
+
+
+@contextmanager
+def span(name: str):
+    """Time a block under sentinel_span_duration_seconds{span=name}"""
+    start = time.perf_counter()
+    try:
+        yield
+    except BaseException:
+        SPAN_ERRORS.inc(span=name)
+        raise
+    finally:
+        SPAN_LATENCY.observe(time.perf_counter() - start, span=name)
+
+
+def timed(name: str, function: Callable) -> Callable:
+    """Wrap a function so each call is recorded as a span"""
+    def wrapper(*args, **kwargs):
+        with span(name):
+            return function(*args, **kwargs)
+    wrapper.__doc__ = function.__doc__
+    return wrapper
+
+
+def timed_async(name: str, function: Callable) -> Callable:
+    """Wrap a coroutine function so each awaited call is recorded as a span"""
+    async def wrapper(*args, **kwargs):
+        with span(name):
+            return await function(*args, **kwargs)
+    wrapper.__doc__ = function.__doc__
+    return wrapper
+
+
+class TimedStore:
+    """Wraps an incident store so every lookup and write is recorded as a span"""
+
+    TIMED_METHODS = ("get", "add", "add_many", "update", "latest", "latest_for_services", "count")
+
+    def __init__(self, store, prefix: str = "storage"):
+        self._store = store
+        for method in self.TIMED_METHODS:
+            if hasattr(store, method):
+                setattr(self, method, timed(f"{prefix}.{method}", getattr(store, method)))
+
+    def __getattr__(self, attribute):
+        return getattr(self._store, attribute)
+
+    def __len__(self) -> int:
+        return len(self._store)
+
+    def __iter__(self):
+        return iter(self._store)
+
+    def __contains__(self, incident_id) -> bool:
+        return incident_id in self._store
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording latency, in-flight count, sizes and errors per route
+
+    Routes are labelled by their template (/incidents/{incident_id}) so label
+    cardinality stays bounded; unmatched paths share one label.
+    """
+
+    def __init__(self, app, skip_paths: Iterable[str] = ("/metrics",)):
+        self.app = app
+        self.skip_paths = set(skip_paths)
+
+    @staticmethod
+    def _route(scope) -> str:
+        route = scope.get("route")
+        return getattr(route, "path", None) or "unmatched"
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in self.skip_paths:
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        state = {"status": 500, "size": 0, "observed": False}
+        # The route is only known after routing, so in-flight is tracked per method
+        REQUESTS_IN_FLIGHT.inc(method=scope["method"])
+
+        def observe():
+            if state["observed"]:
+                return
+            state["observed"] = True
+            route = self._route(scope)
+            REQUEST_LATENCY.observe(time.perf_counter() - start, method=scope["method"],
+                                    route=route, status=state["status"])
+            if state["status"] >= 500:
+                REQUEST_ERRORS.inc(route=route, status=state["status"])
+
+        async def send_instrumented(message):
+            if message["type"] == "http.response.start":
+                state["status"] = message["status"]
+                headers = dict((key.lower(), value) for key, value in message.get("headers", []))
+                if headers.get(b"content-type", b"").startswith(b"text/event-stream"):
+                    observe()  # Streams are timed to first byte, not connection lifetime
+            elif message["type"] == "http.response.body":
+                state["size"] += len(message.get("body", b""))
+                if not message.get("more_body"):
+                    observe()
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_instrumented)
+        except BaseException:
+            observe()
+            raise
+        finally:
+            REQUESTS_IN_FLIGHT.dec(method=scope["method"])
+            route = self._route(scope)
+            RESPONSE_SIZE.observe(state["size"], route=route)
+            headers = dict((key.lower(), value) for key, value in scope.get("headers", []))
+            if headers.get(b"content-length", b"").isdigit():
+                REQUEST_SIZE.observe(int(headers[b"content-length"]), route=route)
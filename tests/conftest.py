@@ -0,0 +1,43 @@
+# conftest.py - Shared fixtures for the Sentinel-AI test suite
+
+import os
+
+import sys
+
+# Modules live flat at the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Offline and in-memory: no API key, no database file
+os.environ["SENTINEL_AI_MODE"] = "simulated"
+os.environ["SENTINEL_DATABASE_URL"] = "memory://"
+
+import pytest
+
+from fastapi.testclient import TestClient
+
+import api
+
+
+@pytest.fixture
+def db(monkeypatch):
+    """A fresh demo database installed as api.db, with the AI and response caches emptied"""
+    database = api.TPMDatabase("memory://")
+    monkeypatch.setattr(api, "db", database)
+    api.analysis_cache.clear()
+    api.summary_cache.clear()
+    # Every fresh database starts at the same version, so earlier tests' bodies would match
+    api.conditional_json.clear()
+    return database
+
+
+@pytest.fixture
+def client(db):
+    """Client without the lifespan hooks, so no background sampler writes behind a test's back"""
+    return TestClient(api.app)
+
+
+@pytest.fixture
+def live_client(db):
+    """Client on one event loop with the lifespan running (needed by background report jobs)"""
+    with TestClient(api.app) as test_client:
+        yield test_client
@@ -0,0 +1,98 @@
+# test_api.py - Endpoint-level regression tests
+
+import asyncio
+
+import json
+
+import time
+
+import pytest
+
+import api
+
+import benchmark
+
+
+def test_realtime_endpoint_records_nothing(client, db):
+    response = client.get("/monitoring/realtime")
+    assert response.status_code == 200
+    for service in db.snapshot().services:
+        assert db.metrics.metrics_for(service["name"]) == []
+        assert db.latency.merged(service["name"], 5).count == 0
+
+
+@pytest.mark.parametrize("timestamp", [-5, float(10 * 86400), None])
+def test_latency_endpoint_rejects_out_of_range_samples(client, db, timestamp):
+    name = db.snapshot().services[0]["name"]
+    if timestamp is not None and timestamp > 0:
+        timestamp += time.time()
+    body = client.post(f"/services/{name}/latency", json={"samples_ms": [5000.0, 5000.0], "timestamp": timestamp}).json()
+    expected = 2 if timestamp is None else 0
+    assert (body["recorded"], body["rejected"]) == (expected, 2 - expected)
+    assert db.latency.merged(name, 60).count == expected
+
+
+def test_sampler_records_stored_metrics_not_jittered_readings(db):
+    now = time.time()
+    db.record_service_samples(now)
+    service = db.snapshot().services[0]
+    points = db.metrics.query(service["name"], "latency", now - 1, now + 1, 1)
+    assert [point["mean"] for point in points] == [service["latency"]]
+    assert "health_score" in db.metrics.metrics_for(service["name"])
+
+
+def test_health_changes_are_recorded_in_history(db):
+    name = db.snapshot().services[0]["name"]
+    now = time.time()
+    db.set_service_health(name, 70)
+    db.adjust_service_health(name, -30, low=50)
+    points = db.metrics.query(name, "health", now - 5, now + 5, 1)
+    assert sum(point["count"] for point in points) == 2
+    assert min(point["min"] for point in points) == 50
+    assert max(point["max"] for point in points) == 70
+
+
+def test_new_incident_lowers_health_and_records_it(client, db):
+    name = db.snapshot().services[0]["name"]
+    client.post("/incidents", json={"service": name, "severity": "SEV1", "description": "Outage", "impact": "All"})
+    assert db.metrics.metrics_for(name) == ["health"]
+
+
+def test_batch_members_get_their_own_analysis_and_cache_entry(client, db):
+    name = db.snapshot().services[0]["name"]
+    ids = [client.post("/incidents", json={"service": name, "severity": "SEV2", "description": "Disk full",
+                                           "impact": "Logs"}).json()["incident_id"]
+           for _ in range(3)]
+    response = client.post("/ai/incidents/analyze-batch", json={"incident_ids": ids})
+    results = [json.loads(line) for line in response.text.splitlines()]
+
+    assert sorted(result["incident_id"] for result in results) == sorted(ids)
+    shared = [result for result in results if result["shared_with"]]
+    assert len(shared) == 2
+    for result in results:
+        assert result["ai_analysis"]["incident_id"] == result["incident_id"]
+        incident = db.incidents.get(result["incident_id"])
+        cached = api.analysis_cache.get(incident["id"], api.content_hash(incident))
+        assert cached["incident_id"] == incident["id"]
+
+
+def test_benchmark_covers_report_jobs_and_streams():
+    names = [name for name, _, _ in benchmark.scenarios(benchmark.synthetic_platform(20, 5, 3))]
+    for expected in ("POST /reports/generate", "report job: submit -> done", "SSE /reports/jobs/{id}/events",
+                     "SSE /monitoring/stream", "WS /monitoring/ws", "GET /monitoring/stream/stats"):
+        assert expected in names
+
+
+def test_benchmark_reads_the_first_stream_message(db):
+    async def first_messages():
+        return (await benchmark.first_message("http", "/monitoring/stream"),
+                await benchmark.first_message("websocket", "/monitoring/ws"))
+
+    (sse_status, _), (ws_status, _) = asyncio.run(first_messages())
+    assert (sse_status, ws_status) == (200, 200)
+
+
+def test_incident_page_reports_the_store_wide_total(client, db):
+    body = client.get("/incidents", params={"limit": 2}).json()
+    assert body["count"] == 2
+    assert body["total"] == db.stats.incident_count == db.incidents.count()
@@ -0,0 +1,84 @@
+# test_cache.py - TTL/LRU response cache and what the AI caches keep
+
+import asyncio
+
+import api
+
+from ai_engine import TPM_AIAnalyzer
+
+from cache import TTLCache, content_hash
+
+from dashboard_data import DashboardData
+
+FALLBACK = TPM_AIAnalyzer()._fallback_analysis({"service": "auth-service"})
+
+
+def test_entries_expire_and_evict():
+    now = [0.0]
+    cache = TTLCache(maxsize=2, ttl=10, clock=lambda: now[0])
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.set("c", 3)
+    assert cache.get("a") is None and cache.evictions == 1
+    now[0] = 11
+    assert cache.get("c") is None
+
+
+def test_version_mismatch_is_a_miss():
+    cache = TTLCache()
+    cache.set("INC-1", "old", content_hash({"status": "new"}))
+    assert cache.get("INC-1", content_hash({"status": "resolved"})) is None
+
+
+def test_uncacheable_values_are_returned_but_not_stored():
+    cache = TTLCache(cacheable=lambda analysis: not analysis.get("fallback"))
+    assert FALLBACK["fallback"] is True
+    assert cache.get_or_compute("INC-1", lambda: FALLBACK) is FALLBACK
+    assert len(cache) == 0
+    assert asyncio.run(cache.get_or_compute_async("INC-1", lambda: asyncio.sleep(0, FALLBACK))) is FALLBACK
+    assert len(cache) == 0
+    cache.set("INC-1", {"summary": "real"})
+    assert cache.get("INC-1") == {"summary": "real"}
+
+
+class FlakyAnalyzer:
+    """Async LLM stand-in that fails over to the fallback analysis first, then recovers"""
+
+    def __init__(self):
+        self.calls = 0
+
+    async def analyze_incident(self, incident):
+        self.calls += 1
+        if self.calls == 1:
+            return TPM_AIAnalyzer()._fallback_analysis(incident)
+        return {"summary": "real analysis", "affected_programs": [], "timeline_impact": "none",
+                "recommended_action": "none"}
+
+
+def test_api_does_not_cache_fallback_analyses(client, db, monkeypatch):
+    analyzer = FlakyAnalyzer()
+    monkeypatch.setattr(api, "llm_analyzer", analyzer)
+    incident_id = db.incidents.latest(1)[0]["id"]
+
+    assert client.get(f"/ai/incident/{incident_id}").json()["ai_analysis"]["fallback"] is True
+    assert client.get(f"/ai/incident/{incident_id}").json()["ai_analysis"]["summary"] == "real analysis"
+    assert client.get(f"/ai/incident/{incident_id}").json()["ai_analysis"]["summary"] == "real analysis"
+    assert analyzer.calls == 2
+
+
+def test_dashboard_does_not_cache_fallback_analyses():
+    class Analyzer:
+        calls = 0
+
+        def analyze_incident(self, incident):
+            Analyzer.calls += 1
+            return FALLBACK if Analyzer.calls == 1 else {"summary": "real analysis"}
+
+    data = DashboardData(analyzer=Analyzer())
+    try:
+        assert data.analyze_custom_incident("auth-service", "SEV2", "Login errors", "now")["fallback"] is True
+        assert data.analyze_custom_incident("auth-service", "SEV2", "Login errors", "now")["summary"] == "real analysis"
+        data.analyze_custom_incident("auth-service", "SEV2", "Login errors", "now")
+        assert Analyzer.calls == 2
+    finally:
+        data.close()
@@ -0,0 +1,66 @@
+# test_concurrency.py - Counters, id allocation and striped locks
+
+import threading
+
+from concurrency import AtomicCounter, IdAllocator, StripedLock
+
+
+def run_threads(target, count: int = 8):
+    threads = [threading.Thread(target=target) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+def test_counter_never_loses_increments():
+    counter = AtomicCounter()
+    run_threads(lambda: [counter.increment() for _ in range(2000)])
+    assert counter.value == 16000
+
+
+def test_counter_only_advances_forwards():
+    counter = AtomicCounter(10)
+    counter.advance_to(5)
+    assert counter.value == 10
+    counter.advance_to(20)
+    assert counter.value == 20
+
+
+def test_allocator_starts_past_existing_ids():
+    ids = IdAllocator(existing=["INC-1004", "INC-1001", "RPT-9999", "INC-x"])
+    assert ids.allocate() == "INC-1005"
+    ids.observe("INC-2000")
+    assert ids.allocate() == "INC-2001"
+    assert IdAllocator(prefix="JOB-", start=1).allocate() == "JOB-1"
+
+
+def test_allocator_ids_are_unique_across_threads():
+    ids = IdAllocator()
+    allocated = []
+    run_threads(lambda: allocated.extend(ids.allocate() for _ in range(500)))
+    assert len(set(allocated)) == len(allocated) == 4000
+
+
+def test_striped_lock_maps_each_key_to_one_reentrant_stripe():
+    locks = StripedLock(8)
+    assert len(locks) == 8
+    assert locks.lock_for("auth-service") is locks.lock_for("auth-service")
+    assert len({id(locks.lock_for(f"service-{n}")) for n in range(100)}) <= 8
+    with locks.lock_for("auth-service"):
+        with locks.lock_for("auth-service"):
+            pass
+
+
+def test_striped_lock_serialises_writers_to_the_same_key():
+    locks = StripedLock()
+    totals = {"auth-service": 0}
+
+    def write():
+        for _ in range(2000):
+            with locks.lock_for("auth-service"):
+                value = totals["auth-service"]
+                totals["auth-service"] = value + 1
+
+    run_threads(write)
+    assert totals["auth-service"] == 16000
@@ -0,0 +1,104 @@
+# test_incident_store.py - Indexed incident queries, in memory and in SQLite
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from incident_store import DuplicateIncident, IncidentStore
+
+from records import parse_timestamp
+
+from storage import SQLiteIncidentStore
+
+START = datetime(2026, 3, 1, 9, 0, 0)
+
+INCIDENTS = [
+    {"id": f"INC-{1000 + n}", "service": ("auth-service", "payment-service", "api-gateway")[n % 3],
+     "severity": ("SEV1", "SEV2", "SEV3")[n % 4 % 3], "status": ("investigating", "resolved")[n % 2],
+     "timestamp": (START + timedelta(minutes=37 * n)).isoformat(), "description": f"incident {n}"}
+    for n in range(60)
+]
+
+FILTERS = [{}, {"service": "auth-service"}, {"severity": "SEV1"},
+           {"service": "payment-service", "status": "resolved"},
+           {"service": "api-gateway", "severity": "SEV2", "status": "investigating"}]
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, tmp_path):
+    if request.param == "memory":
+        yield IncidentStore(INCIDENTS)
+        return
+    store = SQLiteIncidentStore(str(tmp_path / "incidents.db"))
+    store.add_many(INCIDENTS)
+    yield store
+    store.pool.close()
+
+
+def brute_force(since=None, until=None, **filters):
+    matches = [incident for incident in INCIDENTS
+               if all(incident[field] == value for field, value in filters.items())
+               and (since is None or parse_timestamp(incident["timestamp"]) >= since)
+               and (until is None or parse_timestamp(incident["timestamp"]) < until)]
+    return sorted(matches, key=lambda incident: (incident["timestamp"], incident["id"]), reverse=True)
+
+
+@pytest.mark.parametrize("filters", FILTERS)
+@pytest.mark.parametrize("hours", [(None, None), (3, None), (None, 20), (5, 17), (40, 41)])
+def test_latest_and_count_match_brute_force(store, filters, hours):
+    since, until = (None if hour is None else parse_timestamp((START + timedelta(hours=hour)).isoformat())
+                    for hour in hours)
+    expected = brute_force(since, until, **filters)
+    assert [incident["id"] for incident in store.latest(since=since, until=until, **filters)] == \
+        [incident["id"] for incident in expected]
+    assert [incident["id"] for incident in store.latest(3, since=since, until=until, **filters)] == \
+        [incident["id"] for incident in expected[:3]]
+    assert store.count(since=since, until=until, **filters) == len(expected)
+
+
+def test_before_key_pages_backwards(store):
+    first = store.latest(5, service="auth-service")
+    last = first[-1]
+    second = store.latest(5, service="auth-service", before=(last["timestamp"], last["id"]))
+    expected = brute_force(service="auth-service")
+    assert [incident["id"] for incident in first + second] == [incident["id"] for incident in expected[:10]]
+
+
+def test_update_moves_incident_between_indexes(store):
+    store.update("INC-1000", status="closed")
+    assert store.get("INC-1000")["status"] == "closed"
+    assert "INC-1000" in [incident["id"] for incident in store.latest(status="closed")]
+    assert "INC-1000" not in [incident["id"] for incident in store.latest(status="investigating")]
+
+
+def test_duplicates_raise_duplicate_incident(store):
+    with pytest.raises(DuplicateIncident):
+        store.add(dict(INCIDENTS[0]))
+    with pytest.raises(DuplicateIncident):
+        store.add_many([dict(INCIDENTS[1])])
+
+
+def test_bad_timestamp_is_a_plain_value_error_and_stores_nothing(store):
+    with pytest.raises(ValueError) as raised:
+        store.add({**INCIDENTS[0], "id": "INC-9999", "timestamp": "yesterday"})
+    assert not isinstance(raised.value, DuplicateIncident)
+    assert store.get("INC-9999") is None
+    assert len(store) == len(INCIDENTS)
+
+
+def test_create_incident_surfaces_bad_timestamps_instead_of_retrying(db):
+    before = db.id_allocator.allocate()
+    with pytest.raises(ValueError):
+        db.create_incident({"service": "auth-service", "severity": "SEV2", "status": "new",
+                            "description": "x", "timestamp": "yesterday"})
+    # One id was tried, not an endless run of them
+    assert db.id_allocator.allocate() == f"INC-{int(before[4:]) + 2}"
+
+
+def test_create_incident_skips_ids_taken_by_another_writer(db):
+    taken = db.id_allocator.allocate()
+    next_id = f"INC-{int(taken[4:]) + 1}"
+    db.incidents.add({**INCIDENTS[0], "id": next_id})  # Written behind the allocator's back
+    created = db.create_incident({"service": "auth-service", "severity": "SEV2", "status": "new",
+                                  "description": "x", "timestamp": INCIDENTS[0]["timestamp"]})
+    assert created["id"] == f"INC-{int(taken[4:]) + 2}"
@@ -0,0 +1,147 @@
+# test_ingest.py - Telemetry payload parsing, validation and the ingest endpoint
+
+import json
+
+import time
+
+import numpy as np
+
+import pytest
+
+import api
+
+import ingest
+
+
+def ndjson(*rows) -> bytes:
+    return "\n".join(json.dumps(row) for row in rows).encode("utf-8")
+
+
+def test_parse_ndjson_accepts_columnar_and_single_timestamp_blocks():
+    blocks = ingest.parse_ndjson(ndjson(
+        {"service": "auth-service", "metric": "cpu", "timestamps": [1, 2], "values": [0.5, 0.7]},
+        {"service": "auth-service", "metric": "memory", "timestamp": 3, "values": [10, 20, 30]},
+    ))
+    assert [block.metric for block in blocks] == ["cpu", "memory"]
+    assert blocks[1].timestamps.tolist() == [3.0, 3.0, 3.0]
+
+
+@pytest.mark.parametrize("row", [
+    {"service": "a", "metric": "m", "timestamp": 1, "values": 5},
+    {"service": "a", "metric": "m", "timestamps": [[1, 2]], "values": [[1, 2]]},
+    {"service": "a", "metric": "m", "timestamps": 3, "values": [1, 2]},
+    {"service": "a", "metric": "m", "timestamps": [1], "values": [1, 2]},
+    {"service": "a", "metric": "m", "timestamps": [1, [2]], "values": [1, 2]},
+    {"service": "a", "values": [1]},
+])
+def test_parse_ndjson_rejects_scalar_nested_and_mismatched_arrays(row):
+    with pytest.raises(ingest.IngestError):
+        ingest.parse_ndjson(ndjson(row))
+
+
+def test_binary_round_trip():
+    payload = ingest.encode_binary([("auth-service", "cpu", [1.0, 2.0], [0.25, 0.5])])
+    (block,) = ingest.parse_binary(payload)
+    assert (block.service, block.metric) == ("auth-service", "cpu")
+    assert block.timestamps.tolist() == [1.0, 2.0]
+    assert block.values.tolist() == [0.25, 0.5]
+
+
+def test_parse_binary_rejects_truncated_payload():
+    payload = ingest.encode_binary([("auth-service", "cpu", [1.0, 2.0], [0.25, 0.5])])
+    with pytest.raises(ingest.IngestError):
+        ingest.parse_binary(payload[:-4])
+
+
+def test_validate_block_masks_bad_samples():
+    now = 1_000_000.0
+    block = ingest.MetricBlock("auth-service", "cpu", np.array([now, now, -1, now + 3600]),
+                               np.array([1.0, np.nan, 1.0, 1.0]))
+    mask, reason = ingest.validate_block(block, now)
+    assert reason == ""
+    assert mask.tolist() == [True, False, False, False]
+
+
+def test_validate_block_rejects_bad_names():
+    block = ingest.MetricBlock("bad name!", "cpu", np.array([1.0]), np.array([1.0]))
+    mask, reason = ingest.validate_block(block, 2.0)
+    assert reason and not mask.any()
+
+
+@pytest.mark.parametrize("row", [
+    {"service": "auth-service", "metric": "cpu", "timestamp": 1, "values": 5},
+    {"service": "auth-service", "metric": "cpu", "timestamps": [[1, 2]], "values": [[1, 2]]},
+])
+def test_endpoint_answers_400_for_malformed_shapes(client, row):
+    response = client.post("/ingest/metrics", content=ndjson(row),
+                           headers={"Content-Type": "application/x-ndjson"})
+    assert response.status_code == 400
+
+
+def test_endpoint_ack_counts_backfilled_latency_samples(client, db):
+    now = time.time()
+    response = client.post("/ingest/metrics", content=ndjson(
+        {"service": "auth-service", "metric": "request_latency_ms",
+         "timestamps": [now - 120, now, now - 60], "values": [10, 20, 30]}
+    ), headers={"Content-Type": "application/x-ndjson"})
+    assert response.json()["accepted"] == 3
+    assert response.json()["rejected"] == 0
+    assert db.latency.merged("auth-service", 5).count == 3
+
+
+def test_endpoint_ack_rejects_samples_older_than_every_window(client, db):
+    now = time.time()
+    retention = db.latency.windows * db.latency.window_seconds
+    for minutes in range(db.latency.windows):
+        db.latency.record("auth-service", 5.0, now - minutes * 60)
+    response = client.post("/ingest/metrics", content=ndjson(
+        {"service": "auth-service", "metric": "request_latency_ms",
+         "timestamps": [now - retention - 120, now], "values": [10, 20]}
+    ), headers={"Content-Type": "application/x-ndjson"})
+    assert response.json()["accepted"] == 1
+    assert response.json()["rejected"] == 1
+
+
+def test_endpoint_rejects_unknown_content_type(client):
+    response = client.post("/ingest/metrics", content=b"{}", headers={"Content-Type": "text/plain"})
+    assert response.status_code == 415
+
+
+def test_endpoint_rejects_services_outside_the_inventory(client, db):
+    response = client.post("/ingest/metrics", content=ndjson(
+        {"service": "nope", "metric": "cpu", "timestamp": time.time(), "values": [1, 2]}
+    ), headers={"Content-Type": "application/x-ndjson"})
+    assert response.status_code == 422
+    assert response.json()["errors"][0]["error"] == "unknown service 'nope'"
+    assert len(db.metrics) == 0
+    assert client.get("/services/nope/metrics").status_code == 404
+
+
+def test_endpoint_keeps_good_blocks_when_others_are_rejected(client, db):
+    name = db.snapshot().services[0]["name"]
+    response = client.post("/ingest/metrics", content=ndjson(
+        {"service": "nope", "metric": "cpu", "timestamp": time.time(), "values": [1]},
+        {"service": name, "metric": "cpu", "timestamp": time.time(), "values": [1, 2]},
+    ), headers={"Content-Type": "application/x-ndjson"})
+    assert response.status_code == 200
+    assert (response.json()["accepted"], response.json()["rejected"]) == (2, 1)
+
+
+def test_endpoint_caps_the_number_of_series(client, db, monkeypatch):
+    monkeypatch.setattr(api, "INGEST_MAX_SERIES", 2)
+    name = db.snapshot().services[0]["name"]
+    rows = [{"service": name, "metric": f"m{n}", "timestamp": time.time(), "values": [1]} for n in range(3)]
+    body = client.post("/ingest/metrics", content=ndjson(*rows), headers={"Content-Type": "application/x-ndjson"}).json()
+    assert body["accepted"] == 2 and "series limit" in body["errors"][0]["error"]
+    assert len(db.metrics) == 2
+    # Existing series and latency samples are still accepted at the cap
+    rows = [{"service": name, "metric": metric, "timestamp": time.time(), "values": [1]}
+            for metric in ("m0", db.LATENCY_SAMPLE_METRIC)]
+    assert client.post("/ingest/metrics", content=ndjson(*rows),
+                       headers={"Content-Type": "application/x-ndjson"}).json()["accepted"] == 2
+
+
+def test_endpoint_answers_413_for_oversized_payloads(client, monkeypatch):
+    monkeypatch.setattr(api, "INGEST_MAX_BYTES", 64)
+    response = client.post("/ingest/metrics", content=b"x" * 65, headers={"Content-Type": "application/x-ndjson"})
+    assert response.status_code == 413
@@ -0,0 +1,71 @@
+# test_pagination.py - Keyset cursors, field projection and cursor validation on list endpoints
+
+import pytest
+
+from pagination import decode_cursor, encode_cursor, parse_fields, project, take_page
+
+
+def test_cursor_round_trip():
+    key = ("2026-01-01T10:00:00", "INC-1001")
+    cursor = encode_cursor(key)
+    assert "=" not in cursor
+    assert decode_cursor(cursor) == key
+    assert decode_cursor(cursor, (str, str)) == key
+
+
+@pytest.mark.parametrize("cursor", ["not base64!", encode_cursor([])[:-1] + "x", "e30", "W10"])
+def test_malformed_cursors_raise_value_error(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor)
+
+
+@pytest.mark.parametrize("key, types", [
+    (["x"], (int,)),
+    ([1, 2], (int,)),
+    ([None], (str,)),
+    ([["a"]], (str,)),
+    ([True], (int,)),
+    (["a"], (str, str)),
+])
+def test_typed_decode_rejects_wrong_shapes(key, types):
+    with pytest.raises(ValueError):
+        decode_cursor(encode_cursor(key), types)
+
+
+def test_take_page_returns_next_cursor_only_when_more_remain():
+    records = [{"id": n} for n in range(5)]
+    page, cursor = take_page(iter(records), 2, key=lambda record: (record["id"],))
+    assert [record["id"] for record in page] == [0, 1]
+    assert decode_cursor(cursor) == (1,)
+    page, cursor = take_page(iter(records[3:]), 2, key=lambda record: (record["id"],))
+    assert len(page) == 2 and cursor is None
+    assert take_page(iter(records), None, key=lambda record: (record["id"],)) == (records, None)
+
+
+def test_projection():
+    assert parse_fields(" id, ,name ") == ("id", "name")
+    assert parse_fields("") is None
+    assert project([{"id": 1, "name": "a", "x": 2}], ("id", "missing")) == [{"id": 1}]
+
+
+@pytest.mark.parametrize("path", ["/services", "/reports", "/programs/risks", "/incidents"])
+@pytest.mark.parametrize("key", [["x"], [1, 2], [None], [["a"]], [True], [1.5]])
+def test_list_endpoints_answer_400_for_badly_shaped_cursors(client, path, key):
+    assert client.get(path, params={"cursor": encode_cursor(key)}).status_code == 400
+
+
+@pytest.mark.parametrize("path, items", [
+    ("/services", "services"), ("/reports", "reports"),
+    ("/programs/risks", "program_risks"), ("/incidents", "incidents"),
+])
+def test_list_endpoints_page_through_everything(client, path, items):
+    seen, cursor = [], None
+    while True:
+        params = {"limit": 2, **({"cursor": cursor} if cursor else {})}
+        body = client.get(path, params=params).json()
+        seen.extend(body[items])
+        cursor = body["next_cursor"]
+        if cursor is None:
+            break
+    everything = client.get(path, params={"limit": 1000}).json()[items]
+    assert seen == everything
@@ -0,0 +1,136 @@
+# test_report_jobs.py - Background report job queue and its API
+
+import asyncio
+
+import time
+
+from datetime import datetime
+
+import pytest
+
+import api
+
+from ai_engine import TPM_AIAnalyzer
+
+from records import month_range
+
+from report_jobs import QueueFull, ReportJobQueue
+
+
+async def build(params):
+    await asyncio.sleep(0.01)
+    if params.get("fail"):
+        raise RuntimeError("builder failed")
+    return {"id": f"RPT-{params['n']}"}
+
+
+async def finish(queue: ReportJobQueue, job, timeout: float = 2.0):
+    deadline = time.monotonic() + timeout
+    while not job.finished:
+        assert time.monotonic() < deadline, "job never finished"
+        await asyncio.sleep(0.005)
+    return job
+
+
+def test_jobs_succeed_and_fail():
+    async def scenario():
+        queue = ReportJobQueue(build)
+        ok, _ = queue.submit({"n": 1})
+        bad, _ = queue.submit({"n": 2, "fail": True})
+        await finish(queue, ok)
+        await finish(queue, bad)
+        await queue.stop()
+        return queue, ok, bad
+
+    queue, ok, bad = asyncio.run(scenario())
+    assert ok.status == "succeeded" and ok.result == {"id": "RPT-1"}
+    assert bad.status == "failed" and bad.error == "builder failed"
+    assert queue.stats()["succeeded"] == 1 and queue.stats()["failed"] == 1
+
+
+def test_identical_requests_coalesce_until_finished():
+    async def scenario():
+        queue = ReportJobQueue(build)
+        first, coalesced_first = queue.submit({"n": 1})
+        second, coalesced_second = queue.submit({"n": 1})
+        await finish(queue, first)
+        third, coalesced_third = queue.submit({"n": 1})
+        await finish(queue, third)
+        await queue.stop()
+        return queue, (first, second, third), (coalesced_first, coalesced_second, coalesced_third)
+
+    queue, (first, second, third), coalesced = asyncio.run(scenario())
+    assert second is first and third is not first
+    assert coalesced == (False, True, False)
+    assert queue.stats()["coalesced"] == 1
+
+
+def test_submit_raises_queue_full_at_capacity():
+    async def scenario():
+        queue = ReportJobQueue(build, workers=1, max_pending=2)
+        for n in range(2):
+            queue.submit({"n": n})
+        with pytest.raises(QueueFull):
+            queue.submit({"n": 99})
+        await queue.stop()
+
+    asyncio.run(scenario())
+
+
+def test_finished_jobs_are_retained_up_to_the_limit():
+    async def scenario():
+        queue = ReportJobQueue(build, workers=1, retain=2)
+        jobs = [queue.submit({"n": n})[0] for n in range(4)]
+        for job in jobs:
+            await finish(queue, job)
+        await queue.stop()
+        return queue, jobs
+
+    queue, jobs = asyncio.run(scenario())
+    assert [queue.get(job.id) for job in jobs] == [None, None, jobs[2], jobs[3]]
+
+
+def test_watchers_see_every_transition():
+    async def scenario():
+        queue = ReportJobQueue(build)
+        job, _ = queue.submit({"n": 1})
+        watcher = job.watch()
+        statuses = []
+        while not statuses or statuses[-1] not in ("succeeded", "failed"):
+            statuses.append((await asyncio.wait_for(watcher.get(), 2))["status"])
+        await queue.stop()
+        return statuses
+
+    assert asyncio.run(scenario()) == ["queued", "running", "succeeded"]
+
+
+def test_api_generates_a_report_in_the_background(live_client):
+    response = live_client.post("/reports/generate", params={"title": "Test report"})
+    assert response.status_code == 202
+    job_url = response.headers["location"]
+
+    deadline = time.monotonic() + 10
+    while (job := live_client.get(job_url).json()["job"])["status"] not in ("succeeded", "failed"):
+        assert time.monotonic() < deadline, "report job never finished"
+        time.sleep(0.01)
+    assert job["status"] == "succeeded"
+    report_id = job["report"]["id"]
+    assert live_client.get(f"/reports/{report_id}").json()["report"]["id"] == report_id
+    assert live_client.get("/reports/jobs/does-not-exist").status_code == 404
+
+
+def test_llm_report_counts_the_month_without_loading_incidents(db, monkeypatch):
+    class Analyzer:
+        async def generate_exec_summary(self, platform_data):
+            self.platform_data = platform_data
+            return TPM_AIAnalyzer()._exec_summary_prompt(platform_data)
+
+    analyzer = Analyzer()
+    monkeypatch.setattr(api, "llm_analyzer", analyzer)
+    monkeypatch.setattr(db.incidents, "latest", lambda *args, **kwargs: pytest.fail("incidents were materialized"))
+    report = asyncio.run(api.build_report({"title": "Monthly", "report_type": "Monthly"}))
+
+    month_start, month_end = month_range(datetime.now())
+    expected = db.incidents.count(since=month_start, until=month_end)
+    assert analyzer.platform_data["incident_count"] == expected
+    assert f"Recent Incidents: {expected}" in report["summary"]
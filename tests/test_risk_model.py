@@ -0,0 +1,81 @@
+# test_risk_model.py - Incremental incident-rate model behind /ai/risk-prediction
+
+from datetime import datetime
+
+import numpy as np
+
+import pytest
+
+from records import IncidentColumns, IncidentRecord, local_offset_micros, vocabulary
+
+from risk_model import SECONDS_PER_DAY, RiskModel
+
+NOW = 1_790_000_000.0
+
+
+def incident(number: int, days_ago: float = 0, service: str = "auth-service", severity: str = "SEV2",
+             status: str = "investigating") -> dict:
+    moment = datetime.fromtimestamp(NOW - days_ago * SECONDS_PER_DAY)
+    return {"id": f"INC-{number}", "service": service, "severity": severity, "status": status,
+            "timestamp": moment.isoformat(), "description": "x"}
+
+
+def model() -> RiskModel:
+    return RiskModel(clock=lambda: NOW)
+
+
+def test_one_incident_today_is_not_high_risk():
+    risk = model()
+    risk.add_incident(incident(1))
+    prediction = risk.predict(30)
+    assert prediction["high_risk_services"] == []
+    # The EWMA forecast still front-loads the recent incident
+    assert prediction["predicted_incidents"] > 1
+
+
+def test_more_than_two_incidents_in_the_window_is_high_risk():
+    risk = model()
+    for number, days_ago in enumerate((0, 10, 20)):
+        risk.add_incident(incident(number, days_ago))
+    assert risk.predict(30)["high_risk_services"] == ["auth-service"]
+    assert risk.rates()["window"][0] * 30 == pytest.approx(3)
+
+
+def test_incidents_outside_the_window_are_ignored():
+    risk = model()
+    for number in range(5):
+        risk.add_incident(incident(number, days_ago=45))
+    assert risk.predict(30)["predicted_incidents"] == 0
+    assert risk.rates()["open"].tolist() == [5]
+
+
+def test_update_moves_counts_between_services_and_statuses():
+    risk = model()
+    original = incident(1)
+    risk.add_incident(original)
+    risk.update_incident(original, {"service": "payment-service", "status": "resolved"})
+    rates = risk.rates()
+    assert rates["all"].tolist()[0] == 0
+    assert rates["all"].tolist()[1] > 0
+    assert rates["open"].tolist() == [0, 0]
+
+
+def test_add_columns_matches_add_incident():
+    incidents = [incident(number, days_ago=number % 40, service=("a", "b", "c")[number % 3],
+                          severity=("SEV1", "SEV2")[number % 2], status=("resolved", "open")[number % 2])
+                 for number in range(120)]
+    one_by_one, bulk = model(), model()
+    for item in incidents:
+        one_by_one.add_incident(item)
+
+    columns = IncidentColumns()
+    columns.extend([IncidentRecord.from_mapping(item) for item in incidents])
+    arrays = columns.arrays()
+    bulk.add_columns(vocabulary("service").values, arrays["service"], arrays["timestamp"] - local_offset_micros(),
+                     arrays["severity"] == vocabulary("severity").code("SEV1"),
+                     arrays["status"] != vocabulary("status").code("resolved"))
+
+    left, right = one_by_one.rates(), bulk.rates()
+    order = [bulk._rows[name] for name in one_by_one._names]
+    for key in ("all", "sev1", "window", "open"):
+        assert np.allclose(left[key], right[key][order])
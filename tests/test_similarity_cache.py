@@ -0,0 +1,79 @@
+# test_similarity_cache.py - MinHash near-duplicate cache for AI analyses
+
+import numpy as np
+
+import pytest
+
+from similarity_cache import IncidentSimilarityCache, MinHasher, shingles
+
+
+def incident(description: str, service: str = "auth-service", severity: str = "SEV2") -> dict:
+    return {"service": service, "severity": severity, "description": description}
+
+
+def test_signatures_are_stable_and_estimate_jaccard():
+    hasher = MinHasher(256)
+    left = shingles("database connection pool exhausted on primary")
+    right = shingles("database connection pool exhausted on replica")
+    exact = len(left & right) / len(left | right)
+    estimate = MinHasher.similarity(hasher.signature(left), hasher.signature(right))
+    assert estimate == pytest.approx(exact, abs=0.1)
+    assert hasher.signature(left).tolist() == MinHasher(256).signature(left).tolist()
+
+
+def test_similarity_scores_many_rows_at_once():
+    hasher = MinHasher()
+    signature = hasher.signature(shingles("cache miss storm"))
+    rows = np.stack([signature, hasher.signature(shingles("something else entirely"))])
+    scores = MinHasher.similarity(signature, rows)
+    assert scores.shape == (2,) and scores[0] == 1.0 and scores[1] < 0.5
+
+
+def test_near_duplicate_hits_and_unrelated_misses():
+    cache = IncidentSimilarityCache(threshold=0.7)
+    cache.add(incident("Latency spike above threshold on checkout"), {"summary": "cached"})
+    assert cache.lookup(incident("Latency spike above threshold on checkout!")) == {"summary": "cached"}
+    assert cache.lookup(incident("Disk full on logging cluster")) is None
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+
+def test_lookup_is_scoped_to_service_and_severity():
+    cache = IncidentSimilarityCache()
+    cache.add(incident("Increased error rates"), {"summary": "cached"})
+    assert cache.lookup(incident("Increased error rates", service="payment-service")) is None
+    assert cache.lookup(incident("Increased error rates", severity="SEV1")) is None
+
+
+def test_best_match_agrees_with_brute_force():
+    rng = np.random.default_rng(1)
+    words = [f"w{n}" for n in range(40)]
+    cache = IncidentSimilarityCache(threshold=0.0)
+    descriptions = [" ".join(rng.choice(words, 6)) for _ in range(300)]
+    for number, description in enumerate(descriptions):
+        cache.add(incident(description), {"n": number})
+
+    for description in descriptions[:50]:
+        signature = cache._signature(incident(description))
+        entry_id, score = cache._best_match(cache._band_keys(("auth-service", "SEV2"), signature), signature)
+        candidates = {entry for key in cache._band_keys(("auth-service", "SEV2"), signature)
+                      for entry in cache._buckets.get(key, ())}
+        best = max(MinHasher.similarity(signature, cache._signatures[cache._entries[entry][0]]) for entry in candidates)
+        assert score == pytest.approx(best)
+
+
+def test_eviction_reuses_signature_rows():
+    cache = IncidentSimilarityCache(max_entries=3)
+    for number in range(10):
+        cache.add(incident(f"distinct incident number {number} " * 3), {"n": number})
+    assert len(cache) == 3
+    assert cache._next_row == 4  # Three live rows plus the one freed and reused in turn
+    assert cache.lookup(incident("distinct incident number 9 " * 3)) == {"n": 9}
+    assert cache.lookup(incident("distinct incident number 0 " * 3)) is None
+
+
+def test_clear_drops_everything():
+    cache = IncidentSimilarityCache()
+    cache.add(incident("Service timeout failures"), {"summary": "cached"})
+    cache.clear()
+    assert len(cache) == 0
+    assert cache.lookup(incident("Service timeout failures")) is None
@@ -0,0 +1,97 @@
+# test_sketches.py - DDSketch accuracy and per-minute latency windows
+
+import numpy as np
+
+import pytest
+
+from sketches import DDSketch, LatencySketches
+
+
+def test_quantiles_within_relative_accuracy():
+    values = np.random.default_rng(3).lognormal(4, 1, 20_000)
+    sketch = DDSketch(relative_accuracy=0.01)
+    sketch.add_many(values)
+    for q in (0.5, 0.95, 0.99):
+        exact = np.quantile(values, q, method="lower")
+        assert sketch.quantile(q) == pytest.approx(exact, rel=0.02)
+
+
+def test_add_and_add_many_agree():
+    values = [0.0, 1.5, 3.0, 250.0, 250.0]
+    one, many = DDSketch(), DDSketch()
+    for value in values:
+        one.add(value)
+    many.add_many(values)
+    assert one.bins == many.bins
+    assert (one.zero_count, one.count, one.min, one.max) == (many.zero_count, many.count, many.min, many.max)
+
+
+def test_merge_matches_single_sketch_and_round_trips():
+    rng = np.random.default_rng(5)
+    left, right = rng.uniform(1, 100, 500), rng.uniform(50, 500, 500)
+    merged, combined = DDSketch(), DDSketch()
+    merged.add_many(left)
+    other = DDSketch()
+    other.add_many(right)
+    merged.merge(DDSketch.from_dict(other.to_dict()))
+    combined.add_many(np.concatenate([left, right]))
+    assert merged.bins == combined.bins
+    assert merged.quantile(0.95) == combined.quantile(0.95)
+
+
+def test_merge_rejects_other_accuracy():
+    with pytest.raises(ValueError):
+        DDSketch(0.01).merge(DDSketch(0.05))
+
+
+def test_empty_sketch_has_no_quantile():
+    assert DDSketch().quantile(0.5) is None
+
+
+def test_collapse_caps_bins():
+    sketch = DDSketch(max_bins=16)
+    sketch.add_many(np.geomspace(1, 1e6, 1000))
+    assert len(sketch.bins) <= 16
+    assert sketch.quantile(1.0) == pytest.approx(1e6, rel=0.02)
+
+
+def test_backfilled_windows_are_inserted_in_time_order():
+    now = 1_000_020.0
+    sketches = LatencySketches(clock=lambda: now)
+    recorded = sketches.record_batch("svc", np.array([now - 120, now, now - 60]), np.array([1.0, 2.0, 3.0]))
+    assert recorded.all()
+    starts = [start for start, _ in sketches._services["svc"]]
+    assert starts == sorted(starts) and len(starts) == 3
+    assert sketches.merged("svc", 5).count == 3
+
+
+def test_single_backfill_after_newer_window():
+    now = 1_000_020.0
+    sketches = LatencySketches(clock=lambda: now)
+    sketches.record("svc", 5.0, now)
+    sketches.record("svc", 7.0, now - 180)
+    assert sketches.merged("svc", 5).count == 2
+
+
+def test_samples_older_than_a_full_ring_are_reported_as_dropped():
+    now = 1_000_020.0
+    sketches = LatencySketches(windows=2, clock=lambda: now)
+    recorded = sketches.record_batch("svc", np.array([now - 120, now, now - 60]), np.array([1.0, 2.0, 3.0]))
+    assert recorded.tolist() == [False, True, True]
+    assert sketches.merged("svc", 5).count == 2
+
+
+def test_future_windows_stay_out_of_recent_percentiles():
+    now = 1_000_020.0
+    clock = [now]
+    sketches = LatencySketches(clock=lambda: clock[0])
+    sketches.record("svc", 10.0, now)
+    sketches.record("svc", 5000.0, now + 240)
+    assert sketches.percentiles("svc", 1)["p99"] == pytest.approx(10.0, rel=0.02)
+    clock[0] = now + 240
+    assert sketches.merged("svc", 1).count == 1
+
+
+def test_percentiles_are_null_without_samples():
+    result = LatencySketches().percentiles("nobody", 1)
+    assert (result["p50"], result["p95"], result["p99"], result["samples"]) == (None, None, None, 0)
@@ -0,0 +1,59 @@
+# test_snapshots.py - Immutable platform snapshots and the publisher
+
+import copy
+
+import pytest
+
+from snapshots import FrozenRecord, SnapshotPublisher, append_report, freeze, platform_snapshot, replace_service
+
+SERVICES = [
+    {"name": "auth-service", "health": 90, "latency": 100, "tags": ["core"]},
+    {"name": "payment-service", "health": 80, "error_rate": 1.5},
+]
+
+REPORTS = [{"id": "RPT-1", "generated_at": "2026-01-01T00:00:00"}]
+
+
+def test_freeze_makes_records_read_only():
+    record = freeze({"name": "a", "nested": {"x": 1}, "items": [{"y": 2}]})
+    assert isinstance(record["nested"], FrozenRecord)
+    assert record["items"] == ({"y": 2},)
+    with pytest.raises(TypeError):
+        record["name"] = "b"
+    with pytest.raises(TypeError):
+        record["nested"].update(x=2)
+    assert copy.deepcopy(record) is record
+    assert {**record, "name": "b"}["name"] == "b"
+
+
+def test_snapshot_indexes_and_metric_columns():
+    snapshot = platform_snapshot(SERVICES, REPORTS)
+    assert snapshot.services_by_name["payment-service"]["health"] == 80
+    assert snapshot.reports_by_id["RPT-1"] is snapshot.reports[0]
+    assert snapshot.service_metrics["health"].tolist() == [90, 80]
+    assert snapshot.service_metrics["error_rate"][0] != snapshot.service_metrics["error_rate"][0]  # NaN
+    with pytest.raises(ValueError):
+        snapshot.service_metrics["health"][0] = 1
+
+
+def test_publish_replaces_fields_and_bumps_version():
+    publisher = SnapshotPublisher(platform_snapshot(SERVICES, REPORTS))
+    before = publisher.current
+    updated = freeze({**before.services[1], "health": 40})
+    after = publisher.publish(lambda snapshot: replace_service(snapshot, 1, updated))
+
+    assert after.version == before.version + 1
+    assert after.services_by_name["payment-service"]["health"] == 40
+    assert after.service_metrics["health"].tolist() == [90, 40]
+    # Readers holding the old snapshot keep a consistent view
+    assert before.services_by_name["payment-service"]["health"] == 80
+    assert before.service_metrics["health"].tolist() == [90, 80]
+
+
+def test_append_report_indexes_it():
+    publisher = SnapshotPublisher(platform_snapshot(SERVICES, REPORTS))
+    report = freeze({"id": "RPT-2", "generated_at": "2026-01-02T00:00:00"})
+    snapshot = publisher.publish(lambda snapshot: append_report(snapshot, report))
+    assert [item["id"] for item in snapshot.reports] == ["RPT-1", "RPT-2"]
+    assert snapshot.reports_by_id["RPT-2"] is report
+    assert snapshot.report_keys[-1] == ("2026-01-02T00:00:00", "RPT-2")
@@ -0,0 +1,117 @@
+# test_storage.py - SQLite incident storage shared by several API processes
+
+import sqlite3
+
+import pytest
+
+from fastapi.testclient import TestClient
+
+import api
+
+from storage import SQLiteIncidentStore, create_incident_store
+
+INCIDENT = {"service": "auth-service", "severity": "SEV1", "status": "investigating",
+            "description": "Login failures", "impact": "Users locked out"}
+
+
+@pytest.fixture
+def url(tmp_path):
+    return f"sqlite:///{tmp_path / 'sentinel.db'}"
+
+
+@pytest.fixture
+def workers(url):
+    """Two databases on one file, standing in for two uvicorn workers"""
+    first, second = api.TPMDatabase(url), api.TPMDatabase(url)
+    yield first, second
+    first.incidents.close()
+    second.incidents.close()
+
+
+def test_counts_and_risk_follow_writes_from_other_workers(workers):
+    first, second = workers
+    count, sev1 = second.stats.incident_count, second.stats.by_severity()["SEV1"]
+    version = second.version
+
+    for _ in range(3):
+        first.create_incident({**INCIDENT, "timestamp": api.datetime.now().isoformat()})
+
+    assert second.stats.incident_count == count + 3
+    assert second.stats.by_severity()["SEV1"] == sev1 + 3
+    assert second.version != version
+    assert "auth-service" in second.risk.predict(30)["high_risk_services"]
+    assert second.stats.incident_count == first.stats.incident_count
+
+
+def test_updates_from_other_workers_move_the_counts(workers):
+    first, second = workers
+    created = first.create_incident({**INCIDENT, "timestamp": api.datetime.now().isoformat()})
+    resolved = second.stats.status_counts["resolved"]
+    first.update_incident(created["id"], status="resolved")
+    assert second.stats.status_counts["resolved"] == resolved + 1
+
+
+def test_own_writes_are_counted_without_a_recount(workers, monkeypatch):
+    first, _ = workers
+    first.stats  # Settle any pending recount
+    monkeypatch.setattr(first, "_recount", lambda: pytest.fail("recounted after its own write"))
+    count = first.stats.incident_count
+    first.create_incident({**INCIDENT, "timestamp": api.datetime.now().isoformat()})
+    assert first.stats.incident_count == count + 1
+
+
+def test_workers_never_hand_out_the_same_id(workers):
+    first, second = workers
+    ids = {first.create_incident({**INCIDENT, "timestamp": "2026-03-01T10:00:00"})["id"],
+           second.create_incident({**INCIDENT, "timestamp": "2026-03-01T10:00:00"})["id"]}
+    assert len(ids) == 2
+
+
+def test_etag_changes_when_another_worker_writes(workers, monkeypatch):
+    first, second = workers
+    monkeypatch.setattr(api, "db", second)
+    client = TestClient(api.app)
+    etag = client.get("/incidents").headers["ETag"]
+    assert client.get("/incidents", headers={"If-None-Match": etag}).status_code == 304
+
+    first.create_incident({**INCIDENT, "timestamp": api.datetime.now().isoformat()})
+    response = client.get("/incidents", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.json()["by_severity"] == second.stats.by_severity()
+
+
+def test_time_order_ignores_timestamp_spelling(url):
+    store = create_incident_store(url)
+    store.add_many([
+        {**INCIDENT, "id": "INC-1", "timestamp": "2026-03-01 10:00:00"},
+        {**INCIDENT, "id": "INC-2", "timestamp": "2026-03-01T09:00:00"},
+        {**INCIDENT, "id": "INC-3", "timestamp": "2026-03-01T11:00:00.000000"},
+    ])
+    assert [incident["id"] for incident in store.latest()] == ["INC-3", "INC-1", "INC-2"]
+    since = api.parse_timestamp("2026-03-01T09:30:00")
+    assert store.count(since=since) == 2
+    assert [incident["id"] for incident in store.latest(before=("2026-03-01T10:00:00", "INC-1"))] == ["INC-2"]
+    store.close()
+
+
+def test_databases_from_the_text_ordered_layout_are_migrated(tmp_path):
+    path = tmp_path / "old.db"
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE incidents (id TEXT PRIMARY KEY, service TEXT NOT NULL, severity TEXT NOT NULL, "
+                 "status TEXT NOT NULL, timestamp TEXT NOT NULL, data TEXT NOT NULL)")
+    conn.execute("CREATE INDEX idx_incidents_timestamp ON incidents (timestamp, id)")
+    conn.executemany("INSERT INTO incidents VALUES (?, ?, ?, ?, ?, '{}')", [
+        ("INC-1", "auth-service", "SEV1", "new", "2026-03-01 10:00:00"),
+        ("INC-2", "auth-service", "SEV1", "new", "2026-03-01T09:00:00"),
+    ])
+    conn.commit()
+    conn.close()
+
+    store = SQLiteIncidentStore(str(path))
+    assert store.count(since=api.parse_timestamp("2026-03-01T09:30:00")) == 1
+    assert store.tallies()["timestamp_micros"].tolist() == [api.parse_timestamp("2026-03-01T10:00:00"),
+                                                           api.parse_timestamp("2026-03-01T09:00:00")]
+    with store.pool.connection() as conn:
+        indexes = {row["name"] for row in conn.execute("PRAGMA index_list(incidents)")}
+    assert "idx_incidents_timestamp" not in indexes and "idx_incidents_time" in indexes
+    store.close()
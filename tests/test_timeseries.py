@@ -0,0 +1,72 @@
+# test_timeseries.py - Ring-buffer rollups, range queries and trends
+
+import numpy as np
+
+import pytest
+
+from timeseries import RingBuffer, Series, TimeSeriesStore
+
+
+def test_add_and_add_many_fill_the_same_buckets():
+    timestamps = np.array([0.0, 0.5, 1.0, 7.0, 7.9])
+    values = np.array([1.0, 3.0, 5.0, 2.0, 4.0])
+    one, many = RingBuffer(1, 10), RingBuffer(1, 10)
+    for timestamp, value in zip(timestamps, values):
+        one.add(timestamp, value)
+    many.add_many(timestamps, values)
+    for left, right in zip(one.window(0, 10), many.window(0, 10)):
+        assert left.tolist() == right.tolist()
+
+
+def test_ring_overwrites_buckets_older_than_capacity():
+    ring = RingBuffer(1, 4)
+    ring.add_many(np.arange(10, dtype=np.float64), np.ones(10))
+    starts = ring.window(0, 100)[0]
+    assert starts.tolist() == [6, 7, 8, 9]
+    ring.add(2.0, 1.0)  # Too old: ignored rather than clobbering a live bucket
+    assert ring.window(0, 100)[0].tolist() == [6, 7, 8, 9]
+
+
+def test_query_rolls_up_min_max_mean_count():
+    series = Series(((1, 600), (60, 1440)))
+    series.add_many(np.array([0.0, 10.0, 59.0, 60.0]), np.array([1.0, 3.0, 5.0, 10.0]))
+    points = series.query(0, 120, 60)
+    assert points == [
+        {"t": 0.0, "min": 1.0, "max": 5.0, "mean": 3.0, "count": 3},
+        {"t": 60.0, "min": 10.0, "max": 10.0, "mean": 10.0, "count": 1},
+    ]
+
+
+def test_query_uses_a_coarser_tier_for_wide_steps():
+    series = Series(((1, 10), (60, 100)))
+    series.add_many(np.arange(0, 3000, 30, dtype=np.float64), np.ones(100))
+    points = series.query(0, 3000, 600)
+    assert sum(point["count"] for point in points) == 100
+
+
+def test_trend_compares_consecutive_windows():
+    now = 10_000.0
+    store = TimeSeriesStore(clock=lambda: now)
+    assert store.trend("svc") is None
+    store.record("svc", "health", 80, now - 900)
+    store.record("svc", "health", 90, now - 100)
+    assert store.trend("svc", window=600) == "improving"
+    store.record("svc", "latency", 100, now - 900)
+    store.record("svc", "latency", 150, now - 100)
+    assert store.trend("svc", "latency", window=600, higher_is_better=False) == "declining"
+
+
+def test_unknown_series_is_empty():
+    store = TimeSeriesStore()
+    assert store.query("nobody", "health", 0, 10, 1) == []
+    assert store.metrics_for("nobody") == []
+
+
+@pytest.mark.parametrize("step", [1, 60, 3600])
+def test_mean_matches_samples(step):
+    now = 100_000.0
+    series = Series()
+    timestamps = now - np.arange(0, 300, 3, dtype=np.float64)
+    values = np.linspace(1, 2, len(timestamps))
+    series.add_many(timestamps, values)
+    assert series.mean(now - 600, now + 1) == pytest.approx(values.mean())
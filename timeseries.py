@@ -0,0 +1,218 @@
+# timeseries.py - In-process time-series store with bounded NumPy ring buffers
+
+import threading
+
+import time
+
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+# (resolution seconds, slots): 10 minutes of 1s, 1 day of 1m, 30 days of 1h
+DEFAULT_TIERS = ((1, 600), (60, 1440), (3600, 720))
+
+
+class RingBuffer:
+    """Fixed-size ring of time buckets holding min/max/sum/count per bucket
+
+    A bucket's slot is its bucket number modulo the capacity, so writing is
+    O(1) and old buckets are overwritten in place; memory never grows.
+    """
+
+    def __init__(self, resolution: int, capacity: int):
+        self.resolution = resolution
+        self.capacity = capacity
+        self.newest = -1
+
+        self.ids = np.full(capacity, -1, dtype=np.int64)
+        self.mins = np.full(capacity, np.inf, dtype=np.float32)
+        self.maxs = np.full(capacity, -np.inf, dtype=np.float32)
+        self.sums = np.zeros(capacity, dtype=np.float64)
+        self.counts = np.zeros(capacity, dtype=np.uint32)
+
+    @property
+    def retention(self) -> int:
+        return self.resolution * self.capacity
+
+    def _reset(self, slots: np.ndarray, ids: np.ndarray):
+        self.ids[slots] = ids
+        self.mins[slots] = np.inf
+        self.maxs[slots] = -np.inf
+        self.sums[slots] = 0.0
+        self.counts[slots] = 0
+
+    def add(self, timestamp: float, value: float):
+        """Fold one sample into its bucket"""
+        bucket = int(timestamp // self.resolution)
+        if bucket <= self.newest - self.capacity:
+            return
+        slot = bucket % self.capacity
+
+        if self.ids[slot] != bucket:
+            if self.ids[slot] > bucket:
+                return
+            self._reset(slot, bucket)
+        self.mins[slot] = min(self.mins[slot], value)
+        self.maxs[slot] = max(self.maxs[slot], value)
+        self.sums[slot] += value
+        self.counts[slot] += 1
+        self.newest = max(self.newest, bucket)
+
+    def add_many(self, timestamps: np.ndarray, values: np.ndarray):
+        """Fold a batch of samples into their buckets in one vectorized pass"""
+        if not len(timestamps):
+            return
+        buckets = (np.asarray(timestamps, dtype=np.float64) // self.resolution).astype(np.int64)
+        values = np.asarray(values, dtype=np.float64)
+
+        newest = max(self.newest, int(buckets.max()))
+        live = buckets > newest - self.capacity
+        buckets, values = buckets[live], values[live]
+        slots = buckets % self.capacity
+
+        # Within the live window each slot maps to exactly one bucket
+        stale = self.ids[slots] < buckets
+        if stale.any():
+            self._reset(slots[stale], buckets[stale])
+
+        valid = self.ids[slots] == buckets
+        slots, values = slots[valid], values[valid]
+        np.minimum.at(self.mins, slots, values.astype(np.float32))
+        np.maximum.at(self.maxs, slots, values.astype(np.float32))
+        np.add.at(self.sums, slots, values)
+        np.add.at(self.counts, slots, 1)
+        self.newest = newest
+
+    def window(self, start: float, end: float) -> Tuple[np.ndarray, ...]:
+        """Buckets with data whose start time falls in [start, end), oldest first"""
+        starts = self.ids * self.resolution
+        mask = (self.counts > 0) & (starts >= start) & (starts < end) & (self.ids > self.newest - self.capacity)
+        order = np.argsort(starts[mask], kind="stable")
+        return (starts[mask][order], self.mins[mask][order], self.maxs[mask][order],
+                self.sums[mask][order], self.counts[mask][order])
+
+
+class Series:
+    """One metric for one service, kept at every rollup resolution"""
+
+    def __init__(self, tiers=DEFAULT_TIERS):
+        self.tiers = [RingBuffer(resolution, capacity) for resolution, capacity in tiers]
+
+    def add(self, timestamp: float, value: float):
+        for tier in self.tiers:
+            tier.add(timestamp, value)
+
+    def add_many(self, timestamps: np.ndarray, values: np.ndarray):
+        for tier in self.tiers:
+            tier.add_many(timestamps, values)
+
+    def _tier_for(self, step: float) -> RingBuffer:
+        """Coarsest tier no coarser than the requested step (longest retention)"""
+        eligible = [tier for tier in self.tiers if tier.resolution <= step]
+        return eligible[-1] if eligible else self.tiers[0]
+
+    def query(self, start: float, end: float, step: float) -> List[Dict]:
+        """Aggregate [start, end) into step-sized points of min/max/mean/count"""
+        starts, mins, maxs, sums, counts = self._tier_for(step).window(start, end)
+        if not len(starts):
+            return []
+
+        step_starts = (starts // step) * step
+        keys, inverse = np.unique(step_starts, return_inverse=True)
+        out_min = np.full(len(keys), np.inf)
+        out_max = np.full(len(keys), -np.inf)
+        out_sum = np.zeros(len(keys))
+        out_count = np.zeros(len(keys), dtype=np.int64)
+        np.minimum.at(out_min, inverse, mins)
+        np.maximum.at(out_max, inverse, maxs)
+        np.add.at(out_sum, inverse, sums)
+        np.add.at(out_count, inverse, counts)
+
+        return [
+            {"t": float(t), "min": round(float(lo), 3), "max": round(float(hi), 3),
+             "mean": round(float(total / count), 3), "count": int(count)}
+            for t, lo, hi, total, count in zip(keys, out_min, out_max, out_sum, out_count)
+        ]
+
+    def mean(self, start: float, end: float) -> Optional[float]:
+        """Mean over [start, end) from the finest tier that still covers start"""
+        for tier in self.tiers:
+            if tier.newest < 0 or (tier.newest + 1) * tier.resolution - tier.retention <= start:
+                _, _, _, sums, counts = tier.window(start, end)
+                total = counts.sum()
+                return float(sums.sum() / total) if total else None
+        return None
+
+
+class TimeSeriesStore:
+    """Ring-buffered history for every (service, metric) pair"""
+
+    def __init__(self, tiers=DEFAULT_TIERS, clock=time.time):
+        self.tiers = tiers
+        self.clock = clock
+        self._series: Dict[Tuple[str, str], Series] = {}
+        self._lock = threading.Lock()
+
+    def _get_series(self, service: str, metric: str) -> Series:
+        key = (service, metric)
+        series = self._series.get(key)
+        if series is None:
+            with self._lock:
+                series = self._series.setdefault(key, Series(self.tiers))
+        return series
+
+    def record(self, service: str, metric: str, value: float, timestamp: Optional[float] = None):
+        """Record one sample"""
+        series = self._get_series(service, metric)
+        with self._lock:
+            series.add(self.clock() if timestamp is None else timestamp, value)
+
+    def record_many(self, service: str, metric: str, timestamps: np.ndarray, values: np.ndarray):
+        """Record a batch of samples for one series"""
+        series = self._get_series(service, metric)
+        with self._lock:
+            series.add_many(timestamps, values)
+
+    def __len__(self) -> int:
+        return len(self._series)
+
+    def __contains__(self, key: Tuple[str, str]) -> bool:
+        return key in self._series
+
+    def metrics_for(self, service: str) -> List[str]:
+        return sorted(metric for (name, metric) in self._series if name == service)
+
+    def query(self, service: str, metric: str, start: float, end: float, step: float) -> List[Dict]:
+        """Range query over one series"""
+        series = self._series.get((service, metric))
+        if series is None:
+            return []
+        with self._lock:
+            return series.query(start, end, step)
+
+    def trend(self, service: str, metric: str = "health", window: float = 600,
+              higher_is_better: bool = True) -> Optional[str]:
+        """Compare the latest window's mean with the one before it
+
+        Uses METRICES.md's bands: more than 2% better is improving, more than
+        2% worse is declining, anything else is stable. None without data.
+        """
+        series = self._series.get((service, metric))
+        if series is None:
+            return None
+
+        now = self.clock()
+        with self._lock:
+            current = series.mean(now - window, now + 1)
+            previous = series.mean(now - 2 * window, now - window)
+        if current is None or not previous:
+            return None
+
+        change = (current - previous) / abs(previous) * 100
+        if not higher_is_better:
+            change = -change
+        if change > 2:
+            return "improving"
+        if change < -2:
+            return "declining"
+        return "stable"